@@ -0,0 +1,8 @@
+'''puts the repository root on sys.path so the benchmark scripts import this checkout of lsd,
+python puts the directory of a script (and so synthetic) there already'''
+import os
+import sys
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if root not in sys.path:
+    sys.path.insert(0, root)
@@ -0,0 +1,41 @@
+'''time the band by band layout of a scheme of independent bands over growing numbers of workers
+
+run from the repository root: python benchmarks/bench_bands.py [transitions] [bands] [placement]'''
+import os
+import sys
+import time
+import warnings
+import numpy as np
+
+import _path  # noqa: F401, puts lsd on sys.path
+from synthetic import generate_transitions
+from lsd.spacer import SpaceManager
+
+
+def time_layout(energies, paths, placement, workers):
+    manager = SpaceManager(np.linspace(0.2, 0.8, 50), energies, spacing=100)
+    start = time.perf_counter()
+    xs = manager.assign_paths(paths, placement=placement, workers=workers)
+    return time.perf_counter() - start, xs
+
+
+def main(n_transitions=200000, bands=64, placement='greedy'):
+    lines = generate_transitions(int(n_transitions), bands=int(bands), missing=1)
+    pairs = [(float(parent), float(daughter)) for parent, _, daughter in (line.split('>') for line in lines)]
+    pairs.sort(key=lambda pair: pair[0])
+    energies = np.unique(np.array(pairs))
+    print(f"{len(pairs)} transitions in {bands} bands, {placement} placement")
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        serial, expected = time_layout(energies, pairs, placement, None)
+        print(f"  serial     {serial:8.3f} s")
+        counts = sorted(set([1, 2, 4, 8, 16, os.cpu_count() or 1]))
+        for workers in counts:
+            seconds, xs = time_layout(energies, pairs, placement, workers)
+            same = 'same' if xs == expected else 'DIFFERENT'
+            print(f"  {workers:>2} workers {seconds:8.3f} s  {serial/seconds:5.2f}x  {same}")
+
+
+if __name__ == '__main__':
+    main(*sys.argv[1:])
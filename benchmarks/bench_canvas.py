@@ -0,0 +1,32 @@
+'''time Canvas.read_from_nlv with and without batched figure assembly
+
+run from the repository root: python benchmarks/bench_canvas.py [file.nlv]'''
+import sys
+import time
+import warnings
+import numpy as np
+
+import _path  # noqa: F401, puts lsd on sys.path
+from lsd import Canvas
+
+
+def time_build(filename, batch, **kwargs):
+    canvas = Canvas()
+    start = time.perf_counter()
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        canvas.read_from_nlv(filename, batch=batch, **kwargs)
+    return time.perf_counter() - start
+
+
+def main(filename='example/alltransitions.nlv'):
+    kwargs = dict(x_points=np.linspace(0.1, 0.9, 220), spacing=60, proportional=True, br_widths=True)
+    one_by_one = time_build(filename, False, **kwargs)
+    batched = time_build(filename, True, **kwargs)
+    print(f"{filename}")
+    print(f"  one at a time: {one_by_one:8.3f} s")
+    print(f"  batched:       {batched:8.3f} s  ({one_by_one/batched:.0f}x faster)")
+
+
+if __name__ == '__main__':
+    main(*sys.argv[1:])
@@ -0,0 +1,36 @@
+'''time indexing an ENSDF file, importing every adopted dataset in it and reading one nucleus back
+
+run from the repository root: python benchmarks/bench_ensdf.py file.ens [nucid]'''
+import resource
+import sys
+import time
+import warnings
+
+import _path  # noqa: F401, puts lsd on sys.path
+from lsd.ensdf import ENSDFFile
+
+
+def main(filename, nucid=None):
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        start = time.perf_counter()
+        ensdf = ENSDFFile(filename)
+        print(f"index           {time.perf_counter() - start:8.3f} s  {len(ensdf.index)} datasets")
+
+        start = time.perf_counter()
+        n_schemes = n_transitions = 0
+        for _, _, _, transitions in ensdf.schemes():
+            n_schemes += 1
+            n_transitions += len(transitions)
+        print(f"import all      {time.perf_counter() - start:8.3f} s  {n_schemes} schemes, {n_transitions} transitions")
+
+        nucid = nucid or ensdf.nuclei()[len(ensdf.nuclei())//2]
+        start = time.perf_counter()
+        levels, transitions = ensdf.read(nucid)
+        print(f"read {nucid:<10} {time.perf_counter() - start:8.3f} s  {len(levels)} levels, {len(transitions)} transitions")
+    # ru_maxrss is in kB on linux
+    print(f"peak memory     {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss/1024:8.1f} MB")
+
+
+if __name__ == '__main__':
+    main(*sys.argv[1:])
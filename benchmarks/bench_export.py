@@ -0,0 +1,28 @@
+'''size of the compact json/html export against plotly's own
+
+run from the repository root: python benchmarks/bench_export.py [.nlv files]'''
+import os
+import sys
+import tempfile
+import warnings
+
+import _path  # noqa: F401, puts lsd on sys.path
+from lsd import Canvas
+
+examples = ('example/transitions.nlv', 'example/alltransitions.nlv')
+
+
+def main(filenames=examples):
+    with tempfile.TemporaryDirectory() as tmp, warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        for filename in filenames:
+            canvas = Canvas()
+            canvas.read_from_nlv(filename)
+            for fmt in ('json', 'html'):
+                report = canvas.write_compact(os.path.join(tmp, 'out.' + fmt))
+                print(f"{filename:<32} {fmt:<4} {report['before']:>9} -> {report['after']:>9} bytes "
+                      f"({report['before']/report['after']:.1f}x smaller)")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:] or examples)
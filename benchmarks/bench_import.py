@@ -0,0 +1,47 @@
+'''check that importing lsd for parsing and layout stays fast and doesn't pull in plotly
+
+run from the repository root: python benchmarks/bench_import.py [budget seconds]
+exits with a non zero status if the cold import goes over budget'''
+import subprocess
+import sys
+
+import _path
+
+# numpy alone is most of this
+BUDGET = 0.5
+
+probe = '''
+import sys, time
+start = time.perf_counter()
+import lsd
+from lsd import read, SpaceManager, levelstyles
+import lsd.svg, lsd.cli
+print(time.perf_counter() - start, 'plotly' in sys.modules)
+'''
+
+
+def cold_import():
+    '''time the import in a fresh interpreter, best of a few runs to smooth out noise'''
+    best = None
+    for _ in range(5):
+        out = subprocess.run([sys.executable, '-c', probe], capture_output=True, text=True, check=True,
+                             cwd=_path.root).stdout.split()
+        seconds, plotly_loaded = float(out[0]), out[1] == 'True'
+        best = seconds if best is None else min(best, seconds)
+    return best, plotly_loaded
+
+
+def main(budget=BUDGET):
+    seconds, plotly_loaded = cold_import()
+    print(f"import lsd: {seconds:.3f} s (budget {float(budget):.3f} s), plotly loaded: {plotly_loaded}")
+    if plotly_loaded:
+        print("plotly was imported without Canvas being used")
+        return 1
+    if seconds > float(budget):
+        print("cold import is over budget")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(*sys.argv[1:]))
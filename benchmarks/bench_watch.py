@@ -0,0 +1,47 @@
+'''time how long watch mode takes to refresh after a one line edit of a big scheme
+
+run from the repository root: python benchmarks/bench_watch.py [transitions]'''
+import os
+import sys
+import tempfile
+import time
+import warnings
+
+import _path  # noqa: F401, puts lsd on sys.path
+from synthetic import generate_transitions, write_nlv
+from lsd.watch import SchemeWatcher
+
+
+def edit(filename, lineno, new_line):
+    with open(filename) as f:
+        lines = f.readlines()
+    lines[lineno] = new_line
+    with open(filename, 'w') as f:
+        f.writelines(lines)
+
+
+def main(n_transitions=5000):
+    with tempfile.TemporaryDirectory() as tmp, warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        filename = os.path.join(tmp, 'scheme.nlv')
+        write_nlv(filename, generate_transitions(int(n_transitions), missing=0))
+
+        start = time.perf_counter()
+        watcher = SchemeWatcher(filename, os.path.join(tmp, 'scheme.html'), br_widths=True)
+        watcher.write()
+        print(f"first draw      {time.perf_counter() - start:8.4f} s")
+
+        with open(filename) as f:
+            lines = f.readlines()
+        for name, lineno, ratio in (('middle line', len(lines)//2, 0.25), ('early line', 10, 0.75)):
+            parent, gamma, daughter = lines[lineno].split('>')
+            edit(filename, lineno, f"{parent}> {gamma.split(',')[0]},{ratio} >{daughter}")
+            start = time.perf_counter()
+            watcher.refresh()
+            refreshed = time.perf_counter()
+            watcher.write()
+            print(f"{name:<15} {refreshed - start:8.4f} s refresh {time.perf_counter() - refreshed:8.4f} s write")
+
+
+if __name__ == '__main__':
+    main(*sys.argv[1:])
@@ -0,0 +1,158 @@
+'''benchmark suite for the hot paths on synthetic schemes of growing size
+
+run from the repository root:
+
+    python benchmarks/run.py -o results.json
+    python benchmarks/run.py --sizes 100 1000 --canvas-limit 1000
+
+every stage is timed on schemes of 100 up to 100k transitions and the results are written as json
+so runs on different commits can be compared'''
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+import numpy as np
+
+import _path  # noqa: F401, puts lsd on sys.path
+from synthetic import generate_transitions, write_nlv
+from lsd.read import read
+from lsd.spacer import SpaceManager, layout_scheme
+from lsd.layout_cache import LayoutCache
+from lsd.labels import resolve_labels, gamma_label_annotations
+from lsd.tables import read_tables
+from lsd.query import Scheme
+from lsd.validate import validate
+from lsd.lod import DetailIndex, strengths
+from lsd.svg import write_svg
+
+
+def best_of(function, repeat, setup=None):
+    '''best wall time of repeat calls, the result of setup (untimed) is passed to function'''
+    times = []
+    for _ in range(repeat):
+        args = () if setup is None else (setup(),)
+        start = time.perf_counter()
+        function(*args)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def bench_size(filename, n_transitions, repeat, canvas_limit, x_points=10, spacing=100):
+    results = {}
+    results['read'] = best_of(lambda: read(filename, cache=False), repeat)
+    read(filename)
+    results['read_cached'] = best_of(lambda: read(filename), repeat)
+    results['read_tables'] = best_of(lambda: read_tables(filename), repeat)
+
+    levels, transitions = read(filename)
+    results['validate'] = best_of(lambda: validate(levels, transitions), repeat)
+    results['validate_tables'] = best_of(lambda tables: validate(*tables), repeat, setup=lambda: read_tables(filename))
+    results['scheme_index'] = best_of(lambda: Scheme(levels, transitions), repeat)
+    scheme = Scheme(levels, transitions)
+    peaks = np.random.default_rng(0).uniform(0, scheme.sorted_gamma[-1], 10000)
+    results['match_10k_peaks'] = best_of(lambda: scheme.match(peaks, 0.5), repeat)
+
+    energies = [level.energy for level in levels]
+    xspace = np.linspace(0.2, 0.8, x_points)
+    results['space_manager'] = best_of(lambda: SpaceManager(xspace, energies, spacing=spacing), repeat)
+
+    transitions.sort(key=lambda transition: transition.parent.energy)
+    paths = [(transition.parent.energy, transition.daughter.energy) for transition in transitions]
+    for placement in ('greedy', 'optimal'):
+        results[f'assign_paths_{placement}'] = best_of(lambda manager: manager.assign_paths(paths, placement=placement),
+                                                       repeat, setup=lambda: SpaceManager(xspace, energies, spacing=spacing))
+
+    # layout_scheme sorts the transitions in place so every run gets a fresh copy
+    results['layout_objects'] = best_of(lambda args: layout_scheme(*args, x_points=xspace, spacing=spacing),
+                                        repeat, setup=lambda: read(filename))
+    results['layout_tables'] = best_of(lambda args: layout_scheme(*args, x_points=xspace, spacing=spacing),
+                                       repeat, setup=lambda: read_tables(filename))
+
+    # keeping the gamma labels of every transition apart, a pixel is about a twentieth of the level spacing
+    layout = layout_scheme(*read(filename), x_points=xspace, spacing=spacing)
+    gammas = [str(transition.gamma) for transition in layout.transitions]
+    results['resolve_labels'] = best_of(lambda annotations: resolve_labels(annotations, 1/600, spacing/20), repeat,
+                                        setup=lambda: gamma_label_annotations(layout.transition_x, layout.transition_py,
+                                                                              layout.transition_dy, gammas))
+
+    # level of detail tiers and what a view of a tenth of the scheme shows
+    scheme = Scheme(layout.levels, layout.transitions)
+    strength = strengths(scheme.parent, scheme.branching_ratio, len(scheme.energy))
+    results['detail_index'] = best_of(lambda: DetailIndex(layout.transition_py, layout.transition_dy, strength), repeat)
+    detail = DetailIndex(layout.transition_py, layout.transition_dy, strength)
+    y0, y1 = detail.y_range
+    results['detail_view'] = best_of(lambda: detail.visible(y0 + 0.45*(y1 - y0), y0 + 0.55*(y1 - y0)), repeat)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # a warm layout cache, as when the same scheme is drawn again in another style
+        layout_cache = LayoutCache(tmp)
+        layout_scheme(*read(filename), x_points=xspace, spacing=spacing, cache=layout_cache)
+        results['layout_cached'] = best_of(lambda args: layout_scheme(*args, x_points=xspace, spacing=spacing,
+                                                                      cache=layout_cache),
+                                           repeat, setup=lambda: read(filename))
+        results['write_svg'] = best_of(lambda: write_svg(filename, os.path.join(tmp, 'out.svg'), x_points=xspace,
+                                                         spacing=spacing, layout_cache=False), repeat)
+
+    if n_transitions <= canvas_limit:
+        from lsd.drawing import Canvas
+        results['canvas'] = best_of(lambda: Canvas().read_from_nlv(filename, x_points=xspace, spacing=spacing,
+                                                                   layout_cache=False), repeat)
+        results['canvas_webgl'] = best_of(lambda: Canvas().read_from_nlv(filename, x_points=xspace, spacing=spacing,
+                                                                         render='webgl', layout_cache=False), repeat)
+        results['canvas_lod'] = best_of(lambda: Canvas().read_from_nlv(filename, x_points=xspace, spacing=spacing,
+                                                                       render='lod', layout_cache=False), repeat)
+    return len(levels), len(transitions), results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='benchmark lsd on synthetic level schemes')
+    parser.add_argument('-o', '--output', default='bench_results.json', help='json file for the results')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000, 100000],
+                        help='number of transitions of each scheme')
+    parser.add_argument('--per-level', type=float, default=2, help='mean transitions per level')
+    parser.add_argument('--cluster', type=float, default=0.2, help='fraction of levels packed into clusters')
+    parser.add_argument('--missing', type=float, default=0.3, help='fraction of lines without spin/parity')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--canvas-limit', type=int, default=10000,
+                        help='skip the plotly Canvas above this many transitions')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    runs = []
+    with tempfile.TemporaryDirectory() as tmp, warnings.catch_warnings():
+        # the small x space runs out on big schemes, that's expected here
+        warnings.simplefilter('ignore')
+        for size in args.sizes:
+            filename = os.path.join(tmp, f'synthetic_{size}.nlv')
+            write_nlv(filename, generate_transitions(size, per_level=args.per_level, cluster=args.cluster,
+                                                     missing=args.missing, seed=args.seed))
+            n_levels, n_transitions, results = bench_size(filename, size, args.repeat, args.canvas_limit)
+            runs.append(dict(size=size, levels=n_levels, transitions=n_transitions, seconds=results))
+            print(f"{n_transitions:>8} transitions {n_levels:>8} levels  " +
+                  '  '.join(f"{stage} {seconds:.4f}" for stage, seconds in results.items()))
+
+    report = dict(commit=commit(), python=platform.python_version(), numpy=np.__version__,
+                  machine=platform.machine(), time=time.strftime('%Y-%m-%dT%H:%M:%S'),
+                  parameters=dict(per_level=args.per_level, cluster=args.cluster, missing=args.missing,
+                                  repeat=args.repeat, seed=args.seed),
+                  runs=runs)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=1)
+    print(f"wrote {args.output}")
+
+
+if __name__ == '__main__':
+    main()
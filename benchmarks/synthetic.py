@@ -0,0 +1,78 @@
+'''seeded generator of synthetic .nlv level schemes for benchmarking
+
+    python benchmarks/synthetic.py out.nlv --levels 5000 --per-level 3 --cluster 0.3 --missing 0.5
+'''
+import argparse
+import random
+
+
+def generate(n_levels=1000, per_level=2, cluster=0.2, missing=0.3, max_energy=10000, spacing=100, seed=0, bands=1):
+    '''yield the lines of a random level scheme.
+    n_levels levels up to max_energy, each level above the ground state decays to about per_level lower
+    levels. A cluster fraction of the levels are packed closer than spacing to each other so the level
+    spacing has work to do, and a missing fraction of lines leave out spin/parity and branching ratio.
+    bands splits the levels into that many runs that only decay within themselves'''
+    rng = random.Random(seed)
+
+    n_clustered = int(n_levels*cluster)
+    energies = {0.0}
+    while len(energies) < n_levels - n_clustered:
+        energies.add(round(rng.uniform(0, max_energy), 2))
+    # clusters of 2 to 20 levels a fraction of spacing apart
+    while len(energies) < n_levels:
+        energy = rng.uniform(0, max_energy)
+        for _ in range(rng.randint(2, 20)):
+            energies.add(round(energy, 2))
+            energy += rng.uniform(0.05, 0.5)*spacing
+            if len(energies) == n_levels:
+                break
+    energies = sorted(energies)
+
+    spins = {energy: (rng.choice((0.0, 0.5, 1.0, 1.5, 2.0, 2.5, 3.0, 4.0)), rng.choice('+-')) for energy in energies}
+    band_size = -(-len(energies)//bands)
+    for i in range(1, len(energies)):
+        # the lowest level of a band has nothing below it to decay to
+        first = i - i % band_size
+        if first == i:
+            continue
+        parent = energies[i]
+        n = max(1, min(i - first, round(rng.expovariate(1/per_level))))
+        daughters = rng.sample(range(first, i), n)
+        ratios = [rng.random() for _ in daughters]
+        total = sum(ratios)
+        for d, ratio in zip(daughters, ratios):
+            daughter = energies[d]
+            gamma = round(parent - daughter, 2)
+            if rng.random() < missing:
+                yield f"{parent} > {gamma} > {daughter}\n"
+            else:
+                spin, parity = spins[parent]
+                yield f"{parent},{spin},{parity} > {gamma},{ratio/total:.4f} > {daughter}\n"
+
+
+def generate_transitions(n_transitions, per_level=2, **kwargs):
+    '''generate about n_transitions transitions'''
+    return generate(n_levels=max(2, round(n_transitions/per_level) + 1), per_level=per_level, **kwargs)
+
+
+def write_nlv(filename, lines):
+    with open(filename, 'w') as f:
+        f.writelines(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='write a synthetic .nlv level scheme')
+    parser.add_argument('output')
+    parser.add_argument('--levels', type=int, default=1000)
+    parser.add_argument('--per-level', type=float, default=2, help='mean transitions per level')
+    parser.add_argument('--cluster', type=float, default=0.2, help='fraction of levels packed into clusters')
+    parser.add_argument('--missing', type=float, default=0.3, help='fraction of lines without spin/parity')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--bands', type=int, default=1, help='number of bands of levels that decay within themselves')
+    args = parser.parse_args(argv)
+    write_nlv(args.output, generate(args.levels, args.per_level, args.cluster, args.missing, seed=args.seed,
+                                    bands=args.bands))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,4 +1,16 @@
-from .drawing import *
 from .read import *
 from .spacer import *
 from .styles import *
+from .tables import LevelTable, TransitionTable, LevelRecord, TransitionRecord, to_tables, read_tables
+from .query import Scheme
+
+# drawing builds on plotly which takes a long time to import, so Canvas is only
+# loaded the first time it is used and parsing/layout work without it
+__all__ = [name for name in dir() if not name.startswith('_')] + ['Canvas']
+
+
+def __getattr__(name):
+    if name == 'Canvas':
+        from .drawing import Canvas
+        return Canvas
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,162 @@
+'''columnar binary cache of parsed .nlv files
+
+the levels and transitions of a scheme are stored as two structured numpy arrays in a sidecar
+directory next to the .nlv file (.<name>.lsdcache/), the arrays are loaded memory mapped so a
+warm read skips the text parsing entirely'''
+import hashlib
+import json
+import os
+import numpy as np
+from .read import Level, Transition, LevelRegistry, iter_read
+
+CACHE_VERSION = 1
+
+level_dtype = np.dtype([('energy', 'f8'), ('spin', 'f8'), ('parity', 'i1')])
+transition_dtype = np.dtype([('parent', 'i4'), ('daughter', 'i4'), ('gamma', 'f8'), ('branching_ratio', 'f8')])
+
+parities = {None: 0, '+': 1, '-': -1}
+parity_names = {0: None, 1: '+', -1: '-'}
+
+
+class Uncachable(ValueError):
+    '''raised when a scheme has values that don't fit the columnar format, e.g. a spin of "3/2"'''
+
+
+def cache_path(filename):
+    '''directory holding the cache of filename'''
+    directory, name = os.path.split(os.path.abspath(filename))
+    return os.path.join(directory, f'.{name}.lsdcache')
+
+
+def _hash(filename):
+    sha = hashlib.sha256()
+    with open(filename, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def to_float(value):
+    '''a field as a float for a column, nan marks a missing (None) one'''
+    if value is None:
+        return np.nan
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        raise Uncachable(f"{value!r} is not a number") from None
+
+
+def from_float(value):
+    '''a float of a column back as a field, None for nan'''
+    return None if value != value else value
+
+
+def to_arrays(levels, transitions):
+    '''pack levels and transitions into structured arrays, transitions refer to levels by index'''
+    level_arr = np.empty(len(levels), dtype=level_dtype)
+    index = {}
+    for i, level in enumerate(levels):
+        if level.parity not in parities:
+            raise Uncachable(f"{level.parity!r} is not a parity")
+        if level.energy is None:
+            raise Uncachable("level without an energy")
+        level_arr[i] = (to_float(level.energy), to_float(level.spin), parities[level.parity])
+        index[id(level)] = i
+
+    transition_arr = np.empty(len(transitions), dtype=transition_dtype)
+    for i, transition in enumerate(transitions):
+        transition_arr[i] = (index[id(transition.parent)], index[id(transition.daughter)],
+                             to_float(transition.gamma), to_float(transition.branching_ratio))
+    return level_arr, transition_arr
+
+
+def from_arrays(level_arr, transition_arr):
+    '''unpack structured arrays back into shared Level objects and Transitions'''
+    levels = [Level(energy, from_float(spin), parity_names[parity])
+              for energy, spin, parity in zip(level_arr['energy'].tolist(),
+                                              level_arr['spin'].tolist(),
+                                              level_arr['parity'].tolist())]
+    transitions = [Transition(levels[parent], levels[daughter], from_float(gamma), from_float(br))
+                   for parent, daughter, gamma, br in zip(transition_arr['parent'].tolist(),
+                                                          transition_arr['daughter'].tolist(),
+                                                          transition_arr['gamma'].tolist(),
+                                                          transition_arr['branching_ratio'].tolist())]
+    return levels, transitions
+
+
+def write_cache(filename, levels, transitions, tolerance=1e-6):
+    '''write the sidecar cache of filename, raises Uncachable if the scheme doesn't fit'''
+    level_arr, transition_arr = to_arrays(levels, transitions)
+    path = cache_path(filename)
+    os.makedirs(path, exist_ok=True)
+    meta_file = os.path.join(path, 'meta.json')
+    # drop the old meta first so a half written cache is never treated as valid
+    if os.path.exists(meta_file):
+        os.remove(meta_file)
+
+    for name, arr in (('levels', level_arr), ('transitions', transition_arr)):
+        tmp = os.path.join(path, f'{name}.tmp.npy')
+        try:
+            np.save(tmp, arr)
+            os.replace(tmp, os.path.join(path, f'{name}.npy'))
+        except OSError:
+            # a full disk shouldn't leave half written arrays behind
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+    stat = os.stat(filename)
+    meta = dict(version=CACHE_VERSION, size=stat.st_size, mtime_ns=stat.st_mtime_ns,
+                sha256=_hash(filename), tolerance=tolerance)
+    with open(meta_file, 'w') as f:
+        json.dump(meta, f)
+
+
+def load_cache(filename, tolerance=1e-6):
+    '''return the memory mapped (levels, transitions) arrays of filename or None if the cache
+    is missing or out of date'''
+    path = cache_path(filename)
+    meta_file = os.path.join(path, 'meta.json')
+    try:
+        with open(meta_file) as f:
+            meta = json.load(f)
+        stat = os.stat(filename)
+    except (OSError, ValueError):
+        return None
+
+    if meta.get('version') != CACHE_VERSION or meta.get('tolerance') != tolerance or meta.get('size') != stat.st_size:
+        return None
+    if meta.get('mtime_ns') != stat.st_mtime_ns:
+        # touched but maybe not changed, fall back on the content hash
+        if meta.get('sha256') != _hash(filename):
+            return None
+        meta['mtime_ns'] = stat.st_mtime_ns
+        try:
+            with open(meta_file, 'w') as f:
+                json.dump(meta, f)
+        except OSError:
+            pass
+
+    try:
+        level_arr = np.load(os.path.join(path, 'levels.npy'), mmap_mode='r')
+        transition_arr = np.load(os.path.join(path, 'transitions.npy'), mmap_mode='r')
+    except (OSError, ValueError):
+        return None
+    return level_arr, transition_arr
+
+
+def read_cached(filename, tolerance=1e-6):
+    '''read() backed by the sidecar cache, parses and rebuilds the cache when it is out of date. A cache
+    that can't be written (read only or full directory) is skipped and the parsed scheme returned'''
+    arrays = load_cache(filename, tolerance)
+    if arrays is not None:
+        return from_arrays(*arrays)
+
+    registry = LevelRegistry(tolerance)
+    transitions = list(iter_read(filename, registry))
+    try:
+        write_cache(filename, registry.levels, transitions, tolerance)
+    except (OSError, Uncachable):
+        # read only directory or a scheme the columns can't hold, just don't cache
+        pass
+    return registry.levels, transitions
@@ -0,0 +1,190 @@
+'''command line entry point for rendering many .nlv files at once
+
+    lsd example/ -f html -j 4
+    lsd "schemes/*.nlv" -f svg -o figures --style platform --proportional
+    lsd scheme.nlv --watch
+'''
+import argparse
+import glob
+import importlib.util
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+
+formats = ('html', 'json', 'png', 'jpg', 'svg', 'pdf')
+# formats that need plotly's offline image exporter, svg is drawn directly without plotly
+static_formats = ('png', 'jpg', 'pdf')
+
+
+def find_files(paths):
+    '''expand directories and glob patterns into a sorted list of .nlv files'''
+    files = set()
+    for path in paths:
+        if os.path.isdir(path):
+            files.update(glob.glob(os.path.join(path, '*.nlv')))
+        elif os.path.isfile(path):
+            files.add(path)
+        else:
+            files.update(match for match in glob.glob(path, recursive=True) if os.path.isfile(match))
+    return sorted(files)
+
+
+def output_path(filename, fmt, output_dir=None):
+    '''where the rendering of filename goes, next to it unless an output directory is given'''
+    directory, name = os.path.split(filename)
+    if output_dir is not None:
+        directory = output_dir
+    return os.path.join(directory, os.path.splitext(name)[0] + '.' + fmt)
+
+
+def up_to_date(filename, output):
+    return os.path.exists(output) and os.path.getmtime(output) >= os.path.getmtime(filename)
+
+
+def render(filename, output, fmt, read_kw, figure_kw, decimals=None):
+    '''draw one .nlv file and write it to output, returns the time taken. With decimals html and
+    json are written compact with the coordinates rounded to that many decimals'''
+    start = time.perf_counter()
+    if fmt == 'svg':
+        from .svg import write_svg
+        write_svg(filename, output, **read_kw, **figure_kw)
+        return time.perf_counter() - start
+
+    from .drawing import Canvas
+    canvas = Canvas()
+    # the figure size is set first so labels are placed for it
+    if figure_kw:
+        canvas.update_layout(**figure_kw)
+    canvas.read_from_nlv(filename, **read_kw)
+
+    if decimals is not None and fmt in ('html', 'json'):
+        canvas.write_compact(output, fmt, decimals=decimals)
+    elif fmt == 'html':
+        canvas.write_html(output, include_plotlyjs='cdn')
+    elif fmt == 'json':
+        canvas.write_json(output)
+    else:
+        canvas.write_image(output, format=fmt)
+    return time.perf_counter() - start
+
+
+def _render_job(filename, output, fmt, read_kw, figure_kw, decimals=None):
+    '''run render in a worker, failures are returned instead of raised so the batch carries on'''
+    try:
+        return filename, output, render(filename, output, fmt, read_kw, figure_kw, decimals), None
+    except Exception as e:
+        return filename, output, None, ''.join(traceback.format_exception_only(type(e), e)).strip()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog='lsd', description='render level schemes from .nlv files')
+    parser.add_argument('paths', nargs='+', help='.nlv files, directories of them or glob patterns')
+    parser.add_argument('-f', '--format', choices=formats, default='html', help='output format (default html)')
+    parser.add_argument('-o', '--output-dir', default=None, help='directory for the output (default next to each input)')
+    parser.add_argument('-j', '--workers', type=int, default=None, help='number of worker processes (default all cores)')
+    parser.add_argument('--force', action='store_true', help='render even if the output is newer than the input')
+    parser.add_argument('--watch', action='store_true',
+                        help='keep re-rendering the files as they are saved, html and json only')
+    parser.add_argument('--interval', type=float, default=0.5, help='seconds between checks for changes with --watch')
+    parser.add_argument('--compact', action='store_true',
+                        help='write minimal html/json with shared annotation settings in the template')
+    parser.add_argument('--decimals', type=int, default=4, help='decimals coordinates are rounded to with --compact')
+
+    layout = parser.add_argument_group('layout')
+    layout.add_argument('--style', default='flat', help='level style (default flat)')
+    layout.add_argument('--spacing', type=float, default=100, help='minimum spacing of levels (default 100)')
+    layout.add_argument('--x-points', type=int, default=10, help='number of columns for transitions (default 10)')
+    layout.add_argument('--x-range', type=float, nargs=2, default=(0.2, 0.8), metavar=('LOW', 'HIGH'),
+                        help='relative x range of the transition columns (default 0.2 0.8)')
+    layout.add_argument('--placement', choices=('greedy', 'optimal'), default='greedy')
+    layout.add_argument('--fit-x-points', action='store_true', help='use exactly as many columns as optimal placement needs')
+    layout.add_argument('--proportional', action='store_true', help='draw levels at their true energy')
+    layout.add_argument('--br-widths', action='store_true', help='scale arrow widths by branching ratio')
+    layout.add_argument('--render', choices=('annotations', 'webgl'), default='annotations',
+                        help='draw transitions as annotations or as webgl segments for big schemes (not for svg)')
+    layout.add_argument('--text-labels', action='store_true', help='draw level labels as a text trace (not for svg)')
+    layout.add_argument('--resolve-labels', action='store_true', help='move overlapping labels apart (not for svg)')
+    layout.add_argument('--gamma-labels', action='store_true', help='label the arrows with gamma energies (not for svg)')
+    layout.add_argument('--no-leader-lines', action='store_true', help="don't join moved labels to their levels")
+    layout.add_argument('--no-layout-cache', action='store_true',
+                        help="don't reuse or store layouts in the layout cache ($LSD_CACHE_DIR)")
+    layout.add_argument('--no-cache', action='store_true',
+                        help="don't reuse or store parsed files in the .<name>.lsdcache sidecar next to them")
+    layout.add_argument('--width', type=int, default=None, help='figure width in pixels')
+    layout.add_argument('--height', type=int, default=None, help='figure height in pixels')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    if args.format in static_formats and importlib.util.find_spec('kaleido') is None:
+        print(f"lsd: writing {args.format} needs the kaleido package", file=sys.stderr)
+        return 2
+
+    files = find_files(args.paths)
+    if not files:
+        print("lsd: no .nlv files found", file=sys.stderr)
+        return 2
+    if args.output_dir is not None:
+        os.makedirs(args.output_dir, exist_ok=True)
+
+    read_kw = dict(spacing=args.spacing, x_points=np.linspace(*args.x_range, args.x_points),
+                   placement=args.placement, fit_x_points=args.fit_x_points,
+                   proportional=args.proportional, br_widths=args.br_widths,
+                   level_kw=dict(style=args.style), layout_cache=not args.no_layout_cache, cache=not args.no_cache)
+    if args.format != 'svg':
+        read_kw.update(render=args.render, text_labels=args.text_labels, resolve_labels=args.resolve_labels,
+                       gamma_labels=args.gamma_labels, leader_lines=not args.no_leader_lines)
+    figure_kw = {key: value for key, value in (('width', args.width), ('height', args.height)) if value is not None}
+
+    if args.watch:
+        if args.format not in ('html', 'json'):
+            print(f"lsd: --watch writes html or json, not {args.format}", file=sys.stderr)
+            return 2
+        from .watch import watch
+        # the watcher parses the files itself, so it never touches the read cache
+        draw_kw = {key: value for key, value in read_kw.items() if key != 'cache'}
+        watch([(filename, output_path(filename, args.format, args.output_dir)) for filename in files],
+              args.format, args.interval, figure_kw, **draw_kw)
+        return 0
+
+    jobs = []
+    skipped = []
+    for filename in files:
+        output = output_path(filename, args.format, args.output_dir)
+        if not args.force and up_to_date(filename, output):
+            skipped.append(filename)
+        else:
+            jobs.append((filename, output))
+
+    start = time.perf_counter()
+    results = []
+    if jobs:
+        workers = min(args.workers or os.cpu_count() or 1, len(jobs))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            decimals = args.decimals if args.compact else None
+            futures = [pool.submit(_render_job, filename, output, args.format, read_kw, figure_kw, decimals)
+                       for filename, output in jobs]
+            for future in as_completed(futures):
+                results.append(future.result())
+
+    failed = 0
+    for filename, output, seconds, error in sorted(results):
+        if error is None:
+            print(f"{seconds:8.3f} s  {filename} -> {output}")
+        else:
+            failed += 1
+            print(f"  failed    {filename}: {error}")
+    for filename in skipped:
+        print(f"   skipped  {filename} (up to date)")
+    print(f"{len(results) - failed} rendered, {failed} failed, {len(skipped)} up to date "
+          f"in {time.perf_counter() - start:.2f} s")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
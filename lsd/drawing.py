@@ -1,9 +1,14 @@
 import plotly.graph_objects as go
 import warnings
 from dataclasses import dataclass
-from .spacer import SpaceManager
+from .spacer import SpaceManager, layout_scheme
+from .layout_cache import get_layout_cache
 from .read import Level, Transition, read
 from .styles import levelstyles
+from .stats import get_stats, null_stats
+from .labels import data_per_pixel, resolve_labels, gamma_label_annotations
+from .lod import DetailIndex, strengths
+from .tables import LevelTable, TransitionTable, scheme_columns
 import numpy as np
 import copy
 
@@ -11,6 +16,9 @@ import copy
 class Canvas(go.Figure):
     transition_defaults = dict(showarrow=True, arrowhead=3, arrowsize=1, arrowwidth=1.5, arrowcolor='black', text='', yanchor='bottom')
     level_defaults = dict(line=dict(color='black'))
+    # layout and drawing of the last scheme drawn by read_from_nlv
+    space_manager = None
+    scheme = None
     
     
     def __init__(self,*args,**kwargs):
@@ -24,14 +32,23 @@ class Canvas(go.Figure):
                   name='', spin='', parity='',
                   trace_kw={}, annotations_kw={}):
         
+        levelstyle, trace_kw, annotations = self._level_parts(x, y, width, height, style, name, spin, parity,
+                                                              trace_kw, annotations_kw)
+        trace = levelstyle.get_line(**trace_kw)
+        self.add_trace(trace)
         
-        
+        # self.update_layout(annotations=annotations)
+        for anno in annotations:
+            self.add_annotation(**anno)
+            
+    def _level_parts(self, x: float = 0, y: float = 0, width: float = 0, height: float = 0, style: str='',
+                     name='', spin='', parity='',
+                     trace_kw={}, annotations_kw={}):
+        '''build the style, trace keywords and annotation dicts of a level without touching the figure'''
         trace_kw = copy.deepcopy(trace_kw)
         if width>1 or width<0:
             raise ValueError("width is relative width and must be between 0 and 1")
         
-        
-        
         for default in self.level_defaults.keys():
             if default not in trace_kw.keys():
                 trace_kw[default] = self.level_defaults[default]
@@ -41,16 +58,16 @@ class Canvas(go.Figure):
         levelstyle = Style(x, y, width, height)
         trace_kw["mode"] = 'lines'
         trace_kw["showlegend"] = False
-        trace = levelstyle.get_line(**trace_kw)
-        self.add_trace(trace)
-        
         
-        annotations = levelstyle.get_annotations(name=name, spin=spin, parity=parity)
-        # self.update_layout(annotations=annotations)
-        for anno in annotations:
-            self.add_annotation(**anno, **annotations_kw)
+        annotations = [dict(**anno, **annotations_kw)
+                       for anno in levelstyle.get_annotations(name=name, spin=spin, parity=parity)]
+        return levelstyle, trace_kw, annotations
             
     def add_transition(self, px=None, py=None, dx=None, dy=None, **kwargs):
+        self.add_annotation(**self._transition_annotation(px, py, dx, dy, **kwargs))
+        
+    def _transition_annotation(self, px=None, py=None, dx=None, dy=None, **kwargs):
+        '''build the arrow annotation dict of a transition without touching the figure'''
         if None in [px,py,dx,dy]:
             raise ValueError(f"(px,py,dx,dy) must all be specified: {px,py,dx,dy} not valid")
         if px<0 or px>1 or dx<0 or dx>1:
@@ -67,109 +84,630 @@ class Canvas(go.Figure):
         kwargs['yref'] = 'y'
         kwargs['ayref'] = 'y'
         
-        self.add_annotation(x=dx, y=dy, ax=px, ay=py, **kwargs)
+        return dict(x=dx, y=dy, ax=px, ay=py, **kwargs)
+    
+    def add_levels(self, x=0, y=(), width=0, height=0, style: str='',
+                   name=None, spin=None, parity=None,
+                   trace_kw={}, annotations_kw={}):
+        '''add many levels of one style at once as a single trace, y and name, spin, parity are
+        sequences with one entry per level and x, width, height can be too'''
+        trace, annotations = self._levels_parts(x, y, width, height, style, name, spin, parity,
+                                                trace_kw, annotations_kw)
+        self._add_batch([trace], annotations)
+        
+    def _levels_parts(self, x=0, y=(), width=0, height=0, style: str='',
+                      name=None, spin=None, parity=None,
+                      trace_kw={}, annotations_kw={}, gl=False):
+        '''build the single trace and the annotation dicts of many levels without touching the figure,
+        gl makes a webgl Scattergl trace'''
+        trace_kw = copy.deepcopy(trace_kw)
+        if np.any(np.asarray(width)>1) or np.any(np.asarray(width)<0):
+            raise ValueError("width is relative width and must be between 0 and 1")
+        
+        for default in self.level_defaults.keys():
+            if default not in trace_kw.keys():
+                trace_kw[default] = self.level_defaults[default]
+        
+        style= style.lower()
+        Style = levelstyles[style]
+        geometry = Style.get_geometry(x, y, width, height)
+        trace_kw["mode"] = 'lines'
+        trace_kw["showlegend"] = False
+        trace = (go.Scattergl if gl else go.Scatter)(x=geometry.x, y=geometry.y, **trace_kw)
+        
+        n = len(geometry.labels[0][0]) if geometry.labels else len(np.atleast_1d(y))
+        name = [''] * n if name is None else name
+        spin = [''] * n if spin is None else spin
+        parity = [''] * n if parity is None else parity
+        annotations = [dict(**anno, **annotations_kw)
+                       for anno in Style.get_annotations_batch(geometry, name, spin, parity)]
+        return trace, annotations
+    
+    def _add_batch(self, traces, annotations):
+        '''add many traces and annotations at once, plotly revalidates the whole figure on every
+        add_trace/add_annotation so this is far faster than adding them one at a time'''
+        self.add_traces(traces)
+        self._set_annotations(self.layout.to_plotly_json().get('annotations', []) + annotations)
+        
+    def _set_annotations(self, annotations):
+        '''replace all the annotations with a list of dicts. plotly merges assigned annotations into
+        the existing ones one by one, swapping in a whole new layout is much faster'''
+        layout = self.layout.to_plotly_json()
+        layout['annotations'] = annotations
+        self.layout = layout
+        
+    def _segment_traces(self, arrows, hovertext, width_buckets=5):
+        '''webgl traces drawing transition annotation dicts as line segments, arrows with about the same
+        width and the same colour share a trace and the arrowheads are marker traces'''
+        if not arrows:
+            return []
+        px = np.array([arrow['ax'] for arrow in arrows], dtype=float)
+        py = np.array([arrow['ay'] for arrow in arrows], dtype=float)
+        dx = np.array([arrow['x'] for arrow in arrows], dtype=float)
+        dy = np.array([arrow['y'] for arrow in arrows], dtype=float)
+        widths = np.array([arrow.get('arrowwidth', self.transition_defaults['arrowwidth']) for arrow in arrows], dtype=float)
+        sizes = np.array([arrow.get('arrowsize', self.transition_defaults['arrowsize']) for arrow in arrows], dtype=float)
+        colors = [arrow.get('arrowcolor', self.transition_defaults['arrowcolor']) for arrow in arrows]
+        hovertext = np.asarray(hovertext, dtype=object)
+        
+        # equal width buckets between the thinnest and thickest arrow
+        low, high = widths.min(), widths.max()
+        if high > low and width_buckets > 1:
+            buckets = np.minimum(((widths - low)/(high - low)*width_buckets).astype(int), width_buckets - 1)
+        else:
+            buckets = np.zeros(len(widths), dtype=int)
+        
+        traces = []
+        heads = []
+        for color in dict.fromkeys(colors):
+            same_color = np.array([c == color for c in colors])
+            for bucket in np.unique(buckets[same_color]):
+                members = np.flatnonzero(same_color & (buckets == bucket))
+                n = len(members)
+                # each segment is parent, daughter then a gap
+                x = np.column_stack((px[members], dx[members], np.full(n, np.nan))).ravel()
+                y = np.column_stack((py[members], dy[members], np.full(n, np.nan))).ravel()
+                text = np.column_stack((hovertext[members], hovertext[members], np.full(n, None))).ravel()
+                traces.append(go.Scattergl(x=x, y=y, mode='lines', line=dict(color=color, width=round(float(widths[members].mean()), 3)),
+                                           hovertext=text, hoverinfo='text', showlegend=False))
+        
+            
+            # per point colours and symbols are validated one by one by plotly, so the arrowheads
+            # are split by colour and direction instead
+            for symbol, members in (('triangle-down', same_color & (py >= dy)), ('triangle-up', same_color & (py < dy))):
+                if members.any():
+                    heads.append(go.Scattergl(x=dx[members], y=dy[members], mode='markers', hovertext=hovertext[members],
+                                              hoverinfo='text', showlegend=False,
+                                              marker=dict(symbol=symbol, size=sizes[members]*(3*widths[members] + 4),
+                                                          color=color, line=dict(width=0))))
+        return traces + heads
+    
+    def _label_trace(self, annotations, gl=True):
+        '''text trace showing label annotation dicts'''
+        positions = {'left': 'middle right', 'right': 'middle left'}
+        kw = dict(textfont=annotations[0]['font']) if annotations and 'font' in annotations[0] else {}
+        return (go.Scattergl if gl else go.Scatter)(x=[anno['x'] for anno in annotations],
+                                                    y=[anno['y'] for anno in annotations],
+                                                    text=[anno['text'] for anno in annotations],
+                                                    textposition=[positions.get(anno.get('xanchor'), 'middle center')
+                                                                  for anno in annotations],
+                                                    mode='text', hoverinfo='skip', showlegend=False, **kw)
+            
+    def write_compact(self, filename, fmt=None, decimals=4, include_plotlyjs='cdn'):
+        '''write a minimal, deterministic json or html of the figure, shared annotation settings go into
+        the template and coordinates are rounded to decimals. Returns the size in bytes of write_json or
+        write_html and of the compact file (see lsd.export)'''
+        from .export import write_compact
+        return write_compact(self, filename, fmt=fmt, decimals=decimals, include_plotlyjs=include_plotlyjs)
+    
+    def detail_widget(self):
+        '''FigureWidget of the scheme drawn with render='lod' that shows more transitions and level labels
+        the further it is zoomed in (see lsd.lod)'''
+        from .lod import detail_widget
+        return detail_widget(self)
             
     def read_from_nlv(self, filename:str, spacing=100, x_points=np.linspace(0.2,0.8,10),
                       transition_sort: callable = None, proportional=False, br_widths=False,
-                      auto_sort: bool = True, level_kw={}, transition_kw={}):
-        levels, transitions = read(filename)
+                      auto_sort: bool = True, level_kw={}, transition_kw={}, batch: bool = True,
+                      cache: bool = True, placement: str = 'greedy', fit_x_points: bool = False, stats=None,
+                      render: str = 'annotations', text_labels: bool = False, width_buckets: int = 5,
+                      layout_cache=True, resolve_labels: bool = False, gamma_labels: bool = False,
+                      leader_lines: bool = True, layout_workers: int = None, validate: bool = False,
+                      max_visible: int = 500):
+        '''draw the level scheme in an .nlv file, batch collects every level and transition and adds
+        them to the figure in one go instead of one trace/annotation at a time, cache reuses the
+        parsed scheme from the binary sidecar written by read, validate warns about gammas and branching
+        ratios that don't add up (see lsd.validate).
+        render='webgl' draws the transitions as line segments in Scattergl traces, one per arrow
+        width bucket, with a marker trace for the arrowheads and hover text instead of one annotation
+        each, which keeps panning and zooming smooth with 10k+ transitions. text_labels draws the
+        level labels as a text trace instead of annotations. render='lod' draws like webgl but splits the
+        transitions and level labels into tiers by branching ratio and energy span, at full view only the
+        max_visible strongest transitions are shown and self.scheme.show_range (or the FigureWidget of
+        detail_widget on every zoom) shows more tiers as the y range narrows (see lsd.lod).
+        resolve_labels moves overlapping labels apart as little as possible (see lsd.labels) and with
+        leader_lines joins labels that had to move far to their level by a line. gamma_labels writes
+        the gamma energy alongside every arrow, these labels are kept apart too.
+        placement='optimal' packs the transitions into the fewest columns, fit_x_points then spreads
+        exactly that many columns over the x_points range. The SpaceManager used is kept as
+        self.space_manager, its columns_used gives the number of columns the layout needed.
+        In batch mode the drawn scheme is kept as self.scheme so transitions can be edited one at a time.
+        layout_cache (True for the default lsd.layout_cache.LayoutCache, a LayoutCache or False) keeps the
+        level spacing and transition columns on disk, so drawing the same scheme again with other styles
+        skips the layout. The default one lives in $LSD_CACHE_DIR or ~/.cache/lsd/layouts and is kept under
+        256 MB, give a LayoutCache(directory, max_bytes) to change that. A cache that can't be written is
+        skipped. layout_workers lays out bands of levels that no transition crosses one by one,
+        in a pool of that many processes when more than 1, giving the same layout.
+        stats=True (or a lsd.stats.Stats to fill in) times the parse, spacing, paths, copy, build and figure
+        stages and counts get_path calls, column probes and out of space fallbacks, the Stats are returned
+        and sent to their hook/logger'''
+        stats = get_stats(stats)
+        with stats.time('parse'):
+            levels, transitions = read(filename, cache=cache, validate=validate)
+        return self.draw_scheme(levels, transitions, spacing=spacing, x_points=x_points, transition_sort=transition_sort,
+                                proportional=proportional, br_widths=br_widths, auto_sort=auto_sort, level_kw=level_kw,
+                                transition_kw=transition_kw, batch=batch, placement=placement,
+                                fit_x_points=fit_x_points, stats=stats, render=render, text_labels=text_labels,
+                                width_buckets=width_buckets, layout_cache=layout_cache, resolve_labels=resolve_labels,
+                                gamma_labels=gamma_labels, leader_lines=leader_lines, layout_workers=layout_workers,
+                                max_visible=max_visible)
         
-        float_levels = []
-        for level in levels:
-            float_levels.append(level.energy)
+    def draw_scheme(self, levels, transitions, spacing=100, x_points=np.linspace(0.2,0.8,10),
+                    transition_sort: callable = None, proportional=False, br_widths=False,
+                    auto_sort: bool = True, level_kw={}, transition_kw={}, batch: bool = True,
+                    placement: str = 'greedy', fit_x_points: bool = False, stats=None,
+                    render: str = 'annotations', text_labels: bool = False, width_buckets: int = 5,
+                    layout_cache=None, resolve_labels: bool = False, gamma_labels: bool = False,
+                    leader_lines: bool = True, layout_workers: int = None, max_visible: int = 500):
+        '''draw already read levels and transitions, lists of Level/Transition or a LevelTable and
+        TransitionTable, takes the same options as read_from_nlv'''
+        if render not in ('annotations', 'webgl', 'lod'):
+            raise ValueError(f"render must be 'annotations', 'webgl' or 'lod' not {render!r}")
+        stats = get_stats(stats)
+        stats.count('levels', len(levels))
+        stats.count('transitions', len(transitions))
         
-        if 'style' in level_kw.keys():
-            Style = levelstyles[level_kw['style']]
-            reverse = Style(0,0,0,0).reverse
+        options = dict(spacing=spacing, x_points=x_points, transition_sort=transition_sort, proportional=proportional,
+                       br_widths=br_widths, auto_sort=auto_sort, level_kw=level_kw, transition_kw=transition_kw,
+                       placement=placement, fit_x_points=fit_x_points, layout_cache=layout_cache,
+                       layout_workers=layout_workers)
+        if batch or render != 'annotations' or text_labels or resolve_labels or gamma_labels:
+            self.scheme = SchemeDrawing(self, levels, transitions, stats=stats, render=render, text_labels=text_labels,
+                                        width_buckets=width_buckets, resolve_labels=resolve_labels,
+                                        gamma_labels=gamma_labels, leader_lines=leader_lines, max_visible=max_visible,
+                                        **options)
+            self.space_manager = self.scheme.space_manager
         else:
-            reverse=False
-        
-        
-        spc_mng = SpaceManager(x_points, float_levels, spacing=spacing, reverse=reverse)
+            self._draw_one_by_one(levels, transitions, stats=stats, **options)
+        stats.count('annotations', len(self.layout.annotations))
         
+        stats.emit()
+        if stats is not null_stats:
+            return stats
         
+    def _level_kw(self, level_kw):
+        '''level_kw with the defaults of read_from_nlv filled in'''
         defaults = dict(x=0.5, width=1, style='flat', height=10, trace_kw=dict(line=dict(color='black')))
         level_kw_cp = copy.deepcopy(level_kw) 
         for default in defaults.keys():
                 if default not in list(level_kw.keys()):
                     level_kw_cp[default] = defaults[default]
+        return level_kw_cp
+    
+    def _arrow_kw(self, transition, transition_kw, br_widths):
+        '''copy of transition_kw with the arrow width scaled by the branching ratio'''
+        cpy_transition_kw = copy.deepcopy(transition_kw)
+        if br_widths:
+            if "arrowwidth" in cpy_transition_kw.keys():
+                try:
+                    cpy_transition_kw["arrowwidth"] *= (1+transition.branching_ratio)
+                except TypeError:
+                    pass
+            else:
+                try:
+                    cpy_transition_kw["arrowwidth"] = self.transition_defaults["arrowwidth"] * (1+transition.branching_ratio)
+                except TypeError:
+                    pass
+        return cpy_transition_kw
+    
+    def _draw_one_by_one(self, levels, transitions, spacing, x_points, transition_sort, proportional, br_widths,
+                         auto_sort, level_kw, transition_kw, placement, fit_x_points, layout_cache, layout_workers,
+                         stats):
+        '''read_from_nlv without batching, every level and transition is added to the figure on its own'''
+        level_kw_cp = self._level_kw(level_kw)
+        reverse = levelstyles[level_kw_cp['style'].lower()].get_reverse()
+        layout = layout_scheme(levels, transitions, spacing=spacing, x_points=x_points, transition_sort=transition_sort,
+                               proportional=proportional, auto_sort=auto_sort, reverse=reverse,
+                               height=level_kw_cp.pop('height'), placement=placement, fit_x_points=fit_x_points,
+                               stats=stats, cache=layout_cache, workers=layout_workers)
+        self.space_manager = layout.space_manager
         
         # make the levels
-        for level in levels:            
-            available_y = spc_mng.get_spaced_y(level.energy)
-            # print(level.energy, available_y)
-            if level.spin == None:
-                spin = ''
-            else:
-                spin = str(level.spin)
-                
-            if level.parity == None:
-                parity = ''
-            else:
-                parity = str(level.parity)
+        for level, y, height in zip(levels, layout.level_y.tolist(), layout.level_height.tolist()):
+            with stats.time('figure'):
+                self.add_level(y=y, height=height, name=str(level.energy), spin=_label(level.spin),
+                               parity=_label(level.parity), **level_kw_cp)
+            stats.count('traces')
+        
+        # make the transitions
+        for i,transition in enumerate(layout.transitions):
+            with stats.time('copy'):
+                cpy_transition_kw = self._arrow_kw(transition, transition_kw, br_widths)
+            with stats.time('figure'):
+                self.add_transition(px=layout.transition_x[i], dx=layout.transition_x[i],
+                                    py=layout.transition_py[i], dy=layout.transition_dy[i], **cpy_transition_kw)
 
-            if proportional:
-                # level_kw_cp = copy.deepcopy(level_kw) 
-                level_kw_cp['height'] += abs(available_y - level.energy)
-                self.add_level(y=level.energy, name=str(level.energy), spin=spin, parity=parity, **level_kw_cp)
-                #undo the change
-                level_kw_cp['height'] -= abs(available_y - level.energy)
-            else:
-                self.add_level(y=available_y, name=str(level.energy), spin=spin, parity=parity, **level_kw_cp)
-            
+
+def _label(value):
+    return '' if value is None else str(value)
+
+
+def _hover(transition):
+    '''hover text of a transition drawn as a segment'''
+    return (f"{transition.parent.energy} → {transition.daughter.energy}<br>"
+            f"gamma {_label(transition.gamma)}<br>branching ratio {_label(transition.branching_ratio)}")
+
+
+class SchemeDrawing:
+    '''a level scheme drawn on a Canvas in one batch. It keeps the SpaceManager and which trace and
+    annotations belong to each level and transition, so single transitions can be added, removed or
+    changed touching only their own column and annotation. The whole layout is only redone when
+    the set of levels changes. levels and transitions can be a LevelTable and TransitionTable, they
+    are laid out as tables until the first edit. With render='webgl' the transitions are segments of
+    webgl traces (see Canvas.read_from_nlv) and an edit redraws those traces instead of an annotation.
+    Gamma labels are placed as a whole, with gamma_labels every edit draws the scheme again. With
+    render='lod' the segments and level labels are split into traces by tier (see lsd.lod), the tiers
+    shown are changed by show_range and every edit draws the scheme again since it can change them'''
+    def __init__(self, canvas, levels, transitions, spacing=100, x_points=np.linspace(0.2,0.8,10),
+                 transition_sort: callable = None, proportional=False, br_widths=False, auto_sort: bool = True,
+                 level_kw={}, transition_kw={}, placement: str = 'greedy', fit_x_points: bool = False, stats=None,
+                 render: str = 'annotations', text_labels: bool = False, width_buckets: int = 5,
+                 layout_cache=None, resolve_labels: bool = False, gamma_labels: bool = False,
+                 leader_lines: bool = True, layout_workers: int = None, max_visible: int = 500):
+        self.canvas = canvas
+        self.levels = levels if isinstance(levels, LevelTable) else list(levels)
+        self.options = dict(spacing=spacing, x_points=x_points, transition_sort=transition_sort,
+                            proportional=proportional, auto_sort=auto_sort, placement=placement,
+                            fit_x_points=fit_x_points, cache=get_layout_cache(layout_cache), workers=layout_workers)
+        self.br_widths = br_widths
+        self.level_kw = canvas._level_kw(level_kw)
+        self.transition_kw = transition_kw
+        self.render = render
+        self.text_labels = text_labels
+        self.width_buckets = width_buckets
+        self.resolve_labels = resolve_labels
+        self.gamma_labels = gamma_labels
+        self.leader_lines = leader_lines
+        self.max_visible = max_visible
         
-        if transition_sort is None:
-            transitions.sort(key=lambda transition: transition.parent.energy)
-        else:
-            transitions.sort(key=transition_sort)
-            
+        self.space_manager = None
+        # every trace drawn, the level trace is the first
+        self.traces = []
+        self.segment_traces = []
+        # id(level) -> annotation indices of its labels, id(transition) -> (annotation index, x)
+        self.level_annotations = {}
+        self.transition_annotations = {}
+        # id(transition) -> arrow annotation dict of the transitions drawn as segments
+        self.arrows = {}
+        # annotation indices of the gamma labels
+        self.gamma_annotations = []
+        # tiers of the transitions and (tier, trace) of the traces shown by tier with render='lod'
+        self.detail = None
+        self.detail_traces = []
+        # id(figure) -> highest tier shown on it
+        self._shown = {}
+        self._transitions = {id(transition): transition for transition in transitions}
+        self._table = transitions if isinstance(transitions, TransitionTable) else None
+        # hidden annotations, spares made when a transition is first added and those of removed
+        # transitions, reused by the next added one
+        self._free = []
+        self.draw(stats)
         
-        # make the transitions
+    @property
+    def transitions(self):
+        return list(self._transitions.values())
+    
+    @property
+    def level_trace(self):
+        return self.traces[0] if self.traces else None
+    
+    @property
+    def webgl(self):
+        return self.render in ('webgl', 'lod')
+    
+    @property
+    def lod(self):
+        return self.render == 'lod'
+    
+    def draw(self, stats=None):
+        '''lay out and draw the whole scheme, replacing what this scheme drew before'''
+        stats = get_stats(stats)
+        canvas = self.canvas
+        level_kw = dict(self.level_kw)
+        reverse = levelstyles[level_kw['style'].lower()].get_reverse()
+        transitions = self.transitions if self._table is None else self._table
+        layout = layout_scheme(self.levels, transitions, reverse=reverse, height=level_kw.pop('height'),
+                               stats=stats, **self.options)
+        self.space_manager = layout.space_manager
+        self._transitions = {id(transition): transition for transition in layout.transitions}
         
+        # make the levels, all the levels share one style so they become one trace
+        with stats.time('build'):
+            level_trace, level_annotations = canvas._levels_parts(y=layout.level_y, height=layout.level_height,
+                                                                  name=[str(level.energy) for level in self.levels],
+                                                                  spin=[_label(level.spin) for level in self.levels],
+                                                                  parity=[_label(level.parity) for level in self.levels],
+                                                                  gl=self.webgl, **level_kw)
+            traces = [level_trace]
             
+        # make the transitions
+        transition_annotations = []
+        for i, transition in enumerate(layout.transitions):
+            with stats.time('copy'):
+                cpy_transition_kw = canvas._arrow_kw(transition, self.transition_kw, self.br_widths)
+            with stats.time('build'):
+                transition_annotations.append(canvas._transition_annotation(px=layout.transition_x[i], dx=layout.transition_x[i],
+                                                                            py=layout.transition_py[i], dy=layout.transition_dy[i],
+                                                                            **cpy_transition_kw))
         
-        for i,transition in enumerate(transitions):
-            cpy_transition_kw = copy.deepcopy(transition_kw)
-            
-            if auto_sort:
-                #try to minimize the width with simple algorithm
-                available_x = spc_mng.get_path(transition.parent.energy, transition.daughter.energy)
-            else:
-                available_x = spc_mng.xspace[-i]    
-            
-            available_y_head = spc_mng.get_spaced_y(transition.daughter.energy)
-            available_y_tail = spc_mng.get_spaced_y(transition.parent.energy)
-            
-            if br_widths:
-                if "arrowwidth" in cpy_transition_kw.keys():
-                    try:
-                        cpy_transition_kw["arrowwidth"] *= (1+transition.branching_ratio)
-                    except TypeError:
-                        pass
+        gamma_annotations = []
+        if self.gamma_labels:
+            with stats.time('build'):
+                gammas = [_label(transition.gamma) for transition in layout.transitions]
+                gamma_annotations = [anno for anno in gamma_label_annotations(layout.transition_x, layout.transition_py,
+                                                                              layout.transition_dy, gammas)
+                                     if anno['text']]
+        if self.resolve_labels or self.gamma_labels:
+            with stats.time('labels'):
+                traces += self._resolve_labels(layout, level_annotations + gamma_annotations)
+        
+        # tier of every trace drawn by tier, by id of the trace before it is added
+        detail_tiers = {}
+        if self.lod:
+            with stats.time('build'):
+                level_tier = self._detail_index(layout)
+                per_level = len(level_annotations)//len(self.levels) if self.levels else 0
+                level_tier = np.repeat(level_tier, per_level)
+                for tier in range(self.detail.n_tiers):
+                    members = np.flatnonzero(level_tier == tier).tolist()
+                    if members:
+                        trace = canvas._label_trace([level_annotations[k] for k in members], gl=True)
+                        traces.append(trace)
+                        detail_tiers[id(trace)] = tier
+            level_annotations = []
+        elif self.text_labels:
+            traces.append(canvas._label_trace(level_annotations, gl=self.webgl))
+            level_annotations = []
+        
+        self.arrows = {}
+        segment_traces = []
+        if self.webgl:
+            with stats.time('build'):
+                self.arrows = {id(transition): arrow for transition, arrow in zip(layout.transitions, transition_annotations)}
+                if self.lod:
+                    hover = [_hover(transition) for transition in layout.transitions]
+                    for tier in range(self.detail.n_tiers):
+                        members = np.flatnonzero(self.detail.tier == tier).tolist()
+                        for trace in canvas._segment_traces([transition_annotations[i] for i in members],
+                                                            [hover[i] for i in members], self.width_buckets):
+                            segment_traces.append(trace)
+                            detail_tiers[id(trace)] = tier
                 else:
-                    try:
-                        cpy_transition_kw["arrowwidth"] = self.transition_defaults["arrowwidth"] * (1+transition.branching_ratio)
-                    except TypeError:
-                        pass
+                    segment_traces = self._segment_traces()
+            transition_annotations = []
+        # full view to start with
+        for trace in traces + segment_traces:
+            if detail_tiers.get(id(trace), 0) > 0:
+                trace.visible = False
+        
+        with stats.time('figure'):
+            # take out what was drawn before
+            ours = set(k for indices in self.level_annotations.values() for k in indices)
+            ours.update(k for k, _ in self.transition_annotations.values())
+            ours.update(self.gamma_annotations)
+            ours.update(self._free)
+            others = canvas.layout.to_plotly_json().get('annotations', [])
+            others = [anno for k, anno in enumerate(others) if k not in ours]
+            self._remove_traces(self.traces)
             
-            if proportional:
-                self.add_transition(px=available_x,
-                                    dx=available_x,
-                                    py=transition.parent.energy,
-                                    dy=transition.daughter.energy,
-                                    **cpy_transition_kw)
-            else:
-                self.add_transition(px=available_x,
-                                    dx=available_x,
-                                    py=available_y_tail,
-                                    dy=available_y_head,
-                                    **cpy_transition_kw)
+            traces += segment_traces
+            canvas.add_traces(traces)
+            self.traces = list(canvas.data[-len(traces):])
+            self.segment_traces = self.traces[len(traces) - len(segment_traces):]
+            self.detail_traces = [(detail_tiers[id(trace)], drawn) for trace, drawn in zip(traces, self.traces)
+                                  if id(trace) in detail_tiers]
+            self._shown = {id(canvas): 0}
+            canvas._set_annotations(others + level_annotations + transition_annotations + gamma_annotations)
+        stats.count('traces', len(traces))
         
+        # every level has the same number of labels
+        start = len(others)
+        per_level = len(level_annotations)//len(self.levels) if self.levels else 0
+        self.level_annotations = {id(level): list(range(start + i*per_level, start + (i+1)*per_level))
+                                  for i, level in enumerate(self.levels)}
+        start += len(level_annotations)
+        self.transition_annotations = {id(transition): (start + i, layout.transition_x[i])
+                                       for i, transition in enumerate(layout.transitions) if not self.webgl}
+        start += len(transition_annotations)
+        self.gamma_annotations = list(range(start, start + len(gamma_annotations)))
+        # hidden spare annotations are only made by the first added transition (see _grow) so a scheme
+        # that is never edited carries none
+        self._free = []
         
+    def _resolve_labels(self, layout, annotations):
+        '''move the label annotation dicts apart in place, returns the leader line trace if any is needed'''
+        figure_layout = self.canvas.layout.to_plotly_json()
+        x_range = figure_layout.get('xaxis', {}).get('range') or (0, 1)
+        y = np.concatenate((layout.level_y - layout.level_height, layout.level_y + layout.level_height))
+        y_range = (y.min(), y.max()) if len(y) else (0, 1)
+        # the labels are kept inside the levels' range, so that is what the y axis shows
+        x_scale, y_scale = data_per_pixel(figure_layout, x_range, y_range)
+        x, y = resolve_labels(annotations, x_scale, y_scale, leader_lines=self.leader_lines, y_range=y_range)
+        if not len(x):
+            return []
+        line = dict(self.level_kw.get('trace_kw', {}).get('line', {}), width=0.5)
+        return [(go.Scattergl if self.webgl else go.Scatter)(x=x, y=y, mode='lines', line=line, hoverinfo='skip',
+                                                             showlegend=False)]
         
+    def _detail_index(self, layout):
+        '''tiers of the laid out transitions by branching ratio and energy span, returns the tier of each level'''
+        energy, _, parent, daughter, _, branching_ratio = scheme_columns(self.levels, layout.transitions)
+        y = np.concatenate((layout.level_y - layout.level_height, layout.level_y + layout.level_height))
+        y_range = (y.min(), y.max()) if len(y) else (0, 1)
+        self.detail = DetailIndex(layout.transition_py, layout.transition_dy,
+                                  strengths(parent, branching_ratio, len(energy)),
+                                  span=energy[parent] - energy[daughter], y_range=y_range, max_visible=self.max_visible)
+        return self.detail.level_tiers(parent, daughter, len(energy))
+    
+    def show_range(self, y0, y1, figure=None):
+        '''show the tiers of transitions and level labels worth showing with y0 to y1 visible, on the canvas
+        or a FigureWidget of it, by changing which traces are visible. Returns the numbers (in
+        self.transitions) of the transitions shown in that range'''
+        if self.detail is None:
+            raise ValueError("show_range needs a scheme drawn with render='lod'")
+        figure = self.canvas if figure is None else figure
+        tier = self.detail.tier_of(y0, y1)
+        if self._shown.get(id(figure)) != tier:
+            position = {id(trace): k for k, trace in enumerate(self.canvas.data)}
+            figure.plotly_restyle({'visible': [t <= tier for t, _ in self.detail_traces]},
+                                  trace_indexes=[position[id(trace)] for _, trace in self.detail_traces])
+            self._shown[id(figure)] = tier
+        return self.detail.visible(y0, y1, tier)
         
-            
+    def reset(self, levels, transitions, stats=None):
+        '''replace the whole scheme and draw it again'''
+        self.levels = levels if isinstance(levels, LevelTable) else list(levels)
+        self._transitions = {id(transition): transition for transition in transitions}
+        self._table = transitions if isinstance(transitions, TransitionTable) else None
+        self.draw(stats)
         
-
-
-    
\ No newline at end of file
+    def _remove_traces(self, traces):
+        if traces:
+            self.canvas.data = [trace for trace in self.canvas.data if not any(trace is ours for ours in traces)]
+        
+    def _segment_traces(self):
+        transitions = [self._transitions[key] for key in self.arrows]
+        return self.canvas._segment_traces(list(self.arrows.values()), [_hover(transition) for transition in transitions],
+                                           self.width_buckets)
+        
+    def _redraw_segments(self):
+        '''swap the segment traces for new ones after an edit'''
+        segment_traces = self._segment_traces()
+        self._remove_traces(self.segment_traces)
+        self.traces = [trace for trace in self.traces if not any(trace is ours for ours in self.segment_traces)]
+        if segment_traces:
+            self.canvas.add_traces(segment_traces)
+            self.segment_traces = list(self.canvas.data[-len(segment_traces):])
+        else:
+            self.segment_traces = []
+        self.traces += self.segment_traces
+        
+    def _grow(self):
+        '''add hidden spare annotations, doubling the number of transitions that fit'''
+        n = max(16, len(self.transition_annotations))
+        annotations = self.canvas.layout.to_plotly_json().get('annotations', [])
+        start = len(annotations)
+        self.canvas._set_annotations(annotations + [self._spare() for _ in range(n)])
+        self._free = list(range(start + n - 1, start - 1, -1)) + self._free
+        
+    def _spare(self):
+        '''hidden arrow with the styling of the transitions, reusing it then only changes its position'''
+        return dict(self.canvas._transition_annotation(px=0, py=0, dx=0, dy=0, **self.transition_kw), visible=False)
+        
+    def _set_annotation(self, k, annotation):
+        '''change annotation k to annotation. Every attribute plotly sets on an annotation searches the
+        whole list of annotations, so only the changed ones are sent as a single relayout'''
+        current = self.canvas.layout.annotations[k].to_plotly_json()
+        changes = {f'annotations[{k}].{key}': value for key, value in annotation.items() if current.get(key) != value}
+        if changes:
+            self.canvas.plotly_relayout(changes)
+        
+    def _has_level(self, level):
+        return level.energy in self.space_manager.dict_level
+        
+    def _arrow(self, transition, x):
+        '''annotation dict of a transition drawn at x'''
+        spc_mng = self.space_manager
+        if self.options['proportional']:
+            py, dy = transition.parent.energy, transition.daughter.energy
+        else:
+            py, dy = spc_mng.get_spaced_y(transition.parent.energy), spc_mng.get_spaced_y(transition.daughter.energy)
+        kw = self.canvas._arrow_kw(transition, self.transition_kw, self.br_widths)
+        return self.canvas._transition_annotation(px=x, dx=x, py=py, dy=dy, **kw)
+    
+    def add_transition(self, transition):
+        '''draw one more transition, redoes the whole layout only if it brings in a new level. A parent or
+        daughter at the energy of a drawn level is replaced by that level, as read does'''
+        levels = {level.energy: level for level in self.levels}
+        transition.parent = levels.get(transition.parent.energy, transition.parent)
+        transition.daughter = levels.get(transition.daughter.energy, transition.daughter)
+        self._transitions[id(transition)] = transition
+        self._table = None
+        if not (self._has_level(transition.parent) and self._has_level(transition.daughter)):
+            self.levels = list(self.levels)
+            known = set(id(level) for level in self.levels)
+            for level in (transition.parent, transition.daughter):
+                if id(level) not in known and not self._has_level(level):
+                    self.levels.append(level)
+            self.draw()
+            return
+        if self.gamma_labels or self.lod:
+            # the gamma labels are placed as a whole and the tiers ranked as a whole so they are all redone
+            self.draw()
+            return
+        
+        if self.options['auto_sort']:
+            x = self.space_manager.get_path(transition.parent.energy, transition.daughter.energy)
+        else:
+            x = self.space_manager.xspace[-len(self._transitions)]
+        annotation = self._arrow(transition, x)
+        if self.webgl:
+            self.arrows[id(transition)] = annotation
+            self._redraw_segments()
+            return
+        if not self._free:
+            self._grow()
+        # bring back a hidden spare annotation or that of a removed transition
+        k = self._free.pop()
+        self._set_annotation(k, dict(annotation, visible=True))
+        self.transition_annotations[id(transition)] = (k, x)
+        
+    def remove_transition(self, transition):
+        '''take a transition out, freeing its column and hiding its annotation'''
+        if self.webgl:
+            x = self.arrows.pop(id(transition))['x']
+        else:
+            k, x = self.transition_annotations.pop(id(transition))
+        del self._transitions[id(transition)]
+        self._table = None
+        if self.gamma_labels or self.lod:
+            self.draw()
+            return
+        self.space_manager.release_path(transition.parent.energy, transition.daughter.energy, x)
+        if self.webgl:
+            self._redraw_segments()
+            return
+        self._set_annotation(k, dict(visible=False))
+        self._free.append(k)
+        
+    def update_transition(self, transition, **changes):
+        '''change the fields of a drawn transition (gamma, branching_ratio, parent, daughter),
+        only its own annotation is redrawn unless it moves to other levels'''
+        if 'parent' in changes or 'daughter' in changes:
+            self.remove_transition(transition)
+            for field, value in changes.items():
+                setattr(transition, field, value)
+            self.add_transition(transition)
+            return
+        
+        for field, value in changes.items():
+            setattr(transition, field, value)
+        if self.gamma_labels or self.lod:
+            self.draw()
+            return
+        if self.webgl:
+            self.arrows[id(transition)] = self._arrow(transition, self.arrows[id(transition)]['x'])
+            self._redraw_segments()
+            return
+        k, x = self.transition_annotations[id(transition)]
+        self._set_annotation(k, self._arrow(transition, x))
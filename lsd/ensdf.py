@@ -0,0 +1,258 @@
+'''import level schemes from ENSDF evaluated nuclear structure data files
+
+    ensdf = ENSDFFile('ensdf.152')
+    levels, transitions = ensdf.read('152SM')       # adopted levels and gammas of one nucleus
+    for nucid, dsid, levels, transitions in ensdf.schemes():
+        ...
+
+ENSDF files are 80 column cards grouped into datasets separated by blank cards. The first card of a
+dataset identifies it (nucleus in columns 1-5, dataset id in 10-39), L cards are levels and the G
+cards after a level are the gammas depopulating it. Opening a file makes one pass over it noting
+where every dataset starts, so any dataset can be read again later by seeking straight to it, and
+only one dataset is ever held in memory. The daughter of a gamma is the level closest to the level
+energy minus the gamma energy, relative photon intensities are normalised per level into branching
+ratios'''
+import bisect
+import os
+import re
+import warnings
+from .read import LevelRegistry, Transition
+
+adopted = 'ADOPTED LEVELS'
+_spin = re.compile(r'^(\d+(?:/2)?)?([+-])?$')
+
+
+def _field(card, start, end):
+    '''columns start to end (1 based, inclusive) of a card'''
+    return card[start-1:end].strip()
+
+
+def _number(text):
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+
+def parse_spin_parity(text):
+    '''spin and parity of the first assignment in an ENSDF J field, (3/2,5/2)- gives 1.5, '-'.
+    Tentative assignments count, anything else gives None'''
+    first = re.split(r',|&|:| TO ', text.replace('(', '').replace(')', '').replace('[', '').replace(']', ''))[0]
+    match = _spin.match(first.strip())
+    if match is None:
+        return None, None
+    spin, parity = match.groups()
+    if spin is not None:
+        numerator, _, denominator = spin.partition('/')
+        spin = float(numerator)/float(denominator or 1)
+    # parity shared by every assignment, e.g. (1,2)+
+    if parity is None:
+        match = _spin.match(text.replace('(', '').replace(')', '').split(',')[-1].strip())
+        if match is not None:
+            parity = match.group(2)
+    return spin, parity
+
+
+def normalise_nucid(nucid):
+    return nucid.replace(' ', '').upper()
+
+
+def _cards(f, start=0, end=None):
+    '''(offset, card) of the lines of a binary file from start up to end'''
+    f.seek(start)
+    offset = start
+    for line in f:
+        if end is not None and offset >= end:
+            break
+        yield offset, line.decode('ascii', 'replace').rstrip('\r\n')
+        offset += len(line)
+
+
+def _datasets(cards):
+    '''group cards into datasets, yields the cards of each, the blank end cards are dropped'''
+    dataset = []
+    for offset, card in cards:
+        if not card.strip():
+            if dataset:
+                yield dataset
+                dataset = []
+            continue
+        dataset.append((offset, card))
+    if dataset:
+        yield dataset
+
+
+class ENSDFFile:
+    '''an ENSDF file with an index of where each of its datasets starts, tolerance (keV) is how far the
+    daughter level of a gamma may be from the parent level energy minus the gamma energy'''
+    def __init__(self, filename, tolerance=1.0):
+        self.filename = filename
+        self.tolerance = tolerance
+        # (nucid, dataset id) -> (first, last) byte offset
+        self.index = {}
+        with open(filename, 'rb') as f:
+            for dataset in _datasets(_cards(f)):
+                offset, card = dataset[0]
+                key = (normalise_nucid(_field(card, 1, 5)), _field(card, 10, 39))
+                # reading stops at the first card starting past the end
+                self.index.setdefault(key, (offset, dataset[-1][0] + 1))
+
+    def __repr__(self):
+        return f"ENSDFFile({self.filename!r}, {len(self.index)} datasets)"
+
+    def nuclei(self):
+        '''the nuclei with levels in the file, in file order'''
+        return list(dict.fromkeys(nucid for nucid, _ in self.index))
+
+    def datasets(self, nucid=None):
+        '''the dataset ids of a nucleus, or (nucid, dataset id) of every dataset'''
+        if nucid is None:
+            return list(self.index)
+        nucid = normalise_nucid(nucid)
+        return [dsid for key, dsid in self.index if key == nucid]
+
+    def find(self, nucid, dataset=adopted):
+        '''(nucid, dataset id) of the first dataset of a nucleus whose id starts with dataset'''
+        nucid = normalise_nucid(nucid)
+        for key in self.index:
+            if key[0] == nucid and key[1].startswith(dataset):
+                return key
+        raise KeyError(f"no {dataset!r} dataset for {nucid} in {self.filename}")
+
+    def read(self, nucid, dataset=adopted):
+        '''levels and transitions of one dataset, read by seeking to it'''
+        start, end = self.index[self.find(nucid, dataset)]
+        with open(self.filename, 'rb') as f:
+            cards = [card for _, card in _cards(f, start, end)]
+        return parse_dataset(cards, self.tolerance)
+
+    def schemes(self, dataset=adopted):
+        '''yield nucid, dataset id, levels and transitions of every dataset whose id starts with dataset
+        (all of them for None) in one pass over the file'''
+        with open(self.filename, 'rb') as f:
+            for cards in _datasets(_cards(f)):
+                card = cards[0][1]
+                nucid, dsid = normalise_nucid(_field(card, 1, 5)), _field(card, 10, 39)
+                if dataset is not None and not dsid.startswith(dataset):
+                    continue
+                levels, transitions = parse_dataset([card for _, card in cards], self.tolerance)
+                if transitions:
+                    yield nucid, dsid, levels, transitions
+
+
+def parse_dataset(cards, tolerance=1.0):
+    '''levels and transitions of the cards of one dataset. Like read only the levels that a transition
+    goes to or from are returned'''
+    registry = LevelRegistry()
+    energies = [] # sorted energies of the levels so far and their levels
+    by_energy = []
+    gammas = [] # (parent, gamma energy, relative intensity) of each gamma
+    level = None
+    skipped = 0
+    for card in cards:
+        card = card.ljust(80)
+        # continuation and comment cards have something in columns 6 and 7
+        if card[5] != ' ' or card[6] != ' ':
+            continue
+        kind = card[7]
+        if kind == 'L':
+            energy = _number(_field(card, 10, 19))
+            if energy is None:
+                # levels relative to an unknown one (X+100) can't be placed
+                level = None
+                continue
+            spin, parity = parse_spin_parity(_field(card, 22, 39))
+            level = registry.add(energy, spin, parity)
+            k = bisect.bisect_left(energies, energy)
+            if k == len(energies) or by_energy[k] is not level:
+                energies.insert(k, energy)
+                by_energy.insert(k, level)
+        elif kind == 'G' and level is not None:
+            gamma = _number(_field(card, 10, 19))
+            if gamma is None:
+                skipped += 1
+                continue
+            gammas.append((level, gamma, _number(_field(card, 22, 29))))
+
+    # daughters are the levels closest to where the gammas end
+    transitions = []
+    totals = {}
+    for parent, gamma, intensity in gammas:
+        target = parent.energy - gamma
+        k = bisect.bisect_left(energies, target)
+        candidates = [i for i in (k - 1, k) if 0 <= i < len(energies)]
+        i = min(candidates, key=lambda i: abs(energies[i] - target), default=None)
+        if i is None or abs(energies[i] - target) > tolerance or by_energy[i] is parent:
+            skipped += 1
+            continue
+        transitions.append((Transition(parent, by_energy[i], gamma), intensity))
+        if intensity is not None:
+            totals[id(parent)] = totals.get(id(parent), 0) + intensity
+    if skipped:
+        warnings.warn(f"{skipped} gamma(s) without an energy or a level to end on were left out")
+
+    levels = {}
+    for transition, intensity in transitions:
+        total = totals.get(id(transition.parent))
+        if intensity is not None and total:
+            transition.branching_ratio = intensity/total
+        levels.setdefault(id(transition.parent), transition.parent)
+        levels.setdefault(id(transition.daughter), transition.daughter)
+    levels = sorted(levels.values(), key=lambda level: level.energy)
+    return levels, [transition for transition, _ in transitions]
+
+
+def read_ensdf(filename, nucid, dataset=adopted, tolerance=1.0):
+    '''levels and transitions of one nucleus in an ENSDF file'''
+    return ENSDFFile(filename, tolerance).read(nucid, dataset)
+
+
+def _nlv_value(value):
+    if value is None:
+        return 'None'
+    return f'{value:g}' if isinstance(value, float) and value.is_integer() else str(value)
+
+
+def nlv_line(transition):
+    '''a transition as a line of an .nlv file'''
+    columns = []
+    for fields in ((transition.parent.energy, transition.parent.spin, transition.parent.parity),
+                   (transition.gamma, transition.branching_ratio),
+                   (transition.daughter.energy, transition.daughter.spin, transition.daughter.parity)):
+        fields = list(fields)
+        while len(fields) > 1 and fields[-1] is None:
+            fields.pop()
+        columns.append(','.join(_nlv_value(field) for field in fields))
+    return ' > '.join(columns) + '\n'
+
+
+def write_nlv(filename, transitions):
+    '''write transitions as an .nlv file that lsd.read.read reads back'''
+    with open(filename, 'w') as f:
+        f.writelines(nlv_line(transition) for transition in transitions)
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description='convert the adopted levels and gammas of an ENSDF file to .nlv files')
+    parser.add_argument('ensdf', help='ENSDF file')
+    parser.add_argument('nuclei', nargs='*', help='nuclei to convert, e.g. 60NI (default all)')
+    parser.add_argument('-o', '--output-dir', default='.', help='directory for the .nlv files')
+    parser.add_argument('--dataset', default=adopted, help=f'dataset id to convert (default {adopted!r})')
+    parser.add_argument('--tolerance', type=float, default=1.0, help='keV a gamma may miss its daughter level by')
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    ensdf = ENSDFFile(args.ensdf, args.tolerance)
+    if args.nuclei:
+        jobs = ((normalise_nucid(nucid), *ensdf.read(nucid, args.dataset)) for nucid in args.nuclei)
+    else:
+        jobs = ((nucid, levels, transitions) for nucid, _, levels, transitions in ensdf.schemes(args.dataset))
+    for nucid, levels, transitions in jobs:
+        output = os.path.join(args.output_dir, f'{nucid}.nlv')
+        write_nlv(output, transitions)
+        print(f"{nucid}: {len(levels)} levels, {len(transitions)} transitions -> {output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+'''compact, deterministic json/html export of Canvas figures
+
+every annotation of a level scheme repeats the same xref, yref, arrowhead, arrowcolor and so on.
+compact_figure moves the values most annotations share into the template's annotationdefaults,
+drops what plotly would ignore anyway (arrow settings of labels, hidden annotations, template
+entries of trace types that aren't used) and rounds the coordinates'''
+import json
+from collections import Counter
+import numpy as np
+
+# plotly.js defaults of the annotation attributes that can be moved into the template
+annotation_defaults = dict(xref='paper', yref='paper', axref='pixel', ayref='pixel', showarrow=True, arrowhead=1,
+                           arrowsize=1, xanchor='auto', yanchor='auto', visible=True, standoff=0)
+# attributes that only matter when the annotation draws an arrow
+arrow_keys = {'ax', 'ay', 'axref', 'ayref', 'arrowhead', 'arrowsize', 'arrowwidth', 'arrowcolor', 'arrowside',
+              'standoff', 'startarrowhead', 'startarrowsize', 'startstandoff'}
+coordinate_keys = ('x', 'y', 'ax', 'ay')
+
+
+def _round(value, decimals):
+    '''round a coordinate or array of coordinates, nan becomes None'''
+    if isinstance(value, (list, tuple, np.ndarray)):
+        try:
+            arr = np.asarray(value, dtype=float)
+        except (TypeError, ValueError):
+            return value
+        return [None if v != v else v for v in np.round(arr, decimals).tolist()]
+    if isinstance(value, float):
+        return round(value, decimals)
+    return value
+
+
+def _key(value):
+    # values can be dicts (font) so they are compared by their json
+    return json.dumps(value, sort_keys=True)
+
+
+def _sorted(obj):
+    '''copy of obj with every dict sorted by key and numpy values made plain, so equal figures
+    give byte for byte equal output'''
+    if isinstance(obj, dict):
+        return {key: _sorted(obj[key]) for key in sorted(obj)}
+    if isinstance(obj, (list, tuple)):
+        return [_sorted(value) for value in obj]
+    if isinstance(obj, np.ndarray):
+        return _sorted(obj.tolist())
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, float) and obj != obj:
+        return None
+    return obj
+
+
+def _compact_annotations(annotations, defaults, decimals):
+    '''move shared annotation values into defaults (updated in place), returns the slimmed annotations'''
+    annotations = [dict(anno) for anno in annotations if anno.get('visible', True) is not False]
+    inherited = dict(annotation_defaults, **defaults)
+    arrows = [anno.get('showarrow', inherited['showarrow']) for anno in annotations]
+    for anno, arrow in zip(annotations, arrows):
+        if not arrow:
+            for key in arrow_keys.intersection(anno):
+                del anno[key]
+
+    keys = sorted(set(key for anno in annotations for key in anno) - set(coordinate_keys))
+    for key in keys:
+        relevant = [anno for anno, arrow in zip(annotations, arrows) if arrow or key not in arrow_keys]
+        values = Counter(_key(anno[key]) for anno in relevant if key in anno)
+        missing = len(relevant) - sum(values.values())
+        if missing and key not in inherited:
+            # annotations without the key would pick up the new default
+            continue
+        value, count = values.most_common(1)[0]
+        value = json.loads(value)
+        if missing and inherited[key] == value:
+            missing = 0
+        if count <= missing:
+            continue
+        for anno in relevant:
+            if key not in anno:
+                anno[key] = inherited[key]
+            elif anno[key] == value:
+                del anno[key]
+        defaults[key] = value
+
+    for anno in annotations:
+        for key in coordinate_keys:
+            if key in anno:
+                anno[key] = _round(anno[key], decimals)
+    return annotations
+
+
+def compact_figure(figure, decimals=4):
+    '''compact version of a figure (a plotly figure or its dict), coordinates are rounded to decimals'''
+    if hasattr(figure, 'layout'):
+        # to_dict would encode the arrays as base64 before they can be rounded
+        figure = dict(data=[trace.to_plotly_json() for trace in figure.data], layout=figure.layout.to_plotly_json())
+    layout = dict(figure.get('layout', {}))
+    data = []
+    for trace in figure.get('data', []):
+        trace = dict(trace)
+        for key in ('x', 'y'):
+            if key in trace:
+                trace[key] = _round(trace[key], decimals)
+        data.append(trace)
+
+    template = dict(layout.get('template', {}))
+    template_layout = dict(template.get('layout', {}))
+    if 'data' in template:
+        # only the defaults of the trace types in the figure do anything
+        used = set(trace.get('type', 'scatter') for trace in data)
+        template['data'] = {name: value for name, value in template['data'].items() if name in used}
+    if 'annotations' in layout:
+        defaults = dict(template_layout.get('annotationdefaults', {}))
+        layout['annotations'] = _compact_annotations(layout['annotations'], defaults, decimals)
+        template_layout['annotationdefaults'] = defaults
+    if template_layout:
+        template['layout'] = template_layout
+    if template:
+        layout['template'] = template
+    return _sorted(dict(data=data, layout=layout))
+
+
+def to_compact_json(figure, decimals=4):
+    '''minimal json of a figure, the same figure always gives the same bytes'''
+    return json.dumps(compact_figure(figure, decimals), separators=(',', ':'), sort_keys=True, allow_nan=False)
+
+
+def to_compact_html(figure, decimals=4, include_plotlyjs='cdn'):
+    '''html page of the compact figure with a fixed div id so it is deterministic too'''
+    import plotly.io as pio
+    return pio.to_html(compact_figure(figure, decimals), include_plotlyjs=include_plotlyjs, div_id='lsd-scheme',
+                       validate=False)
+
+
+def write_compact(figure, filename, fmt=None, decimals=4, include_plotlyjs='cdn'):
+    '''write the compact json or html (from the extension unless fmt is given) of figure to filename,
+    returns the size in bytes of plotly's own export and of the compact one'''
+    import plotly.io as pio
+    fmt = fmt or filename.rsplit('.', 1)[-1].lower()
+    if fmt == 'json':
+        before = pio.to_json(figure)
+        text = to_compact_json(figure, decimals)
+    elif fmt == 'html':
+        before = pio.to_html(figure, include_plotlyjs=include_plotlyjs)
+        text = to_compact_html(figure, decimals, include_plotlyjs)
+    else:
+        raise ValueError(f"fmt must be 'json' or 'html' not {fmt!r}")
+    with open(filename, 'w') as f:
+        f.write(text)
+    return dict(before=len(before.encode()), after=len(text.encode()))
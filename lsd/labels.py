@@ -0,0 +1,160 @@
+'''placing level and gamma labels so they don't overlap
+
+labels are boxes estimated from their text and font size. A sweep over the boxes sorted by their
+left edge groups the labels whose x extents overlap, inside a group the labels are sorted by y and
+moved apart with the smallest total (least squares) shift that leaves no two overlapping, a pool
+adjacent violators pass that is linear after the sort. Labels moved further than a fraction of
+their height can get leader lines back to where they belong'''
+import re
+import warnings
+import numpy as np
+
+# size of the text of a label in units of the font size, a rough average over digits and letters
+char_width = 0.6
+line_height = 1.3
+# plotly's default font size, figure size and what the anchors mean for the box of a label
+default_font_size = 12
+default_figure_size = (700, 450)
+_anchor_offset = {'left': 0, 'center': -0.5, 'right': -1, 'bottom': 0, 'middle': -0.5, 'top': -1}
+_tags = re.compile(r'<[^>]*>')
+
+
+def pool_adjacent_violators(values, weights=None):
+    '''non decreasing sequence closest (weighted least squares) to values'''
+    values = np.asarray(values, dtype=float)
+    weights = np.ones(len(values)) if weights is None else np.asarray(weights, dtype=float)
+    # blocks of pooled values as (mean, weight, count) stacks
+    means, totals, counts = [], [], []
+    for value, weight in zip(values.tolist(), weights.tolist()):
+        mean, total, count = value, weight, 1
+        while means and means[-1] > mean:
+            last_total = totals.pop()
+            mean = (means.pop()*last_total + mean*total)/(last_total + total)
+            total += last_total
+            count += counts.pop()
+        means.append(mean)
+        totals.append(total)
+        counts.append(count)
+    return np.repeat(means, counts)
+
+
+def spread(targets, sizes, gap=0., bounds=None):
+    '''positions as close as possible to the sorted targets with the centres of neighbours at least
+    half their sizes plus gap apart. With bounds=(lo, hi) the boxes stay between lo and hi, the space
+    between neighbours shrinks in proportion (so they overlap evenly) when they don't fit'''
+    targets = np.asarray(targets, dtype=float)
+    sizes = np.asarray(sizes, dtype=float)
+    if len(targets) < 2 and bounds is None:
+        return targets.copy()
+    # shifting by the least distance each label needs from the first turns it into an isotonic fit
+    offsets = np.concatenate(([0.], np.cumsum((sizes[:-1] + sizes[1:])/2 + gap)))
+    fit = pool_adjacent_violators(targets - offsets)
+    if bounds is None:
+        return fit + offsets
+    lo = bounds[0] + sizes[0]/2
+    room = bounds[1] - sizes[-1]/2 - lo
+    if room < offsets[-1]:
+        offsets *= max(room, 0)/offsets[-1]
+    # the same bounds for every shifted position, so clipping the unbounded fit is the bounded one
+    return np.clip(fit, lo, max(lo + room - offsets[-1], lo)) + offsets
+
+
+def sweep_groups(lo, hi):
+    '''group number of every interval [lo, hi), intervals overlapping directly or through others share one'''
+    lo = np.asarray(lo, dtype=float)
+    hi = np.asarray(hi, dtype=float)
+    order = np.argsort(lo, kind='stable')
+    # a new group starts where an interval begins after every earlier one has ended
+    reach = np.maximum.accumulate(hi[order])
+    starts = np.empty(len(lo), dtype=bool)
+    starts[:1] = True
+    starts[1:] = lo[order][1:] >= reach[:-1]
+    groups = np.empty(len(lo), dtype=np.intp)
+    groups[order] = np.cumsum(starts) - 1
+    return groups
+
+
+def text_size(text, font_size=default_font_size):
+    '''estimated (width, height) in pixels of a label, html tags don't count'''
+    lines = _tags.sub('', text.replace('<br>', '\n')).split('\n')
+    return char_width*font_size*max(len(line) for line in lines), line_height*font_size*len(lines)
+
+
+def data_per_pixel(layout, x_range, y_range):
+    '''data units per pixel along x and y of a figure layout dict showing x_range and y_range'''
+    width = layout.get('width') or default_figure_size[0]
+    height = layout.get('height') or default_figure_size[1]
+    margin = layout.get('margin', {})
+    width -= margin.get('l', 80) + margin.get('r', 80)
+    height -= margin.get('t', 100) + margin.get('b', 80)
+    return (x_range[1] - x_range[0])/max(width, 1), (y_range[1] - y_range[0])/max(height, 1)
+
+
+def label_boxes(annotations, x_scale, y_scale):
+    '''(x lo, x hi, y centre, height) in data units of annotation dicts, textangle=-90 or 90 labels
+    run along y'''
+    boxes = np.empty((len(annotations), 4))
+    for i, anno in enumerate(annotations):
+        width, height = text_size(anno.get('text', ''), anno.get('font', {}).get('size') or default_font_size)
+        if abs(anno.get('textangle', 0) or 0) == 90:
+            width, height = height, width
+        width *= x_scale
+        height *= y_scale
+        lo = anno['x'] + width*_anchor_offset.get(anno.get('xanchor'), -0.5)
+        bottom = anno['y'] + height*_anchor_offset.get(anno.get('yanchor'), -0.5)
+        boxes[i] = lo, lo + width, bottom + height/2, height
+    return boxes
+
+
+def resolve_labels(annotations, x_scale, y_scale, gap=0.1, leader_lines=True, leader_length=12, threshold=0.5,
+                   y_range=None):
+    '''move label annotation dicts up or down (in place) so none overlap, the units are those of the axes
+    with x_scale and y_scale data units per pixel. gap is the space left between labels in line heights.
+    With y_range labels stay inside it (or inside where they already reach past it), labels that don't fit
+    are squeezed together with a warning. With leader_lines the left or right anchored labels moved more
+    than threshold times their height are pushed out by leader_length pixels and joined to where they were
+    by a line, returns the x and y of those lines with nan between them'''
+    if not annotations:
+        return np.array([]), np.array([])
+    boxes = label_boxes(annotations, x_scale, y_scale)
+    groups = sweep_groups(boxes[:,0], boxes[:,1])
+    order = np.lexsort((boxes[:,2], groups))
+    centre = boxes[:,2].copy()
+    bounds = None
+    if y_range is not None:
+        bounds = (min(y_range[0], (centre - boxes[:,3]/2).min()), max(y_range[1], (centre + boxes[:,3]/2).max()))
+    crowded = 0
+    # the groups are contiguous runs of the sorted labels
+    runs = np.split(order, np.flatnonzero(np.diff(groups[order])) + 1)
+    for run in runs:
+        run_gap = gap*np.median(boxes[run,3])
+        if bounds is not None and boxes[run,3].sum() + run_gap*(len(run) - 1) > bounds[1] - bounds[0]:
+            crowded += len(run)
+        centre[run] = spread(boxes[run,2], boxes[run,3], run_gap, bounds)
+    if crowded:
+        warnings.warn(f'{crowded} labels don\'t fit in the height of the scheme and still overlap, '
+                      'a taller figure or a smaller font leaves them room')
+    shift = centre - boxes[:,2]
+    for anno, moved in zip(annotations, shift.tolist()):
+        anno['y'] += moved
+
+    if not leader_lines:
+        return np.array([]), np.array([])
+    xs, ys = [], []
+    for i in np.flatnonzero(np.abs(shift) > threshold*boxes[:,3]).tolist():
+        anno = annotations[i]
+        side = {'left': 1, 'right': -1}.get(anno.get('xanchor'))
+        if side is None or anno.get('textangle', 0):
+            continue
+        x = anno['x']
+        anno['x'] = x + side*leader_length*x_scale
+        xs += [x, anno['x'], np.nan]
+        ys += [anno['y'] - shift[i], anno['y'], np.nan]
+    return np.array(xs[:-1], dtype=float), np.array(ys[:-1], dtype=float)
+
+
+def gamma_label_annotations(transition_x, py, dy, gammas, font_size=10):
+    '''vertical gamma energy labels alongside the arrows, halfway between parent and daughter'''
+    return [dict(x=x, y=(parent + daughter)/2, xref='x', yref='y', text=text, textangle=-90, xanchor='right',
+                 yanchor='middle', showarrow=False, font=dict(size=font_size))
+            for x, parent, daughter, text in zip(transition_x, py, dy, gammas)]
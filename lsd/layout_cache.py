@@ -0,0 +1,125 @@
+'''on disk cache of scheme layouts
+
+the spacing of the levels and the column of every transition only depend on the level energies,
+the (sorted) transitions and the layout options, not on colours, fonts or styles. A LayoutCache
+keeps them in one .npz file per layout, keyed by a hash of exactly those inputs, so restyling a
+scheme skips the layout entirely. The directory is kept under max_bytes by removing the least
+recently used layouts'''
+import hashlib
+import os
+import zipfile
+import numpy as np
+
+LAYOUT_CACHE_VERSION = 1
+
+
+def default_directory():
+    '''$LSD_CACHE_DIR or the user's cache directory'''
+    if os.environ.get('LSD_CACHE_DIR'):
+        return os.environ['LSD_CACHE_DIR']
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'lsd', 'layouts')
+
+
+class LayoutCache:
+    '''least recently used store of layouts in directory, at most max_bytes on disk'''
+    def __init__(self, directory=None, max_bytes=256*2**20):
+        self.directory = directory or default_directory()
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    def key(energies, parents, daughters, **options):
+        '''hash of the level energies, the parent and daughter energy of each transition in placement
+        order and the layout options'''
+        sha = hashlib.sha256(f'{LAYOUT_CACHE_VERSION}'.encode())
+        for arr in (energies, parents, daughters):
+            arr = np.ascontiguousarray(arr, dtype=float)
+            sha.update(str(len(arr)).encode())
+            sha.update(arr.tobytes())
+        for name in sorted(options):
+            value = options[name]
+            if isinstance(value, (np.ndarray, list, tuple)):
+                value = np.ascontiguousarray(value, dtype=float).tobytes()
+            sha.update(f'{name}={value!r};'.encode())
+        return sha.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f'{key}.npz')
+
+    def get(self, key):
+        '''the arrays stored under key or None'''
+        path = self._path(key)
+        try:
+            with np.load(path) as f:
+                state = {name: f[name] for name in f.files}
+            # mark it as recently used
+            os.utime(path)
+        except (OSError, ValueError, KeyError, EOFError, zipfile.BadZipFile):
+            # a missing, unreadable or half written layout is a miss
+            return None
+        return state
+
+    def put(self, key, state):
+        '''store a dict of arrays under key, quietly does nothing if the directory isn't writable or is full'''
+        tmp = os.path.join(self.directory, f'{key}.{os.getpid()}.tmp.npz')
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            np.savez(tmp, **state)
+            os.replace(tmp, self._path(key))
+            self.evict()
+        except OSError:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+
+    def entries(self):
+        '''(last used, size, path) of every stored layout, oldest first'''
+        entries = []
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return entries
+        for name in names:
+            if not name.endswith('.npz') or name.endswith('.tmp.npz'):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, path))
+        return sorted(entries)
+
+    @property
+    def nbytes(self):
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self):
+        '''remove the least recently used layouts until the cache fits in max_bytes'''
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+
+    def clear(self):
+        for _, _, path in self.entries():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def get_layout_cache(cache):
+    '''turn the layout_cache argument of a function into a LayoutCache or None, True uses the default one'''
+    if cache is None or cache is False:
+        return None
+    if cache is True:
+        return LayoutCache()
+    return cache
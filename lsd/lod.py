@@ -0,0 +1,127 @@
+'''level of detail for interactive views of large schemes
+
+    canvas.read_from_nlv('scheme.nlv', render='lod')
+    canvas.scheme.show_range(1000, 1500)   # the transitions and labels worth showing over that y range
+    widget = canvas.detail_widget()        # a FigureWidget that does this on every zoom
+
+every transition gets a tier from its rank by strength, its branching ratio (or an equal share of
+what the given ones leave for those without) times its energy span. The max_visible strongest are
+tier 0 and every further tier holds step times as many as all before it, so each time the visible y
+range shrinks by step one more tier is shown and about as many transitions stay on screen. The
+transitions are kept sorted by tier and inside a tier by their lower end, so the transitions of a
+tier in a y range are two binary searches. Levels take the tier of their strongest transition so
+their labels thin out the same way'''
+import numpy as np
+
+
+def strengths(parent, branching_ratio, n_levels=None):
+    '''branching ratios with the missing ones filled in by an equal share of what the given ones of the
+    same parent leave over'''
+    branching_ratio = np.asarray(branching_ratio, dtype=float)
+    parent = np.asarray(parent, dtype=np.intp)
+    n_levels = int(parent.max()) + 1 if n_levels is None and len(parent) else (n_levels or 0)
+    given = ~np.isnan(branching_ratio)
+    total = np.bincount(parent, weights=np.where(given, branching_ratio, 0), minlength=n_levels)
+    n_missing = np.bincount(parent, weights=~given, minlength=n_levels)
+    share = np.clip(1 - total, 0, 1)/np.maximum(n_missing, 1)
+    return np.where(given, branching_ratio, share[parent])
+
+
+def tiers(scores, max_visible=500, step=2):
+    '''tier of each score, the max_visible highest are tier 0 and tier t holds max_visible*step**t all
+    together. Returns the tiers and the number of transitions shown up to each tier'''
+    scores = np.asarray(scores, dtype=float)
+    n = len(scores)
+    counts = [max_visible]
+    while counts[-1] < n:
+        counts.append(counts[-1]*step)
+    counts = np.minimum(counts, n)
+    # rank 0 is the highest score, ties keep their order
+    rank = np.empty(n, dtype=np.intp)
+    rank[np.argsort(-scores, kind='stable')] = np.arange(n)
+    return np.searchsorted(counts, rank, side='right'), counts
+
+
+class DetailIndex:
+    '''tiers of the transitions of a drawn scheme, py and dy are the y the transitions are drawn
+    between, span their energy span (the drawn one by default), strength their branching ratio or
+    strengths() of it. y_range is the full y range of the scheme'''
+    def __init__(self, py, dy, strength, span=None, y_range=None, max_visible=500, step=2):
+        py = np.asarray(py, dtype=float)
+        dy = np.asarray(dy, dtype=float)
+        span = np.abs(py - dy) if span is None else np.abs(np.asarray(span, dtype=float))
+        self.step = step
+        self.max_visible = max_visible
+        self.lo = np.minimum(py, dy)
+        self.hi = np.maximum(py, dy)
+        if y_range is None:
+            y_range = (self.lo.min(), self.hi.max()) if len(py) else (0, 1)
+        self.y_range = tuple(float(y) for y in y_range)
+        self.tier, self.counts = tiers(np.nan_to_num(strength)*span, max_visible, step)
+
+        # sorted by tier then lower end, the transitions of tier t are order[starts[t]:starts[t+1]]
+        self.order = np.lexsort((self.lo, self.tier))
+        self.starts = np.searchsorted(self.tier[self.order], np.arange(len(self.counts) + 1))
+        self.sorted_lo = self.lo[self.order]
+        # the longest transition of each tier bounds how far below a range one may start
+        longest = self.hi[self.order] - self.sorted_lo
+        self.longest = np.array([longest[a:b].max() if b > a else 0.
+                                 for a, b in zip(self.starts[:-1], self.starts[1:])])
+
+    @property
+    def n_tiers(self):
+        return len(self.counts)
+
+    def __len__(self):
+        return len(self.tier)
+
+    def __repr__(self):
+        return f"DetailIndex({len(self)} transitions, {self.n_tiers} tiers)"
+
+    def tier_of(self, y0, y1):
+        '''highest tier shown with y0 to y1 visible, one more for each time the full range shrinks by step'''
+        full = self.y_range[1] - self.y_range[0]
+        height = abs(y1 - y0)
+        if height <= 0 or full <= 0:
+            return self.n_tiers - 1
+        t = int(np.floor(np.log(full/height)/np.log(self.step) + 1e-9))
+        return min(max(t, 0), self.n_tiers - 1)
+
+    def visible(self, y0, y1, tier=None):
+        '''transition numbers of the transitions up to tier (that of y0 to y1 by default) with some part
+        between y0 and y1'''
+        y0, y1 = min(y0, y1), max(y0, y1)
+        tier = self.tier_of(y0, y1) if tier is None else min(tier, self.n_tiers - 1)
+        found = []
+        for t in range(tier + 1):
+            a, b = self.starts[t], self.starts[t + 1]
+            lo = a + np.searchsorted(self.sorted_lo[a:b], y0 - self.longest[t], side='left')
+            hi = a + np.searchsorted(self.sorted_lo[a:b], y1, side='right')
+            candidates = self.order[lo:hi]
+            found.append(candidates[self.hi[candidates] >= y0])
+        return np.concatenate(found) if found else np.array([], dtype=np.intp)
+
+    def level_tiers(self, parent, daughter, n_levels):
+        '''tier of each level, that of the strongest transition to or from it, the last for levels
+        without any'''
+        level_tier = np.full(n_levels, self.n_tiers - 1, dtype=np.intp)
+        np.minimum.at(level_tier, np.asarray(parent, dtype=np.intp), self.tier)
+        np.minimum.at(level_tier, np.asarray(daughter, dtype=np.intp), self.tier)
+        return level_tier
+
+
+def detail_widget(canvas):
+    '''FigureWidget of a canvas drawn with render='lod' that shows more detail as it is zoomed in,
+    needs plotly's widget dependencies (anywidget, ipywidgets for older plotly)'''
+    import plotly.graph_objects as go
+    scheme = canvas.scheme
+    if scheme is None or scheme.detail is None:
+        raise ValueError("detail_widget needs a canvas drawn with render='lod'")
+    widget = go.FigureWidget(canvas)
+
+    def on_range(layout, y_range):
+        if y_range is None:
+            y_range = scheme.detail.y_range
+        scheme.show_range(*y_range, figure=widget)
+    widget.layout.on_change(on_range, 'yaxis.range')
+    return widget
@@ -0,0 +1,145 @@
+'''indexed queries over a parsed level scheme, for matching measured gamma peaks
+
+    scheme = Scheme.read('scheme.nlv')
+    scheme.within(963.5, 0.5)            # transitions with a gamma within 963.5 +- 0.5 keV
+    offsets, found = scheme.match(peaks)  # the same for thousands of peaks at once
+    scheme.feeding(1778.33), scheme.depopulating(1778.33)
+
+the gammas are kept sorted so a range query is two binary searches, and the transitions into and
+out of each level are compressed adjacency lists (an offsets array into one array of transition
+numbers per direction). Queries return numpy arrays of transition (or level) numbers, indices into
+scheme.transitions (scheme.levels)'''
+import numpy as np
+from .cache import to_float
+from .tables import LevelTable, TransitionTable
+
+
+def _csr(keys, n):
+    '''offsets and members of n buckets holding the positions of keys, positions stay in order in a bucket'''
+    order = np.argsort(keys, kind='stable')
+    offsets = np.zeros(n + 1, dtype=np.intp)
+    np.cumsum(np.bincount(keys, minlength=n), out=offsets[1:])
+    return offsets, order
+
+
+def _closest(sorted_values, values):
+    '''position in sorted_values of the value closest to each of values, ties go to the lower one'''
+    if len(sorted_values) == 1:
+        return np.zeros(len(values), dtype=np.intp)
+    i = np.clip(np.searchsorted(sorted_values, values), 1, len(sorted_values) - 1)
+    return i - (values - sorted_values[i-1] <= sorted_values[i] - values)
+
+
+class Scheme:
+    '''levels and transitions of a scheme with the indices to query them, from the lists of read or a
+    LevelTable and TransitionTable. A missing gamma is taken to be the parent minus the daughter energy'''
+    def __init__(self, levels, transitions, tolerance=1e-6):
+        self.transitions = transitions
+        self.tolerance = tolerance
+        if isinstance(transitions, TransitionTable):
+            # the records index the level table of the transitions
+            self.levels = transitions.levels
+            self.energy = transitions.levels.energy
+            self.parent = transitions.parent.astype(np.intp)
+            self.daughter = transitions.daughter.astype(np.intp)
+            given = transitions.gamma
+            self.branching_ratio = transitions.branching_ratio
+        else:
+            self.levels = levels if isinstance(levels, LevelTable) else list(levels)
+            index = {id(level): i for i, level in enumerate(self.levels)}
+            self.energy = np.array([level.energy for level in self.levels], dtype=float)
+            self.parent = np.array([index[id(transition.parent)] for transition in transitions], dtype=np.intp)
+            self.daughter = np.array([index[id(transition.daughter)] for transition in transitions], dtype=np.intp)
+            given = np.array([to_float(transition.gamma) for transition in transitions], dtype=float)
+            self.branching_ratio = np.array([to_float(transition.branching_ratio) for transition in transitions], dtype=float)
+        self.gamma = np.where(np.isnan(given), self.energy[self.parent] - self.energy[self.daughter], given)
+
+        # sorted gammas and levels for binary searches
+        self.gamma_order = np.argsort(self.gamma, kind='stable')
+        self.sorted_gamma = self.gamma[self.gamma_order]
+        self.level_order = np.argsort(self.energy, kind='stable')
+        self.sorted_energy = self.energy[self.level_order]
+        # transitions into (feeding) and out of (depopulating) each level
+        self._feeding = _csr(self.daughter, len(self.energy))
+        self._depopulating = _csr(self.parent, len(self.energy))
+
+    @classmethod
+    def read(cls, filename, tolerance=1e-6, cache: bool = True):
+        '''Scheme of an .nlv file'''
+        from .read import read
+        return cls(*read(filename, tolerance, cache=cache), tolerance=tolerance)
+
+    def __len__(self):
+        return len(self.gamma)
+
+    def __repr__(self):
+        return f"Scheme({len(self.energy)} levels, {len(self.gamma)} transitions)"
+
+    def match(self, peaks, tolerance=0.5):
+        '''transitions with a gamma within tolerance (a scalar or one per peak) of each of many peaks.
+        Returns offsets and transition numbers, the matches of peak i are found[offsets[i]:offsets[i+1]]
+        in order of gamma energy'''
+        peaks = np.atleast_1d(np.asarray(peaks, dtype=float))
+        lo = np.searchsorted(self.sorted_gamma, peaks - tolerance, side='left')
+        hi = np.searchsorted(self.sorted_gamma, peaks + tolerance, side='right')
+        counts = np.maximum(hi - lo, 0)
+        offsets = np.zeros(len(peaks) + 1, dtype=np.intp)
+        np.cumsum(counts, out=offsets[1:])
+        # position of every match in the sorted gammas, each peak's run starts at its lo
+        positions = np.arange(offsets[-1]) - np.repeat(offsets[:-1] - lo, counts)
+        return offsets, self.gamma_order[positions]
+
+    def within(self, energy, tolerance=0.5):
+        '''transition numbers of the gammas within tolerance of energy'''
+        lo = np.searchsorted(self.sorted_gamma, energy - tolerance, side='left')
+        hi = np.searchsorted(self.sorted_gamma, energy + tolerance, side='right')
+        return self.gamma_order[lo:hi]
+
+    def nearest(self, peaks):
+        '''transition number of the closest gamma to each peak and the peak minus that gamma'''
+        peaks = np.atleast_1d(np.asarray(peaks, dtype=float))
+        if not len(self.sorted_gamma):
+            return np.full(len(peaks), -1, dtype=np.intp), np.full(len(peaks), np.nan)
+        found = self.gamma_order[_closest(self.sorted_gamma, peaks)]
+        return found, peaks - self.gamma[found]
+
+    def level_index(self, energies, tolerance=None):
+        '''level number of each energy, -1 where no level is within tolerance (the tolerance of the
+        scheme by default)'''
+        tolerance = self.tolerance if tolerance is None else tolerance
+        energies = np.asarray(energies, dtype=float)
+        flat = np.atleast_1d(energies)
+        if not len(self.sorted_energy):
+            found = np.full(len(flat), -1, dtype=np.intp)
+        else:
+            i = _closest(self.sorted_energy, flat)
+            found = np.where(np.abs(self.sorted_energy[i] - flat) <= tolerance, self.level_order[i], -1)
+        return found[0] if energies.ndim == 0 else found
+
+    def _level(self, level):
+        '''level number of a level or its energy'''
+        energy = getattr(level, 'energy', level)
+        i = self.level_index(energy)
+        if i < 0:
+            raise KeyError(f"no level at {energy!r}")
+        return i
+
+    def feeding(self, level):
+        '''transition numbers of the transitions into a level (a Level or its energy)'''
+        offsets, members = self._feeding
+        i = self._level(level)
+        return members[offsets[i]:offsets[i+1]]
+
+    def depopulating(self, level):
+        '''transition numbers of the transitions out of a level (a Level or its energy)'''
+        offsets, members = self._depopulating
+        i = self._level(level)
+        return members[offsets[i]:offsets[i+1]]
+
+    def feeding_counts(self):
+        '''number of transitions into each level'''
+        return np.diff(self._feeding[0])
+
+    def depopulating_counts(self):
+        '''number of transitions out of each level'''
+        return np.diff(self._depopulating[0])
@@ -1,5 +1,6 @@
 from dataclasses import dataclass
 import numpy as np
+import os
 
 @dataclass
 class Level:
@@ -18,60 +19,189 @@ class Transition():
     branching_ratio: float = None
 
 
-def read(filename):
-    levels = []
-    transitions = []
+class LevelRegistry:
+    '''hash index of the levels in a scheme, hands out one shared Level per energy so that
+    every transition from or to a level points at the same object'''
+    def __init__(self, tolerance=1e-6):
+        '''energies closer than tolerance are treated as the same level (814.98 vs 814.980)'''
+        self.tolerance = tolerance
+        self.levels = []
+        self._index = {}
+        
+    def __len__(self):
+        return len(self.levels)
     
-    with open(filename) as f:
-        # iterate through the lines
-        for line in f:
-            # seperate out the three different columns
-            line = line.replace(' ','')
-            line = line.strip()
-            
-            if len(line) == 0:
-                # if the line is empty skip it
-                continue    
-                
-            gamma_collect = False
-            cols = line.split('>')
-            
-            # handle the two levels
-            for i,col in enumerate((cols[0],cols[2])):
-                args = col.split(',')
-                for j, arg in enumerate(args):
-                    if arg == 'None':
-                        args[j] = None
-                        continue
-                    try:
-                        arg = float(arg)
-                        args[j] = float(args[j])
-                    except ValueError:
-                        pass
-                
-                lev = Level(*args)
-                if i == 0:
-                    parent = lev
-                else:
-                    daughter = lev
-                    
-                found = False
-                for level in levels:
-                    if lev.energy == level.energy:
-                        found = True
-                if not found:
-                    levels.append(lev)
-            
-            
-            # handle the transition  
-            args = cols[1].split(',')
-            for j, arg in enumerate(args):
-                    try:
-                        args[j] = float(args[j])
-                    except ValueError:
-                        args[j] = None   
-                        
-            transition = Transition(parent, daughter, *args)
-            transitions.append(transition)           
-                    
-    return levels, transitions
\ No newline at end of file
+    def __iter__(self):
+        return iter(self.levels)
+    
+    def __contains__(self, energy):
+        return self.get(energy) is not None
+        
+    def _key(self, energy):
+        # bin float energies by the tolerance, anything else is used as is
+        if isinstance(energy, float) and self.tolerance:
+            return round(energy/self.tolerance)
+        return energy
+    
+    def get(self, energy):
+        '''return the level with this energy or None if it hasn't been seen'''
+        if not (isinstance(energy, float) and self.tolerance):
+            return self._index.get(energy)
+        key = self._key(energy)
+        # a neighbouring bin can hold an energy within tolerance
+        for k in (key, key-1, key+1):
+            level = self._index.get(k)
+            if level is not None and abs(level.energy - energy) <= self.tolerance:
+                return level
+        return None
+    
+    def add(self, energy=None, spin=None, parity=None):
+        '''return the shared level for this energy, creating it if needed and filling in
+        spin/parity if they weren't known yet'''
+        level = self.get(energy)
+        if level is None:
+            level = Level(energy, spin, parity)
+            self._index[self._key(energy)] = level
+            self.levels.append(level)
+            return level
+        
+        if level.spin is None:
+            level.spin = spin
+        if level.parity is None:
+            level.parity = parity
+        return level
+    
+    def discard(self, level):
+        '''forget a level, e.g. once no transition goes to or from it any more'''
+        key = self._key(level.energy)
+        if self._index.get(key) is level:
+            del self._index[key]
+        self.levels.remove(level)
+
+
+class NLVSyntaxError(ValueError):
+    '''raised for a line of an .nlv file that can't be parsed'''
+    def __init__(self, message, lineno=None, line=None):
+        self.lineno = lineno
+        self.line = line
+        if lineno is not None:
+            message = f"line {lineno}: {message}: {line!r}"
+        super().__init__(message)
+
+
+def _level_args(col):
+    '''convert the comma seperated fields of a level to energy, spin, parity'''
+    args = col.split(',')
+    for j, arg in enumerate(args):
+        if arg == 'None':
+            args[j] = None
+            continue
+        try:
+            args[j] = float(arg)
+        except ValueError:
+            pass
+    return args
+
+
+def _transition_args(col):
+    '''convert the comma seperated fields of a transition to gamma, branching ratio'''
+    args = col.split(',')
+    for j, arg in enumerate(args):
+        try:
+            args[j] = float(arg)
+        except ValueError:
+            args[j] = None
+    return args
+
+
+def parse_line(line):
+    '''split one line of an .nlv file into the parent, transition and daughter fields,
+    returns None for an empty line'''
+    # seperate out the three different columns
+    line = line.replace(' ','')
+    line = line.strip()
+    
+    if len(line) == 0:
+        # if the line is empty skip it
+        return None
+    
+    cols = line.split('>')
+    if len(cols) != 3:
+        raise NLVSyntaxError(f"expected 'parent > transition > daughter' but found {len(cols)} column(s)")
+    
+    parent, daughter = _level_args(cols[0]), _level_args(cols[2])
+    for args in (parent, daughter):
+        if len(args) > 3:
+            raise NLVSyntaxError("a level takes at most energy, spin, parity")
+        if not isinstance(args[0], float):
+            raise NLVSyntaxError(f"a level energy has to be a number, not {args[0]!r}")
+    transition = _transition_args(cols[1])
+    if len(transition) > 2:
+        raise NLVSyntaxError("a transition takes at most gamma, branching ratio")
+    return parent, transition, daughter
+
+
+def _lines(source):
+    '''yield the lines of a filename, file-like object or iterable of lines'''
+    if isinstance(source, (str, os.PathLike)):
+        with open(source) as f:
+            yield from f
+    else:
+        yield from source
+        
+
+def iter_read(source, registry=None, tolerance=1e-6):
+    '''lazily parse an .nlv file yielding one Transition per line, source can be a filename,
+    an open file or any iterable of lines. Only the unique levels are kept in memory, pass a
+    LevelRegistry to get at them afterwards'''
+    if registry is None:
+        registry = LevelRegistry(tolerance)
+        
+    for lineno, line in enumerate(_lines(source), 1):
+        try:
+            record = parse_line(line)
+            if record is None:
+                continue
+            parent_args, transition_args, daughter_args = record
+            parent = registry.add(*parent_args)
+            daughter = registry.add(*daughter_args)
+        except NLVSyntaxError as e:
+            raise NLVSyntaxError(e.args[0], lineno, line.rstrip('\n')) from None
+        
+        yield Transition(parent, daughter, *transition_args)
+
+
+def read(filename, tolerance=1e-6, select: callable = None, cache: bool = True, validate: bool = False):
+    '''read an .nlv file, returns the unique levels and the transitions between them.
+    select is applied to each transition as it is parsed and only those it returns True for are kept.
+    With cache the parsed scheme is kept in a binary sidecar directory, .<name>.lsdcache next to the file,
+    and reused until the file changes. Where that directory can't be written (a read only or full disk)
+    the file is just parsed, pass cache=False to never write it, e.g. in shared data directories.
+    validate checks the scheme with lsd.validate.validate and warns about any problems'''
+    levels, transitions = _read(filename, tolerance, select, cache)
+    if validate:
+        from .validate import validate as check
+        check(levels, transitions).warn()
+    return levels, transitions
+
+
+def _read(filename, tolerance, select, cache):
+    if cache and isinstance(filename, (str, os.PathLike)):
+        from .cache import read_cached
+        levels, transitions = read_cached(filename, tolerance)
+        if select is None:
+            return levels, transitions
+        transitions = [transition for transition in transitions if select(transition)]
+    else:
+        registry = LevelRegistry(tolerance)
+        if select is None:
+            transitions = list(iter_read(filename, registry))
+            return registry.levels, transitions
+        transitions = [transition for transition in iter_read(filename, registry) if select(transition)]
+    
+    # only keep the levels the selected transitions touch, in order of appearance
+    levels = {}
+    for transition in transitions:
+        levels.setdefault(id(transition.parent), transition.parent)
+        levels.setdefault(id(transition.daughter), transition.daughter)
+    return list(levels.values()), transitions
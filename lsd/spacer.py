@@ -1,150 +1,449 @@
 import warnings
 import numpy as np
-import copy
+from bisect import bisect_left, bisect_right
+import heapq
+from dataclasses import dataclass
+from concurrent.futures import ProcessPoolExecutor
+from .stats import Stats, get_stats
+from .tables import LevelTable, TransitionTable
+from .layout_cache import get_layout_cache
 
 class SpaceManager:
     '''class to oversee the placement of levels and decays so they don't overlap'''
-    def __init__(self, xspace, levels, spacing=None, reverse=False):
+    def __init__(self, xspace, levels, spacing=None, reverse=False, stats=None):
         '''xspace is valid points in x to connect a transition to, levels are the different level,
-        normalize regions even space the level in region ((lower,upper),) support multiple regions'''
+        normalize regions even space the level in region ((lower,upper),) support multiple regions.
+        levels can be a LevelTable.
+        stats (a lsd.stats.Stats) counts the get_path calls, the columns they probe and how often they run out of space'''
+        self.stats = get_stats(stats)
         
-        # dictionary for translating level to index in matrix
-        self.dict_level = {}
         # track the allowed x positions
         self.xspace = xspace
         
-        # change levels to a list of floats so we can sort them
-        if not isinstance(levels, list):
-            levels = list(levels)
-        
-        
         # sort levels so that there are in correct order this is necessary for identifying overlaps in grid
-        
-        self.levels = copy.deepcopy(levels)
-        self.levels.sort()
-        for i,level in enumerate(self.levels):
-            # assign index to each level name
-            self.dict_level[str(level)] = i
+        if isinstance(levels, LevelTable):
+            levels = levels.energy
+        elif not isinstance(levels, np.ndarray):
+            levels = list(levels)
+        self.levels = np.sort(np.asarray(levels, dtype=float))
+        # dictionary for translating level to index in matrix
+        self.dict_level = {level: i for i, level in enumerate(self.levels.tolist())}
             
-        # make a matrix of proper size to track what nodes have been taken
-        self.space = np.zeros((len(levels),len(xspace)))
+        # track what nodes have been taken, each column keeps the taken rows as sorted
+        # half open intervals [start, end) of level indices
+        self._starts = [[] for _ in range(len(xspace))]
+        self._ends = [[] for _ in range(len(xspace))]
         
         # apply normalization to regions
+        self.spaced_y = self.levels.copy()
         if spacing != None:
-            # print(f'{spacing}, {reverse}')
             normalize_regions = self.get_normalized_regions(self.levels, spacing, reverse=reverse)
-            # print(normalize_regions)
-            self.spaced_y = copy.deepcopy(self.levels)
             self._make_room(normalize_regions, reverse=reverse)
             
         
     def _make_room(self, regions, reverse=False):
         '''function for calculating the spread out levels in a region'''
-        for region in regions:
-            count = 0
-            bool_lst = []
-            for level in self.levels:
-                # tag levels within the region
-                if level <= region[1] and level >= region[0]:
-                    count += 1 # track how many levels in region
-                    bool_lst.append(True)
-                # elif level == 2849.6:
-                #     print(f'wtf is this {region[0]}, {region[1]}')
-                else:
-                    bool_lst.append(False)
+        for lower, upper in regions:
+            # the levels within the region are a contiguous slice of the sorted levels
+            lo = np.searchsorted(self.levels, lower, side='left')
+            hi = np.searchsorted(self.levels, upper, side='right')
+            count = hi - lo
+            if count == 0:
+                continue
              
             # find even spacing of levels in that region
-            even_spacing = (region[1] - region[0])/count
-            track = 0
+            even_spacing = (upper - lower)/count
             
             if reverse:
-                rng = range(len(self.levels)-1,0,-1)
-                sign = -1
-                j = 1
+                # spread down from the top of the region, the lowest level never moves
+                lo = max(lo, 1)
+                self.spaced_y[lo:hi] = (-even_spacing*np.arange(hi-lo) + upper)[::-1]
             else:
-                rng = range(0,len(self.levels))
-                sign = 1
-                j = 0
-            
-            for i in rng:
-                flag = bool_lst[i]
-                # if tagged adjust the spaced_y to be correct
-                if flag:
-                    self.spaced_y[i] = sign*even_spacing*track + region[j]
-                    track += 1
+                self.spaced_y[lo:hi] = even_spacing*np.arange(count) + lower
                 
     
     def get_spaced_y(self, level):
         '''return properly spaced levels'''
-        i = self.dict_level[str(level)]
+        i = self.dict_level[level]
+        return self.spaced_y[i]
+    
+    def get_spaced_ys(self, levels):
+        '''get_spaced_y of an array of level energies at once, they must all be levels of the manager'''
+        # the last of equal levels like dict_level
+        i = np.searchsorted(self.levels, levels, side='right') - 1
         return self.spaced_y[i]
         
+    @property
+    def space(self):
+        '''dense (levels, xspace) matrix of the taken nodes'''
+        space = np.zeros((len(self.levels), len(self.xspace)))
+        for i, (starts, ends) in enumerate(zip(self._starts, self._ends)):
+            for start, end in zip(starts, ends):
+                space[start:end, i] = 1
+        return space
+    
+    def _is_free(self, column, start_i, end_i, inclusive=True):
+        '''check if the rows start_i to end_i (inclusive unless told otherwise) of a column are all untaken'''
+        # the taken interval starting closest below end_i is the only one that can overlap
+        bisect = bisect_right if inclusive else bisect_left
+        k = bisect(self._starts[column], end_i) - 1
+        return k < 0 or self._ends[column][k] <= start_i
+    
+    def _take(self, column, start_i, end_i):
+        '''mark the rows start_i to end_i (exclusive) of a column as taken'''
+        if end_i <= start_i:
+            return
+        k = bisect_right(self._starts[column], start_i)
+        self._starts[column].insert(k, start_i)
+        self._ends[column].insert(k, end_i)
+        
     def get_path(self, start_level, end_level):
         '''find viable path between parent and daughter level'''
-        end_i = self.dict_level[str(start_level)]
-        start_i = self.dict_level[str(end_level)]
-        # slice the relevant nodes (nothing else matters)
-        relevant_slice = self.space[start_i:end_i+1,:]
+        self.stats.count('get_path')
+        end_i = self.dict_level[start_level]
+        start_i = self.dict_level[end_level]
+        if end_i < start_i:
+            # nothing to pass through
+            return self.xspace[-1]
         
         # iterate backwards for cosmetic reasons
-        for i in range(len(relevant_slice.T)-1, -1, -1):
-            # select a column
-            column = relevant_slice.T[i]
-            # if column is all zeros then we can pass through
-            if 1 not in column: 
-                # path is no longer viable set the relevant slice of selected col to 1
-                self.space[start_i:end_i,i] = 1
+        for i in range(len(self.xspace)-1, -1, -1):
+            # if the column is free between the levels then we can pass through
+            if self._is_free(i, start_i, end_i):
+                # path is no longer viable take the relevant slice of selected col
+                self._take(i, start_i, end_i)
+                self.stats.count('column_probes', len(self.xspace) - i)
                 # return the found x position
                 return self.xspace[i]
+        self.stats.count('column_probes', len(self.xspace))
+        self.stats.count('out_of_space')
         warnings.warn("Ran out of space appending to end")
         return self.xspace[-1]
     
-    @staticmethod    
-    def get_normalized_regions(levels, spacing, reverse=False):
+    def release_path(self, start_level, end_level, x):
+        '''free the nodes taken by get_path(start_level, end_level) when it returned x,
+        returns False if there was nothing to free'''
+        end_i = self.dict_level[start_level]
+        start_i = self.dict_level[end_level]
+        for i in np.flatnonzero(np.asarray(self.xspace) == x):
+            starts, ends = self._starts[i], self._ends[i]
+            k = bisect_left(starts, start_i)
+            if k < len(starts) and starts[k] == start_i and ends[k] == end_i:
+                del starts[k]
+                del ends[k]
+                return True
+        return False
+    
+    def get_state(self):
+        '''arrays of the spaced levels, x space and taken nodes, enough for set_state to rebuild the manager'''
+        columns = [i for i, starts in enumerate(self._starts) for _ in starts]
+        return dict(spaced_y=self.spaced_y, xspace=np.asarray(self.xspace, dtype=float),
+                    columns=np.array(columns, dtype=np.int32),
+                    starts=np.array([start for starts in self._starts for start in starts], dtype=np.int32),
+                    ends=np.array([end for ends in self._ends for end in ends], dtype=np.int32))
+    
+    def set_state(self, state):
+        '''restore the spacing and taken nodes saved by get_state on a manager of the same levels'''
+        self.spaced_y = np.array(state['spaced_y'], dtype=float)
+        self.xspace = np.array(state['xspace'], dtype=float)
+        self._starts = [[] for _ in range(len(self.xspace))]
+        self._ends = [[] for _ in range(len(self.xspace))]
+        # get_state lists each column's intervals in order
+        for column, start, end in zip(state['columns'].tolist(), state['starts'].tolist(), state['ends'].tolist()):
+            self._starts[column].append(start)
+            self._ends[column].append(end)
+    
+    @property
+    def columns_used(self):
+        '''number of columns with at least one path through them'''
+        return sum(1 for starts in self._starts if starts)
+    
+    def path_bands(self, paths):
+        '''split (parent, daughter) level pairs into bands whose level ranges don't touch those of any other
+        band, so paths of different bands never compete for a column. Returns the path numbers of each band,
+        bands from the bottom up and the paths of a band in their original order'''
+        paths = list(paths)
+        if not paths:
+            return []
+        ends = np.array([(self.dict_level[start_level], self.dict_level[end_level]) for start_level, end_level in paths])
+        lo, hi = ends.min(axis=1), ends.max(axis=1)
+        order = np.argsort(lo, kind='stable')
+        # a band starts where a path starts above every earlier one, paths sharing a level touch
+        reach = np.maximum.accumulate(hi[order])
+        starts = np.empty(len(paths), dtype=bool)
+        starts[0] = True
+        starts[1:] = lo[order][1:] > reach[:-1]
+        band = np.empty(len(paths), dtype=np.intp)
+        band[order] = np.cumsum(starts) - 1
+        by_band = np.argsort(band, kind='stable')
+        return np.split(by_band, np.flatnonzero(np.diff(band[by_band])) + 1)
+    
+    def assign_paths(self, paths, placement='greedy', resize=False, workers=None):
+        '''find viable paths for many (parent, daughter) level pairs at once, returns the x position of each.
+        greedy places them one after the other with get_path, optimal treats the paths as intervals
+        of level indices and colours the interval graph so the fewest possible columns are used.
+        with resize the xspace is refit to exactly the number of columns optimal needs. paths can be a TransitionTable.
+        workers lays out the bands of path_bands on their own, in a pool of that many processes when more
+        than 1, the result is the same as without. It only applies to an empty manager and not to resize'''
+        if placement not in ('greedy', 'optimal'):
+            raise ValueError(f"placement must be 'greedy' or 'optimal' not {placement!r}")
+        if resize and placement == 'greedy':
+            warnings.warn("resize (fit_x_points) only applies to placement='optimal', the x points are kept")
+            resize = False
+        if isinstance(paths, TransitionTable):
+            paths = zip(paths.parent_energy.tolist(), paths.daughter_energy.tolist())
+        if workers is not None and not resize and not any(self._starts):
+            return self._assign_bands(list(paths), placement, workers)
+        if placement == 'greedy':
+            return [self.get_path(start_level, end_level) for start_level, end_level in paths]
         
-        groups = []
-        group_num = 0
-        group_flag = False
-        end = False
-        # print(levels)
-        if reverse:
-            rng = range(len(levels)-2,0,-1)
-            dr = 1
-        else:
-            rng = range(1,len(levels)-1)
-            dr = -1
+        intervals = []
+        for k, (start_level, end_level) in enumerate(paths):
+            end_i = self.dict_level[start_level]
+            start_i = self.dict_level[end_level]
+            intervals.append((start_i, end_i, k))
+        
+        # sweep the intervals from the bottom up reusing the lowest column freed by a finished path
+        colours = [0]*len(intervals)
+        n_colours = 0
+        active = []
+        free = []
+        for start_i, end_i, k in sorted(intervals):
+            if end_i <= start_i:
+                # nothing to pass through
+                continue
+            while active and active[0][0] <= start_i:
+                heapq.heappush(free, heapq.heappop(active)[1])
+            if free:
+                colour = heapq.heappop(free)
+            else:
+                colour = n_colours
+                n_colours += 1
+            colours[k] = colour
+            heapq.heappush(active, (end_i, colour))
             
-        for i in rng:
-            # check if there any levels that are too close
+        if resize and n_colours:
+            # a single column goes where greedy would put it, on the right
+            self.xspace = np.linspace(self.xspace[0], self.xspace[-1], n_colours) if n_colours > 1 else self.xspace[-1:]
+            self._starts = [[] for _ in range(n_colours)]
+            self._ends = [[] for _ in range(n_colours)]
             
+        # colour 0 is the right most column for cosmetic reasons
+        xs = []
+        out_of_space = False
+        for (start_i, end_i, k), colour in zip(intervals, colours):
+            if end_i <= start_i:
+                # nothing to pass through, as in get_path
+                xs.append(self.xspace[-1])
+                continue
+            column = len(self.xspace) - 1 - colour
+            if column < 0 or not self._is_free(column, start_i, end_i, inclusive=False):
+                self.stats.count('out_of_space')
+                out_of_space = True
+                xs.append(self.xspace[-1])
+                continue
+            self._take(column, start_i, end_i)
+            xs.append(self.xspace[column])
             
-            if abs(levels[i+dr]-levels[i]) < spacing:
-                
-                if group_flag == False:
-                    groups.append([])               
-                    groups[group_num].append(levels[i+dr])
-                    groups[group_num].append(levels[i])
-                    group_flag = True
-                else:
-                    groups[group_num].append(levels[i])
-                    
-                    
-            elif group_flag == True:
-                if abs(max(groups[group_num])-levels[i]) < len(groups[group_num])*spacing and reverse:
-                    groups[group_num].append(levels[i])    
-                elif abs(min(groups[group_num])-levels[i]) < len(groups[group_num])*spacing and not reverse:
-                    groups[group_num].append(levels[i])
+        if out_of_space:
+            warnings.warn(f"Ran out of space appending to end, optimal placement needs {n_colours} x points")
+        return xs
+    
+    def _assign_bands(self, paths, placement, workers):
+        '''assign_paths band by band on managers of just the levels of each band, the taken nodes
+        of the bands are stitched back into this one'''
+        numbers = self.path_bands(paths)
+        bands = [[paths[k] for k in band.tolist()] for band in numbers]
+        if workers > 1 and len(bands) > 1:
+            # a few chunks per worker keep the cost of sending the bands over small
+            n_chunks = min(len(bands), 4*workers)
+            chunks = [bands[i::n_chunks] for i in range(n_chunks)]
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                done = list(pool.map(_layout_bands, [self.xspace]*n_chunks, chunks, [placement]*n_chunks))
+            results = [done[i % n_chunks][i // n_chunks] for i in range(len(bands))]
+        else:
+            results = _layout_bands(self.xspace, bands, placement)
+        
+        xs = [None]*len(paths)
+        for band, (band_xs, levels, columns, starts, ends, counters) in zip(numbers, results):
+            for k, x in zip(band.tolist(), band_xs):
+                xs[k] = x
+            # the bands come from the bottom up so appending keeps every column sorted
+            rows = np.array([self.dict_level[level] for level in levels.tolist()], dtype=np.int64)
+            for column, start, end in zip(columns.tolist(), rows[starts].tolist(), rows[ends].tolist()):
+                self._starts[column].append(start)
+                self._ends[column].append(end)
+            for name, n in counters.items():
+                self.stats.count(name, n)
+        return xs
+    
+    @staticmethod
+    def _close_groups(levels, spacing):
+        '''walk up the levels grouping runs that are closer than spacing, a group keeps growing while the
+        next level is within spacing of the last or within len(group)*spacing of the first.
+        returns the first level and size of each group'''
+        n = len(levels)
+        close = np.abs(np.diff(levels)) < spacing
+        close_idx = np.flatnonzero(close)
+        far_idx = np.flatnonzero(~close)
+        
+        groups = []
+        # the first and last level are never checked against their neighbours
+        i, last = 1, n - 2
+        while True:
+            # jump straight to the next pair of levels that are too close
+            k = np.searchsorted(close_idx, i - 1)
+            if k == len(close_idx) or close_idx[k] + 1 > last:
+                break
+            i = close_idx[k] + 1
+            first = levels[i-1]
+            count = 2
+            i += 1
+            while i <= last:
+                if close[i-1]:
+                    # swallow the whole run of close levels at once
+                    k = np.searchsorted(far_idx, i - 1)
+                    stop = min(far_idx[k] + 1 if k < len(far_idx) else n, last + 1)
+                    count += stop - i
+                    i = stop
+                elif abs(levels[i] - first) < count*spacing:
+                    count += 1
+                    i += 1
                 else:
-                    group_flag = False
-                    group_num += 1
-            
+                    i += 1
+                    break
+            groups.append((first, count))
+        return groups
+    
+    @staticmethod    
+    def get_normalized_regions(levels, spacing, reverse=False):
+        '''find the regions ((lower, upper),) of sorted levels that are too close together and need spreading out,
+        reverse groups from the top down'''
+        levels = np.asarray(levels, dtype=float)
+        if reverse:
+            levels = levels[::-1]
             
         normalize_regions = []
-        # print(groups)
-        for group in groups:
+        for first, count in SpaceManager._close_groups(levels, spacing):
+            first = float(first)
             if not reverse:
-                normalize_regions.append((min(group)-1,min(group)+len(group)*spacing))
+                normalize_regions.append((first-1, first+count*spacing))
             else:
-                normalize_regions.append((max(group)-len(group)*spacing,max(group)+1))
-        # print(normalize_regions)
-        return normalize_regions
\ No newline at end of file
+                normalize_regions.append((first-count*spacing, first+1))
+        return normalize_regions
+
+
+def _layout_bands(xspace, bands, placement):
+    '''lay out each band of (parent, daughter) pairs on a SpaceManager of only its levels, returns the x of
+    every path, the levels and the taken nodes in their indices and the counters of each band'''
+    results = []
+    for paths in bands:
+        stats = Stats()
+        manager = SpaceManager(xspace, np.unique(np.array(paths, dtype=float)), stats=stats)
+        xs = manager.assign_paths(paths, placement=placement)
+        state = manager.get_state()
+        results.append((xs, manager.levels, state['columns'], state['starts'], state['ends'], stats.counters))
+    return results
+
+
+@dataclass
+class SchemeLayout:
+    '''where every level and transition of a scheme is drawn'''
+    levels: list # or a LevelTable
+    level_y: np.ndarray # y of each level
+    level_height: np.ndarray # height of each level, stretched to meet the spaced y when proportional
+    transitions: list # or a TransitionTable, sorted in the order they were placed
+    transition_x: list
+    transition_py: np.ndarray # y of the parent end
+    transition_dy: np.ndarray # y of the daughter end
+    space_manager: SpaceManager
+    
+
+def layout_scheme(levels, transitions, spacing=100, x_points=np.linspace(0.2,0.8,10), transition_sort: callable = None,
+                  proportional=False, auto_sort: bool = True, reverse=False, height=10,
+                  placement: str = 'greedy', fit_x_points: bool = False, stats=None, cache=None, workers=None):
+    '''space the levels out and find a column for every transition, transitions is sorted in place
+    by parent energy or transition_sort. stats records the time spent spacing and finding paths.
+    levels and transitions can be a LevelTable and TransitionTable which are laid out without any per level
+    or per transition python objects.
+    cache (a lsd.layout_cache.LayoutCache or True for the default one) reuses the spacing and columns
+    of an earlier layout of the same levels, transitions and options.
+    workers lays out bands of levels no transition crosses independently (see SpaceManager.assign_paths)'''
+    stats = get_stats(stats)
+    cache = get_layout_cache(cache)
+    tables = isinstance(transitions, TransitionTable)
+    if isinstance(levels, LevelTable):
+        energies = levels.energy
+    else:
+        energies = np.array([level.energy for level in levels], dtype=float)
+    
+    if transition_sort is None and tables:
+        transitions.sort()
+    elif transition_sort is None:
+        transitions.sort(key=lambda transition: transition.parent.energy)
+    else:
+        transitions.sort(key=transition_sort)
+    
+    state = key = None
+    if cache is not None:
+        # the key is made from the sorted transitions so any transition_sort is covered
+        if tables:
+            parents, daughters = transitions.parent_energy, transitions.daughter_energy
+        else:
+            parents = np.array([transition.parent.energy for transition in transitions], dtype=float)
+            daughters = np.array([transition.daughter.energy for transition in transitions], dtype=float)
+        key = cache.key(energies, parents, daughters, spacing=spacing, x_points=x_points, reverse=reverse,
+                        auto_sort=auto_sort, placement=placement, fit_x_points=fit_x_points)
+        state = cache.get(key)
+        stats.count('layout_cache_hit' if state is not None else 'layout_cache_miss')
+        
+    with stats.time('spacing'):
+        if state is not None:
+            spc_mng = SpaceManager(x_points, energies, reverse=reverse, stats=stats)
+            spc_mng.set_state(state)
+        else:
+            spc_mng = SpaceManager(x_points, energies, spacing=spacing, reverse=reverse, stats=stats)
+        if tables or isinstance(levels, LevelTable):
+            spaced_y = spc_mng.get_spaced_ys(energies)
+        else:
+            spaced_y = np.array([spc_mng.get_spaced_y(energy) for energy in energies.tolist()], dtype=float)
+    
+    if proportional:
+        # levels stay at their energy and stretch to where they would have been spaced to
+        level_y = energies
+        level_height = height + np.abs(spaced_y - energies)
+    else:
+        level_y = spaced_y
+        level_height = np.full(len(levels), height, dtype=float)
+        
+    if state is not None:
+        transition_x = state['transition_x'].tolist()
+    elif auto_sort:
+        #try to minimize the width
+        paths = transitions if tables else [(transition.parent.energy, transition.daughter.energy)
+                                            for transition in transitions]
+        with stats.time('paths'):
+            transition_x = spc_mng.assign_paths(paths, placement=placement, resize=fit_x_points, workers=workers)
+    else:
+        transition_x = [spc_mng.xspace[-i] for i in range(len(transitions))]
+    if cache is not None and state is None:
+        try:
+            cache.put(key, dict(spc_mng.get_state(), transition_x=np.asarray(transition_x, dtype=float)))
+        except OSError:
+            # a cache that can't be written (read only home, full disk) only means the next draw lays out again
+            pass
+        
+    if tables and proportional:
+        transition_py = transitions.parent_energy
+        transition_dy = transitions.daughter_energy
+    elif tables:
+        transition_py = spc_mng.get_spaced_ys(transitions.parent_energy)
+        transition_dy = spc_mng.get_spaced_ys(transitions.daughter_energy)
+    elif proportional:
+        transition_py = np.array([transition.parent.energy for transition in transitions], dtype=float)
+        transition_dy = np.array([transition.daughter.energy for transition in transitions], dtype=float)
+    else:
+        transition_py = np.array([spc_mng.get_spaced_y(transition.parent.energy) for transition in transitions], dtype=float)
+        transition_dy = np.array([spc_mng.get_spaced_y(transition.daughter.energy) for transition in transitions], dtype=float)
+    
+    return SchemeLayout(levels, level_y, level_height, transitions, transition_x, transition_py, transition_dy, spc_mng)
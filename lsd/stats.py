@@ -0,0 +1,71 @@
+'''opt-in timing and counters for the stages of drawing a level scheme'''
+from contextlib import contextmanager, nullcontext
+import time
+
+
+class Stats:
+    '''collects the wall time and number of calls of each stage and any named counters,
+    hook is called with the Stats and logger gets a summary when emit is called'''
+    def __init__(self, hook: callable = None, logger=None):
+        self.times = {}
+        self.calls = {}
+        self.counters = {}
+        self.hook = hook
+        self.logger = logger
+
+    @contextmanager
+    def time(self, stage):
+        '''time a block of code as part of stage'''
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.times[stage] = self.times.get(stage, 0) + time.perf_counter() - start
+            self.calls[stage] = self.calls.get(stage, 0) + 1
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def as_dict(self):
+        return dict(times=dict(self.times), calls=dict(self.calls), counters=dict(self.counters))
+
+    def emit(self):
+        '''send the stats to the hook and logger'''
+        if self.hook is not None:
+            self.hook(self)
+        if self.logger is not None:
+            self.logger.info('%s', self)
+
+    def __str__(self):
+        lines = [f"{stage:<12} {seconds:9.4f} s {self.calls[stage]:>8} calls" for stage, seconds in self.times.items()]
+        lines += [f"{name:<12} {n:>11}" for name, n in self.counters.items()]
+        return '\n'.join(lines)
+
+    def __repr__(self):
+        return f"Stats({self.as_dict()})"
+
+
+class _NullStats:
+    '''stand in used when instrumentation is off, everything is a no-op'''
+    _context = nullcontext()
+
+    def time(self, stage):
+        return self._context
+
+    def count(self, name, n=1):
+        pass
+
+    def emit(self):
+        pass
+
+
+null_stats = _NullStats()
+
+
+def get_stats(stats):
+    '''turn the stats argument of a function into something to record to, True makes a fresh Stats'''
+    if stats is None or stats is False:
+        return null_stats
+    if stats is True:
+        return Stats()
+    return stats
@@ -1,6 +1,22 @@
 from abc import ABC, abstractmethod
+from dataclasses import dataclass
 import numpy as np
-import plotly.graph_objects as go
+
+
+def _go():
+    '''plotly is slow to import so it is only loaded once a trace is actually asked for'''
+    import plotly.graph_objects as go
+    return go
+
+
+@dataclass
+class LevelGeometry:
+    '''the polylines and labels of many levels of one style'''
+    x: np.ndarray # x of every vertex, nan between levels
+    y: np.ndarray
+    labels: list # (positions (n, 2), text format, xanchor) for each label of a level
+    styles: list = None # one style instance per level when the style has no vertex template
+
 
 class LevelStyle(ABC):
     x: np.ndarray
@@ -10,6 +26,81 @@ class LevelStyle(ABC):
     name_pos: np.ndarray
     half_width: float
     reverse: bool = False # true if go through levels from top to bottom false if going through bottom to top
+    # vertices in units of (half width, height) relative to (x_pos, y_pos), styles without one
+    # are drawn one instance at a time
+    x_template: tuple = None
+    y_template: tuple = None
+    # (x offset, y offset, text format, xanchor) of each label in the same units
+    label_template: tuple = ()
+    
+    @classmethod
+    def get_geometry(cls, x_pos, y_pos, width, height):
+        '''vertices and label positions of many levels at once, every argument is an array (or scalar)
+        with one entry per level'''
+        x_pos, y_pos, width, height = np.broadcast_arrays(*(np.atleast_1d(np.asarray(arg, dtype=float))
+                                                            for arg in (x_pos, y_pos, width, height)))
+        if not cls._uses_template():
+            return cls._get_geometry_instances(x_pos, y_pos, width, height)
+        
+        half_width = (width/2)[:,None]
+        n, k = len(x_pos), len(cls.x_template)
+        # one row per level with a nan column to break the line before the next level
+        x = np.full((n, k+1), np.nan)
+        y = np.full((n, k+1), np.nan)
+        x[:,:k] = x_pos[:,None] + half_width*np.asarray(cls.x_template)
+        y[:,:k] = y_pos[:,None] + height[:,None]*np.asarray(cls.y_template)
+        
+        labels = []
+        for dx, dy, text, xanchor in cls.label_template:
+            positions = np.column_stack((x_pos + half_width[:,0]*dx, y_pos + height*dy))
+            labels.append((positions, text, xanchor))
+        return LevelGeometry(x.ravel()[:-1], y.ravel()[:-1], labels)
+    
+    @classmethod
+    def _uses_template(cls):
+        '''whether the templates describe the levels, not when a subclass of the class that set them
+        draws its own lines or labels'''
+        owner = next(k for k in cls.__mro__ if 'x_template' in vars(k))
+        if owner.x_template is None:
+            return False
+        return all(issubclass(owner, next(k for k in cls.__mro__ if method in vars(k)))
+                   for method in ('__init__', 'get_line', 'get_annotations'))
+    
+    @classmethod
+    def get_reverse(cls):
+        '''reverse of the style, read from an instance since a style can set it in __init__'''
+        return cls(0, 0, 0, 0).reverse
+    
+    @classmethod
+    def _get_geometry_instances(cls, x_pos, y_pos, width, height):
+        '''fall back on making one instance per level, the vertices are those of its get_line'''
+        styles = [cls(*args) for args in zip(x_pos.tolist(), y_pos.tolist(), width.tolist(), height.tolist())]
+        x, y = [], []
+        for style in styles:
+            line = style.get_line()
+            if x:
+                x.append(np.nan)
+                y.append(np.nan)
+            x.extend(line.x)
+            y.extend(line.y)
+        name_pos = np.array([style.name_pos for style in styles], dtype=float).reshape(-1, 2)
+        return LevelGeometry(np.array(x, dtype=float), np.array(y, dtype=float), [(name_pos, None, None)], styles)
+    
+    @classmethod
+    def get_annotations_batch(cls, geometry, names, spins, parities):
+        '''annotation dicts of every level in a geometry, in the same order as calling get_annotations level by level'''
+        if geometry.styles is not None:
+            return [anno for style, name, spin, parity in zip(geometry.styles, names, spins, parities)
+                    for anno in style.get_annotations(name=name, spin=spin, parity=parity)]
+        
+        labels = [(positions.tolist(), text, xanchor) for positions, text, xanchor in geometry.labels]
+        annotations = []
+        for i, (name, spin, parity) in enumerate(zip(names, spins, parities)):
+            for positions, text, xanchor in labels:
+                x, y = positions[i]
+                annotations.append(dict(x=x, y=y, xref='x', yref='y', text=text.format(name=name, spin=spin, parity=parity),
+                                        yanchor='middle', xanchor=xanchor, showarrow=False))
+        return annotations
     
     @abstractmethod
     def __init__(x_pos, y_pos, width, height):
@@ -27,6 +118,10 @@ class LevelStyle(ABC):
     
 class Flat(LevelStyle):
     '''level style ________'''
+    x_template = (-1, 1)
+    y_template = (0, 0)
+    label_template = ((1, 0, '{name} {spin}{parity}', 'left'),)
+    
     def __init__(self, x_pos, y_pos, width, height=None):
         '''give the x_pos, y_pos and width in absolute units'''
         self.half_width = width/2
@@ -35,7 +130,7 @@ class Flat(LevelStyle):
         self.name_pos = (x_pos+self.half_width, y_pos)
         
     def get_line(self, **kwargs):
-        return go.Scatter(x=self.x, y=self.y, **kwargs)
+        return _go().Scatter(x=self.x, y=self.y, **kwargs)
     
     def get_annotations(self, name='', spin='', parity=''):
         annotation = dict(x=self.name_pos[0], y=self.name_pos[1], xref='x', yref='y', text=f"{name} {spin}{parity}", yanchor='middle', xanchor='left', showarrow=False)
@@ -48,6 +143,11 @@ class Flat(LevelStyle):
     
 class Platform(LevelStyle):
     '''level style __/---\__'''
+    reverse = True
+    x_template = (-1, -1+1/8, -1+1.5/8, 1-1.5/8, 1-1/8, 1)
+    y_template = (-1, -1, 0, 0, -1, -1)
+    label_template = ((1, -1, '{name}', 'left'), (-1, -1, '{spin}{parity}', 'right'))
+    
     def __init__(self, x_pos, y_pos, width, height):
         self.half_width = width/2
         shift = self.half_width/8
@@ -68,10 +168,9 @@ class Platform(LevelStyle):
         self.name_pos = (x_pos + self.half_width, y_pos-height)
         self.spin_pos = (x_pos - self.half_width, y_pos-height)
         self.parity_pos = (x_pos - self.half_width, y_pos-height)
-        self.reverse = True
         
     def get_line(self, **kwargs):
-        return go.Scatter(x=self.x, y=self.y, **kwargs)
+        return _go().Scatter(x=self.x, y=self.y, **kwargs)
     
     def get_annotations(self, name='', spin='', parity=''):
         anno1 = dict(x=self.name_pos[0], y=self.name_pos[1], xref='x', yref='y', text=f"{name}", yanchor='middle', xanchor='left', showarrow=False)
@@ -81,6 +180,10 @@ class Platform(LevelStyle):
     
 class IPlatform(LevelStyle):
     '''level style --\__/--'''
+    x_template = (-1, -1+1/8, -1+1.5/8, 1-1.5/8, 1-1/8, 1)
+    y_template = (1, 1, 0, 0, 1, 1)
+    label_template = ((1, 1, '{name}', 'left'), (-1, 1, '{spin}{parity}', 'right'))
+    
     def __init__(self, x_pos, y_pos, width, height):
         self.half_width = width/2
         shift = self.half_width/8
@@ -103,7 +206,7 @@ class IPlatform(LevelStyle):
         self.parity_pos = (x_pos - self.half_width, y_pos+height)
             
     def get_line(self, **kwargs):
-        return go.Scatter(x=self.x, y=self.y, **kwargs)
+        return _go().Scatter(x=self.x, y=self.y, **kwargs)
     
     def get_annotations(self, name='', spin='', parity=''):
         anno1 = dict(x=self.name_pos[0], y=self.name_pos[1], xref='x', yref='y', text=f"{name}", yanchor='middle', xanchor='left', showarrow=False)
@@ -113,6 +216,10 @@ class IPlatform(LevelStyle):
     
 class Raised(LevelStyle):
     '''level style --\__/--'''
+    x_template = (-1, 1-1.5/8, 1-1/8, 1)
+    y_template = (0, 0, 1, 1)
+    label_template = ((1, 1, '{name} {spin}{parity}', 'left'),)
+    
     def __init__(self, x_pos, y_pos, width, height):
         self.half_width = width/2
         shift = self.half_width/8
@@ -131,7 +238,7 @@ class Raised(LevelStyle):
         self.parity_pos = self.name_pos
             
     def get_line(self, **kwargs):
-        return go.Scatter(x=self.x, y=self.y, **kwargs)
+        return _go().Scatter(x=self.x, y=self.y, **kwargs)
     
     def get_annotations(self, name='', spin='', parity=''):
         annotation = dict(x=self.name_pos[0], y=self.name_pos[1], xref='x', yref='y', text=f"{name} {spin}{parity}", yanchor='middle', xanchor='left', showarrow=False)
@@ -140,6 +247,10 @@ class Raised(LevelStyle):
     
 class IRaised(LevelStyle):
     '''level style --\__/--'''
+    x_template = (-1, -1+1/8, -1+1.5/8, 1)
+    y_template = (1, 1, 0, 0)
+    label_template = ((-1, 1, '{name} {spin}{parity}', 'right'),)
+    
     def __init__(self, x_pos, y_pos, width, height):
         self.half_width = width/2
         shift = self.half_width/8
@@ -158,7 +269,7 @@ class IRaised(LevelStyle):
         self.parity_pos = self.name_pos
             
     def get_line(self, **kwargs):
-        return go.Scatter(x=self.x, y=self.y, **kwargs)
+        return _go().Scatter(x=self.x, y=self.y, **kwargs)
     
     def get_annotations(self, name='', spin='', parity=''):
         annotation = dict(x=self.name_pos[0], y=self.name_pos[1], xref='x', yref='y', text=f"{name} {spin}{parity}", yanchor='middle', xanchor='right', showarrow=False)
@@ -168,6 +279,11 @@ class IRaised(LevelStyle):
     
 class Lowered(LevelStyle):
     '''level style --\__/--'''
+    reverse = True
+    x_template = (-1, 1-1.5/8, 1-1/8, 1)
+    y_template = (0, 0, -1, -1)
+    label_template = ((1, -1, '{name} {spin}{parity}', 'left'),)
+    
     def __init__(self, x_pos, y_pos, width, height):
         self.half_width = width/2
         shift = self.half_width/8
@@ -184,10 +300,9 @@ class Lowered(LevelStyle):
         self.name_pos = (x_pos + self.half_width, y_pos-height)
         self.spin_pos = self.name_pos
         self.parity_pos = self.name_pos
-        self.reverse = True
             
     def get_line(self, **kwargs):
-        return go.Scatter(x=self.x, y=self.y, **kwargs)
+        return _go().Scatter(x=self.x, y=self.y, **kwargs)
     
     def get_annotations(self, name='', spin='', parity=''):
         annotation = dict(x=self.name_pos[0], y=self.name_pos[1], xref='x', yref='y', text=f"{name} {spin}{parity}", yanchor='middle', xanchor='left', showarrow=False)
@@ -197,6 +312,11 @@ class Lowered(LevelStyle):
     
 class ILowered(LevelStyle):
     '''level style --\__/--'''
+    reverse = True
+    x_template = (-1, -1+1/8, -1+1.5/8, 1)
+    y_template = (-1, -1, 0, 0)
+    label_template = ((-1, -1, '{name} {spin}{parity}', 'right'),)
+    
     def __init__(self, x_pos, y_pos, width, height):
         self.half_width = width/2
         shift = self.half_width/8
@@ -213,10 +333,9 @@ class ILowered(LevelStyle):
         self.name_pos = (x_pos - self.half_width, y_pos-height)
         self.spin_pos = self.name_pos
         self.parity_pos = self.name_pos
-        self.reverse = True
             
     def get_line(self, **kwargs):
-        return go.Scatter(x=self.x, y=self.y, **kwargs)
+        return _go().Scatter(x=self.x, y=self.y, **kwargs)
     
     def get_annotations(self, name='', spin='', parity=''):
         annotation = dict(x=self.name_pos[0], y=self.name_pos[1], xref='x', yref='y', text=f"{name} {spin}{parity}", yanchor='middle', xanchor='right', showarrow=False)
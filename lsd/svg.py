@@ -0,0 +1,145 @@
+'''direct svg backend for static level schemes
+
+draws the same SpaceManager layout and LevelStyle geometry as Canvas.read_from_nlv but streams
+plain svg elements to a file without building any plotly objects, which is much faster for large schemes'''
+import copy
+import os
+from xml.sax.saxutils import escape, quoteattr
+import numpy as np
+from .read import read
+from .spacer import layout_scheme
+from .styles import levelstyles
+
+transition_defaults = dict(arrowwidth=1.5, arrowcolor='black')
+level_defaults = dict(x=0.5, width=1, style='flat', height=10)
+line_defaults = dict(color='black', width=2)
+font_defaults = dict(size=12, color='black', family='Arial, sans-serif')
+# the x range of the Canvas axes
+x_range = (-0.05, 1.05)
+
+
+class _Frame:
+    '''transform from data to pixel coordinates'''
+    def __init__(self, y_range, width, height, margin=20):
+        self.x0, self.x1 = x_range
+        self.y0, self.y1 = y_range
+        if self.y1 == self.y0:
+            self.y1 = self.y0 + 1
+        self.width = width
+        self.height = height
+        self.margin = margin
+
+    def x(self, x):
+        return self.margin + (np.asarray(x, dtype=float) - self.x0)/(self.x1 - self.x0)*(self.width - 2*self.margin)
+
+    def y(self, y):
+        return self.height - self.margin - (np.asarray(y, dtype=float) - self.y0)/(self.y1 - self.y0)*(self.height - 2*self.margin)
+
+
+def _polyline(xs, ys):
+    '''svg path data of polylines broken by nan'''
+    d = []
+    move = True
+    for x, y in zip(xs.tolist(), ys.tolist()):
+        if x != x or y != y:
+            move = True
+            continue
+        d.append(f"{'M' if move else 'L'}{x:.2f},{y:.2f}")
+        move = False
+    return ''.join(d)
+
+
+def _arrow_widths(transitions, transition_kw, br_widths):
+    '''arrow width of every transition, scaled by the branching ratio like Canvas does'''
+    base = transition_kw.get('arrowwidth', transition_defaults['arrowwidth'])
+    widths = []
+    for transition in transitions:
+        try:
+            widths.append(base*(1 + transition.branching_ratio) if br_widths else base)
+        except TypeError:
+            widths.append(base)
+    return widths
+
+
+def layout_to_svg(layout, output, level_kw={}, transition_kw={}, br_widths=False, width=1000, height=800):
+    '''stream the svg of a SchemeLayout to output, a filename or anything with a write method'''
+    level_kw = {**level_defaults, **copy.deepcopy(level_kw)}
+    line = {**line_defaults, **level_kw.get('trace_kw', {}).get('line', {})}
+    font = {**font_defaults, **level_kw.get('annotations_kw', {}).get('font', {})}
+    arrowcolor = transition_kw.get('arrowcolor', transition_defaults['arrowcolor'])
+
+    Style = levelstyles[level_kw['style'].lower()]
+    geometry = Style.get_geometry(level_kw['x'], layout.level_y, level_kw['width'], layout.level_height)
+    names = [str(level.energy) for level in layout.levels]
+    spins = ['' if level.spin is None else str(level.spin) for level in layout.levels]
+    parities = ['' if level.parity is None else str(level.parity) for level in layout.levels]
+    labels = Style.get_annotations_batch(geometry, names, spins, parities)
+
+    ys = np.concatenate((geometry.y, layout.transition_py, layout.transition_dy))
+    ys = ys[~np.isnan(ys)]
+    if len(ys):
+        pad = 0.05*(ys.max() - ys.min()) or 1
+        y_range = (ys.min() - pad, ys.max() + pad)
+    else:
+        y_range = (0, 1)
+    frame = _Frame(y_range, width, height)
+
+    if isinstance(output, (str, os.PathLike)):
+        with open(output, 'w') as f:
+            _write(f, frame, geometry, labels, layout, line, font, arrowcolor,
+                   _arrow_widths(layout.transitions, transition_kw, br_widths))
+    else:
+        _write(output, frame, geometry, labels, layout, line, font, arrowcolor,
+               _arrow_widths(layout.transitions, transition_kw, br_widths))
+
+
+def _write(f, frame, geometry, labels, layout, line, font, arrowcolor, arrow_widths):
+    f.write(f'<svg xmlns="http://www.w3.org/2000/svg" width="{frame.width}" height="{frame.height}" '
+            f'viewBox="0 0 {frame.width} {frame.height}">\n')
+    f.write('<defs><marker id="arrowhead" viewBox="0 0 10 10" refX="10" refY="5" markerUnits="strokeWidth" '
+            f'markerWidth="4" markerHeight="4" orient="auto"><path d="M0,0L10,5L0,10z" fill={quoteattr(arrowcolor)}/>'
+            '</marker></defs>\n')
+    f.write('<rect width="100%" height="100%" fill="white"/>\n')
+
+    # levels
+    f.write(f'<path fill="none" stroke={quoteattr(line["color"])} stroke-width="{line["width"]}" '
+            f'd="{_polyline(frame.x(geometry.x), frame.y(geometry.y))}"/>\n')
+
+    # transitions, tail at the parent and head at the daughter
+    xs = frame.x(layout.transition_x).tolist()
+    pys = frame.y(layout.transition_py).tolist()
+    dys = frame.y(layout.transition_dy).tolist()
+    f.write(f'<g stroke={quoteattr(arrowcolor)} marker-end="url(#arrowhead)">\n')
+    f.writelines(f'<line x1="{x:.2f}" y1="{py:.2f}" x2="{x:.2f}" y2="{dy:.2f}" stroke-width="{w:.3g}"/>\n'
+                 for x, py, dy, w in zip(xs, pys, dys, arrow_widths))
+    f.write('</g>\n')
+
+    # labels
+    anchors = dict(left='start', right='end', center='middle')
+    f.write(f'<g font-family={quoteattr(font["family"])} font-size="{font["size"]}" fill={quoteattr(font["color"])} '
+            'dominant-baseline="middle">\n')
+    label_x = frame.x([label['x'] for label in labels]).tolist()
+    label_y = frame.y([label['y'] for label in labels]).tolist()
+    # nudge the text off the end of the level like plotly's annotation padding does
+    f.writelines(f'<text x="{x + (3 if label["xanchor"] == "left" else -3):.2f}" y="{y:.2f}" '
+                 f'text-anchor="{anchors[label["xanchor"]]}">{escape(label["text"])}</text>\n'
+                 for x, y, label in zip(label_x, label_y, labels))
+    f.write('</g>\n</svg>\n')
+
+
+def write_svg(filename: str, output, spacing=100, x_points=np.linspace(0.2,0.8,10),
+              transition_sort: callable = None, proportional=False, br_widths=False,
+              auto_sort: bool = True, level_kw={}, transition_kw={}, width=1000, height=800,
+              cache: bool = True, placement: str = 'greedy', fit_x_points: bool = False, layout_cache=True,
+              layout_workers: int = None, validate: bool = False):
+    '''draw the level scheme in an .nlv file straight to an svg file, takes the same options as
+    Canvas.read_from_nlv plus the pixel width and height of the picture'''
+    levels, transitions = read(filename, cache=cache, validate=validate)
+    style = level_kw.get('style', level_defaults['style'])
+    layout = layout_scheme(levels, transitions, spacing=spacing, x_points=x_points, transition_sort=transition_sort,
+                           proportional=proportional, auto_sort=auto_sort, reverse=levelstyles[style.lower()].get_reverse(),
+                           height=level_kw.get('height', level_defaults['height']),
+                           placement=placement, fit_x_points=fit_x_points, cache=layout_cache, workers=layout_workers)
+    layout_to_svg(layout, output, level_kw=level_kw, transition_kw=transition_kw, br_widths=br_widths,
+                  width=width, height=height)
+    return layout
@@ -0,0 +1,253 @@
+'''compact column tables of the levels and transitions of a scheme
+
+a LevelTable keeps the energies, spins and parities of the levels and a TransitionTable the parent
+and daughter level indices, gammas and branching ratios of the transitions in numpy arrays.
+Indexing or iterating a table gives light __slots__ records with the same attributes as Level and
+Transition, reading and writing through to the arrays'''
+import os
+from abc import ABC, abstractmethod
+import numpy as np
+from .cache import level_dtype, transition_dtype, to_arrays, load_cache, parities, parity_names, to_float, from_float
+
+
+class LevelRecord:
+    '''one level of a LevelTable, behaves like a Level'''
+    __slots__ = ('table', 'index')
+
+    def __init__(self, table, index):
+        self.table = table
+        self.index = index
+
+    @property
+    def energy(self):
+        return self.table.energy[self.index].item()
+
+    @energy.setter
+    def energy(self, value):
+        self.table.energy[self.index] = value
+
+    @property
+    def spin(self):
+        return from_float(self.table.spin[self.index].item())
+
+    @spin.setter
+    def spin(self, value):
+        self.table.spin[self.index] = to_float(value)
+
+    @property
+    def parity(self):
+        return parity_names[self.table.parity[self.index].item()]
+
+    @parity.setter
+    def parity(self, value):
+        if value not in parities:
+            raise ValueError(f"{value!r} is not a parity")
+        self.table.parity[self.index] = parities[value]
+
+    def __repr__(self):
+        return f"LevelRecord(energy={self.energy!r}, spin={self.spin!r}, parity={self.parity!r})"
+
+
+class TransitionRecord:
+    '''one transition of a TransitionTable, behaves like a Transition. parent and daughter
+    are the LevelRecords of the level table so transitions sharing a level share the record'''
+    __slots__ = ('table', 'index')
+
+    def __init__(self, table, index):
+        self.table = table
+        self.index = index
+
+    def _level_index(self, level):
+        if not isinstance(level, LevelRecord) or level.table is not self.table.levels:
+            raise ValueError(f"{level!r} is not a level of this table")
+        return level.index
+
+    @property
+    def parent(self):
+        return self.table.levels[self.table.parent[self.index].item()]
+
+    @parent.setter
+    def parent(self, level):
+        self.table.parent[self.index] = self._level_index(level)
+
+    @property
+    def daughter(self):
+        return self.table.levels[self.table.daughter[self.index].item()]
+
+    @daughter.setter
+    def daughter(self, level):
+        self.table.daughter[self.index] = self._level_index(level)
+
+    @property
+    def gamma(self):
+        return from_float(self.table.gamma[self.index].item())
+
+    @gamma.setter
+    def gamma(self, value):
+        self.table.gamma[self.index] = to_float(value)
+
+    @property
+    def branching_ratio(self):
+        return from_float(self.table.branching_ratio[self.index].item())
+
+    @branching_ratio.setter
+    def branching_ratio(self, value):
+        self.table.branching_ratio[self.index] = to_float(value)
+
+    def __repr__(self):
+        return (f"TransitionRecord(parent={self.parent!r}, daughter={self.daughter!r}, "
+                f"gamma={self.gamma!r}, branching_ratio={self.branching_ratio!r})")
+
+
+class _Table(ABC):
+    '''sequence of records over column arrays, each row has one record that is made the
+    first time it is asked for so identity checks keep working'''
+    _record = None
+
+    def __len__(self):
+        return len(self._columns()[0])
+
+    def __getitem__(self, i):
+        n = len(self)
+        if i < 0:
+            i += n
+        if not 0 <= i < n:
+            raise IndexError(f"{type(self).__name__} index out of range")
+        record = self._records.get(i)
+        if record is None:
+            record = self._records[i] = self._record(self, i)
+        return record
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    @abstractmethod
+    def _columns(self):
+        '''the column arrays, all of one length'''
+
+    @property
+    def nbytes(self):
+        return sum(column.nbytes for column in self._columns())
+
+
+class LevelTable(_Table):
+    '''the levels of a scheme as columns, missing spins are nan and parities are +1, -1 or 0 for unknown'''
+    _record = LevelRecord
+
+    def __init__(self, energy, spin=None, parity=None):
+        self.energy = np.array(energy, dtype=float)
+        n = len(self.energy)
+        self.spin = np.full(n, np.nan) if spin is None else np.array(spin, dtype=float)
+        self.parity = np.zeros(n, dtype=np.int8) if parity is None else np.array(parity, dtype=np.int8)
+        self._records = {}
+
+    def _columns(self):
+        return self.energy, self.spin, self.parity
+
+    @classmethod
+    def from_records(cls, arr):
+        '''table of a structured array of lsd.cache.level_dtype'''
+        return cls(arr['energy'], arr['spin'], arr['parity'])
+
+    def to_records(self):
+        arr = np.empty(len(self), dtype=level_dtype)
+        arr['energy'], arr['spin'], arr['parity'] = self.energy, self.spin, self.parity
+        return arr
+
+
+class TransitionTable(_Table):
+    '''the transitions of a scheme as columns, parent and daughter are indices into levels
+    and missing gammas and branching ratios are nan'''
+    _record = TransitionRecord
+
+    def __init__(self, levels: LevelTable, parent, daughter, gamma=None, branching_ratio=None):
+        self.levels = levels
+        self.parent = np.array(parent, dtype=np.int32)
+        self.daughter = np.array(daughter, dtype=np.int32)
+        n = len(self.parent)
+        self.gamma = np.full(n, np.nan) if gamma is None else np.array(gamma, dtype=float)
+        self.branching_ratio = np.full(n, np.nan) if branching_ratio is None else np.array(branching_ratio, dtype=float)
+        self._records = {}
+
+    def _columns(self):
+        return self.parent, self.daughter, self.gamma, self.branching_ratio
+
+    @property
+    def parent_energy(self):
+        return self.levels.energy[self.parent]
+
+    @property
+    def daughter_energy(self):
+        return self.levels.energy[self.daughter]
+
+    def sort(self, key: callable = None, reverse=False):
+        '''sort the rows in place like list.sort, by parent energy without a key. Records
+        move with their rows'''
+        if key is None:
+            energy = -self.parent_energy if reverse else self.parent_energy
+            order = np.argsort(energy, kind='stable')
+        else:
+            keyed = sorted(range(len(self)), key=lambda i: key(self[i]), reverse=reverse)
+            order = np.array(keyed, dtype=np.intp)
+
+        for column in self._columns():
+            column[:] = column[order]
+        position = np.empty(len(order), dtype=np.intp)
+        position[order] = np.arange(len(order))
+        records = {}
+        for i, record in self._records.items():
+            record.index = position[i].item()
+            records[record.index] = record
+        self._records = records
+
+    @classmethod
+    def from_records(cls, levels, arr):
+        '''table of a structured array of lsd.cache.transition_dtype'''
+        return cls(levels, arr['parent'], arr['daughter'], arr['gamma'], arr['branching_ratio'])
+
+    def to_records(self):
+        arr = np.empty(len(self), dtype=transition_dtype)
+        arr['parent'], arr['daughter'] = self.parent, self.daughter
+        arr['gamma'], arr['branching_ratio'] = self.gamma, self.branching_ratio
+        return arr
+
+
+def to_tables(levels, transitions):
+    '''pack Level and Transition objects into a LevelTable and TransitionTable, raises
+    lsd.cache.Uncachable for fields that aren't numbers (e.g. a spin of "3/2")'''
+    level_arr, transition_arr = to_arrays(levels, transitions)
+    level_table = LevelTable.from_records(level_arr)
+    return level_table, TransitionTable.from_records(level_table, transition_arr)
+
+
+def read_tables(filename, tolerance=1e-6, cache: bool = True):
+    '''read an .nlv file straight into tables, a warm sidecar cache is loaded without making
+    any Level or Transition objects'''
+    if cache and isinstance(filename, (str, os.PathLike)):
+        arrays = load_cache(filename, tolerance)
+        if arrays is not None:
+            level_table = LevelTable.from_records(arrays[0])
+            return level_table, TransitionTable.from_records(level_table, arrays[1])
+    from .read import read
+    return to_tables(*read(filename, tolerance, cache=cache))
+
+
+def scheme_columns(levels, transitions):
+    '''level energies, which levels have no spin or parity and the parent, daughter, gamma and
+    branching ratio columns of the transitions, from the lists of read or a LevelTable and TransitionTable'''
+    if isinstance(transitions, TransitionTable):
+        table = transitions.levels
+        undefined = np.isnan(table.spin) & (table.parity == 0)
+        return (table.energy, undefined, transitions.parent, transitions.daughter, transitions.gamma,
+                transitions.branching_ratio)
+    index = {id(level): i for i, level in enumerate(levels)}
+    energy = np.array([level.energy for level in levels], dtype=float)
+    if isinstance(levels, LevelTable):
+        undefined = np.isnan(levels.spin) & (levels.parity == 0)
+    else:
+        undefined = np.array([level.spin is None and level.parity is None for level in levels], dtype=bool)
+    parent = np.array([index[id(transition.parent)] for transition in transitions], dtype=np.intp)
+    daughter = np.array([index[id(transition.daughter)] for transition in transitions], dtype=np.intp)
+    gamma = np.array([to_float(transition.gamma) for transition in transitions], dtype=float)
+    branching_ratio = np.array([to_float(transition.branching_ratio) for transition in transitions], dtype=float)
+    return energy, undefined, parent, daughter, gamma, branching_ratio
@@ -0,0 +1,94 @@
+'''consistency checks of a parsed level scheme
+
+    report = validate(*read('scheme.nlv'))
+    print(report)
+
+every check is one vectorized pass over columns of the scheme: the residual of each gamma against
+the parent minus daughter energy (less the recoil energy of the nucleus when its mass is given),
+the sum of the branching ratios out of each level and the levels transitions go to that are never
+given a spin or parity'''
+import warnings
+from dataclasses import dataclass
+import numpy as np
+from .tables import TransitionTable, scheme_columns
+
+# atomic mass unit in keV
+amu = 931494.10242
+
+
+@dataclass
+class ValidationReport:
+    '''what validate found, transitions and levels are given by their numbers in the lists (or tables) checked'''
+    levels: list
+    transitions: list
+    residual: np.ndarray # gamma minus the expected gamma of each transition, nan without a gamma
+    energy_errors: np.ndarray # transitions with a residual above the energy tolerance
+    branching_sum: np.ndarray # sum of the branching ratios out of each level, nan for levels without any
+    branching_errors: np.ndarray # levels with every branching ratio given whose sum isn't 1
+    incomplete_branching: np.ndarray # levels with only some of their branching ratios given
+    undefined_daughters: np.ndarray # levels decayed to that never get a spin or parity
+
+    @property
+    def ok(self):
+        return not (len(self.energy_errors) or len(self.branching_errors) or len(self.undefined_daughters))
+
+    def _energy(self, i):
+        return self.levels[i].energy
+
+    def problems(self):
+        '''one line describing each problem found'''
+        lines = []
+        for k in self.energy_errors.tolist():
+            transition = self.transitions[k]
+            lines.append(f"gamma {transition.gamma} of {transition.parent.energy} -> {transition.daughter.energy} "
+                         f"is off by {self.residual[k]:.3g}")
+        for i in self.branching_errors.tolist():
+            lines.append(f"branching ratios out of {self._energy(i)} sum to {self.branching_sum[i]:.4g}")
+        for i in self.undefined_daughters.tolist():
+            lines.append(f"level {self._energy(i)} is decayed to but has no spin or parity")
+        return lines
+
+    def warn(self):
+        '''warn once per kind of problem found'''
+        for count, what in ((len(self.energy_errors), "gamma(s) don't match their level energies"),
+                            (len(self.branching_errors), "level(s) with branching ratios that don't sum to 1"),
+                            (len(self.undefined_daughters), "daughter level(s) without spin or parity")):
+            if count:
+                warnings.warn(f"{count} {what}")
+
+    def __str__(self):
+        if self.ok:
+            return f"{len(self.levels)} levels and {len(self.transitions)} transitions, no problems found"
+        return '\n'.join(self.problems())
+
+
+def validate(levels, transitions, energy_tolerance=0.5, branching_tolerance=0.01, mass=None):
+    '''check the levels and transitions returned by read (or a LevelTable and TransitionTable).
+    Gammas more than energy_tolerance (keV) from the parent minus daughter energy, less the recoil
+    energy of a nucleus of mass atomic mass units when given, and levels whose branching ratios are
+    all given but don't sum to 1 within branching_tolerance are reported'''
+    if isinstance(transitions, TransitionTable):
+        levels = transitions.levels
+    energy, undefined, parent, daughter, gamma, branching_ratio = scheme_columns(levels, transitions)
+    n = len(energy)
+
+    expected = energy[parent] - energy[daughter]
+    if mass is not None:
+        expected = expected - expected**2/(2*mass*amu)
+    residual = gamma - expected
+    with np.errstate(invalid='ignore'):
+        energy_errors = np.flatnonzero(np.abs(residual) > energy_tolerance)
+
+    given = ~np.isnan(branching_ratio)
+    total = np.bincount(parent, weights=np.where(given, branching_ratio, 0), minlength=n)
+    n_given = np.bincount(parent, weights=given, minlength=n)
+    n_out = np.bincount(parent, minlength=n)
+    branching_sum = np.where(n_given > 0, total, np.nan)
+    complete = (n_out > 0) & (n_given == n_out)
+    branching_errors = np.flatnonzero(complete & (np.abs(total - 1) > branching_tolerance))
+    incomplete_branching = np.flatnonzero((n_given > 0) & (n_given < n_out))
+
+    decayed_to = np.bincount(daughter, minlength=n) > 0
+    undefined_daughters = np.flatnonzero(decayed_to & undefined)
+    return ValidationReport(levels, transitions, residual, energy_errors, branching_sum, branching_errors,
+                            incomplete_branching, undefined_daughters)
@@ -0,0 +1,254 @@
+'''keep the drawings of .nlv files up to date while they are edited
+
+    lsd scheme.nlv -f html --watch
+
+each file is parsed once, after that a save only re-parses the lines that differ from the last
+parse and adds, removes or updates just those transitions on the drawn scheme. The layout is only
+redone when the set of levels or their labels change'''
+import os
+import sys
+import time
+import warnings
+from collections import Counter
+from .read import LevelRegistry, Transition, NLVSyntaxError, parse_line
+
+watch_formats = ('html', 'json')
+
+
+class SchemeWatcher:
+    '''one .nlv file drawn on a Canvas, refresh brings the drawing up to date with the file and
+    write saves it to output as html or json. draw_kw are the options of Canvas.draw_scheme'''
+    def __init__(self, filename, output=None, fmt='html', tolerance=1e-6, figure_kw={}, **draw_kw):
+        from .drawing import Canvas
+        if fmt not in watch_formats:
+            raise ValueError(f"fmt must be one of {watch_formats} not {fmt!r}")
+        self.filename = filename
+        self.output = output
+        self.fmt = fmt
+        self.registry = LevelRegistry(tolerance)
+        # line -> the transitions parsed from copies of it, the transitions in file order and how
+        # many transitions go to or from each level
+        self.lines = {}
+        self.order = []
+        self.uses = Counter()
+        # id(transition) -> (spin, parity) of its parent and of its daughter as written on its line
+        self.labels = {}
+        self._stat = None
+
+        self.canvas = Canvas()
+        removed, added, order = self._diff(self._read())
+        placed = [self._add(line, Transition(self.registry.add(*parent_args), self.registry.add(*daughter_args),
+                                             *transition_args), _labels(parent_args, daughter_args))
+                  for line, (parent_args, transition_args, daughter_args) in added]
+        self.order = _in_order(order, placed)
+        if figure_kw:
+            self.canvas.update_layout(**figure_kw)
+        self.canvas.draw_scheme(self.registry.levels, self.order, **draw_kw)
+        self.scheme = self.canvas.scheme
+
+    def _read(self):
+        stat = os.stat(self.filename)
+        self._stat = (stat.st_mtime_ns, stat.st_size)
+        with open(self.filename) as f:
+            return f.readlines()
+
+    def changed(self):
+        '''has the file been saved since it was last read'''
+        stat = os.stat(self.filename)
+        return (stat.st_mtime_ns, stat.st_size) != self._stat
+
+    def _diff(self, lines):
+        '''diff lines against the last parse, only lines that weren't there before are parsed. Returns the
+        transitions of the lines that are gone, the parsed records of the new lines and the file order
+        of the transitions with None in place of each new line'''
+        old = {line: list(transitions) for line, transitions in self.lines.items()}
+        order = []
+        added = []
+        for lineno, line in enumerate(lines, 1):
+            copies = old.get(line)
+            if copies:
+                order.append(copies.pop())
+                continue
+            try:
+                record = parse_line(line)
+            except NLVSyntaxError as e:
+                raise NLVSyntaxError(e.args[0], lineno, line.rstrip('\n')) from None
+            if record is not None:
+                added.append((line, record))
+                order.append(None)
+        removed = [(line, transition) for line, copies in old.items() for transition in copies]
+        return removed, added, order
+
+    def _add(self, line, transition, labels):
+        self.lines.setdefault(line, []).append(transition)
+        self.labels[id(transition)] = labels
+        self.uses[id(transition.parent)] += 1
+        self.uses[id(transition.daughter)] += 1
+        return transition
+
+    def _unlink(self, line, transition):
+        self.lines[line].remove(transition)
+        if not self.lines[line]:
+            del self.lines[line]
+
+    def _remove(self, line, transition):
+        '''forget the transition of a deleted line, returns True if that leaves a level unused'''
+        self._unlink(line, transition)
+        del self.labels[id(transition)]
+        dropped = False
+        for level in (transition.parent, transition.daughter):
+            self.uses[id(level)] -= 1
+            if not self.uses[id(level)]:
+                del self.uses[id(level)]
+                self.registry.discard(level)
+                dropped = True
+        return dropped
+
+    def refresh(self):
+        '''re-parse the lines changed since the last refresh and redraw what they touch, returns the
+        number of transitions that changed. A line that can't be parsed is warned about and the
+        drawing is left as it was until the next save'''
+        if not self.changed():
+            return 0
+        try:
+            removed, added, order = self._diff(self._read())
+        except NLVSyntaxError as e:
+            warnings.warn(f"{self.filename}: {e}")
+            return 0
+        if not removed and not added:
+            return 0
+
+        # an edited line that keeps its parent and daughter only changes the transition itself
+        by_levels = {}
+        for line, transition in removed:
+            by_levels.setdefault((id(transition.parent), id(transition.daughter)), []).append((line, transition))
+        redraw = False
+        updated, new, placed = [], [], []
+        kept = set()
+        # id(level) -> level of the levels whose spin and parity may have changed
+        touched = {}
+        for line, (parent_args, transition_args, daughter_args) in added:
+            levels = []
+            for args in (parent_args, daughter_args):
+                level = self.registry.get(args[0])
+                if level is None:
+                    level = self.registry.add(*args)
+                    redraw = True
+                touched[id(level)] = level
+                levels.append(level)
+            gamma, branching_ratio = (list(transition_args) + [None, None])[:2]
+            labels = _labels(parent_args, daughter_args)
+
+            same = by_levels.get((id(levels[0]), id(levels[1])))
+            if same:
+                old_line, transition = same.pop()
+                kept.add(id(transition))
+                self._unlink(old_line, transition)
+                self.lines.setdefault(line, []).append(transition)
+                self.labels[id(transition)] = labels
+                updated.append((transition, dict(gamma=gamma, branching_ratio=branching_ratio)))
+            else:
+                transition = self._add(line, Transition(levels[0], levels[1], gamma, branching_ratio), labels)
+                new.append(transition)
+            placed.append(transition)
+        removed = [(line, transition) for line, transition in removed if id(transition) not in kept]
+        for line, transition in removed:
+            touched[id(transition.parent)] = transition.parent
+            touched[id(transition.daughter)] = transition.daughter
+            redraw = self._remove(line, transition) or redraw
+        self.order = _in_order(order, placed)
+        redraw = self._merge_labels(touched) or redraw
+
+        if redraw:
+            # levels came, went or were relabeled, lay the whole scheme out again
+            self.scheme.reset(self._levels(), self.order)
+        else:
+            for _, transition in removed:
+                self.scheme.remove_transition(transition)
+            for transition, changes in updated:
+                self.scheme.update_transition(transition, **changes)
+            for transition in new:
+                self.scheme.add_transition(transition)
+        return len(removed) + len(updated) + len(new)
+
+    def _merge_labels(self, levels):
+        '''give the levels the spin and parity read gives them, the first given for the level on any line in
+        file order. Returns True if any changed'''
+        levels = {key: level for key, level in levels.items() if key in self.uses}
+        merged = {key: [None, None] for key in levels}
+        for transition in self.order:
+            for level, labels in zip((transition.parent, transition.daughter), self.labels[id(transition)]):
+                fields = merged.get(id(level))
+                if fields is not None:
+                    for i, value in enumerate(labels):
+                        if fields[i] is None:
+                            fields[i] = value
+        changed = False
+        for key, (spin, parity) in merged.items():
+            level = levels[key]
+            if (level.spin, level.parity) != (spin, parity):
+                level.spin, level.parity = spin, parity
+                changed = True
+        return changed
+
+    def _levels(self):
+        '''the levels in order of first appearance in the file, as read returns them'''
+        levels = {}
+        for transition in self.order:
+            levels.setdefault(id(transition.parent), transition.parent)
+            levels.setdefault(id(transition.daughter), transition.daughter)
+        return list(levels.values())
+
+    def figure(self):
+        '''the figure as a plain dict, a copy the canvas can go on changing under'''
+        return self.canvas.to_plotly_json()
+
+    def write(self, output=None):
+        import plotly.io as pio
+        output = output or self.output
+        if self.fmt == 'html':
+            pio.write_html(self.figure(), output, include_plotlyjs='cdn', validate=False)
+        else:
+            pio.write_json(self.figure(), output, validate=False)
+
+
+def _labels(parent_args, daughter_args):
+    '''(spin, parity) of the parent and daughter of a parsed line'''
+    return tuple(tuple((list(args[1:]) + [None, None])[:2]) for args in (parent_args, daughter_args))
+
+
+def _in_order(order, placed):
+    '''fill the None gaps of order with placed'''
+    placed = iter(placed)
+    return [next(placed) if transition is None else transition for transition in order]
+
+
+def watch(jobs, fmt='html', interval=0.5, figure_kw={}, out=None, **draw_kw):
+    '''draw every (filename, output) job and keep polling the files every interval seconds,
+    rewriting the output of a file as soon as it is saved. Runs until interrupted'''
+    out = sys.stdout if out is None else out
+    watchers = []
+    for filename, output in jobs:
+        start = time.perf_counter()
+        watcher = SchemeWatcher(filename, output, fmt, figure_kw=figure_kw, **draw_kw)
+        watcher.write()
+        watchers.append(watcher)
+        print(f"{time.perf_counter() - start:8.3f} s  {filename} -> {output}", file=out, flush=True)
+    print(f"watching {len(watchers)} file(s), ctrl-c to stop", file=out, flush=True)
+
+    try:
+        while True:
+            for watcher in watchers:
+                start = time.perf_counter()
+                try:
+                    changed = watcher.refresh()
+                except FileNotFoundError:
+                    # editors often replace the file on save, try again next time
+                    continue
+                if changed:
+                    watcher.write()
+                    print(f"{time.perf_counter() - start:8.3f} s  {watcher.filename}: {changed} transition(s) changed",
+                          file=out, flush=True)
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        pass
@@ -11,4 +11,5 @@ setuptools.setup(
     license='MIT',
     packages=["lsd"],
     install_requires=['numpy', 'plotly'],
+    entry_points={'console_scripts': ['lsd=lsd.cli:main']},
 )
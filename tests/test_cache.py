@@ -0,0 +1,78 @@
+import os
+import numpy as np
+import pytest
+from lsd import cache
+from lsd.cache import cache_path, load_cache
+from lsd.read import read
+
+scheme = '''1000,2,+ > 1000,0.6 > 0,0,+
+2000,4,+ > 1000,0.4 > 1000
+2000 > 2000 > 0
+'''
+
+
+def summary(levels, transitions):
+    return ([(level.energy, level.spin, level.parity) for level in levels],
+            [(t.parent.energy, t.gamma, t.branching_ratio, t.daughter.energy) for t in transitions])
+
+
+@pytest.fixture
+def nlv(tmp_path):
+    path = tmp_path / 'scheme.nlv'
+    path.write_text(scheme)
+    return str(path)
+
+
+def test_warm_read_matches_parse(nlv):
+    parsed = summary(*read(nlv, cache=False))
+    assert summary(*read(nlv)) == parsed
+    assert load_cache(nlv) is not None
+    assert summary(*read(nlv)) == parsed
+
+
+def test_edit_invalidates(nlv):
+    read(nlv)
+    stat = os.stat(nlv)
+    # same size, so only the time and the contents tell the edit apart
+    with open(nlv, 'w') as f:
+        f.write(scheme.replace('0.6', '0.7'))
+    os.utime(nlv, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert load_cache(nlv) is None
+    assert read(nlv)[1][0].branching_ratio == 0.7
+
+
+def test_touch_keeps_cache(nlv):
+    read(nlv)
+    stat = os.stat(nlv)
+    os.utime(nlv, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert load_cache(nlv) is not None
+
+
+def test_tolerance_is_part_of_the_key(nlv):
+    read(nlv)
+    assert load_cache(nlv, tolerance=1e-3) is None
+
+
+def test_unwritable_cache_falls_back_on_parsing(nlv):
+    # a file where the cache directory should go makes every write fail
+    with open(cache_path(nlv), 'w'):
+        pass
+    assert summary(*read(nlv)) == summary(*read(nlv, cache=False))
+
+
+def test_failed_write_leaves_nothing_half_written(nlv, monkeypatch):
+    def full_disk(*args, **kwargs):
+        raise OSError(28, 'No space left on device')
+    monkeypatch.setattr(cache.np, 'save', full_disk)
+    assert summary(*read(nlv)) == summary(*read(nlv, cache=False))
+    assert not [name for name in os.listdir(cache_path(nlv)) if 'tmp' in name]
+    monkeypatch.undo()
+    assert load_cache(nlv) is None
+
+
+def test_uncachable_values_still_read(tmp_path):
+    path = tmp_path / 'odd.nlv'
+    path.write_text('1000,3/2,+ > 1000 > 0\n')
+    levels, transitions = read(str(path))
+    assert levels[0].spin == '3/2'
+    assert np.isclose(transitions[0].gamma, 1000)
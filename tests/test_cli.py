@@ -0,0 +1,26 @@
+import os
+import shutil
+import pytest
+from lsd.cache import cache_path
+from lsd.cli import main, parse_args
+
+example = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'example', 'transitions.nlv')
+
+
+@pytest.fixture
+def nlv(tmp_path):
+    path = str(tmp_path / 'transitions.nlv')
+    shutil.copy(example, path)
+    return path
+
+
+def test_caches_are_on_by_default():
+    args = parse_args(['a.nlv'])
+    assert not args.no_cache and not args.no_layout_cache
+
+
+@pytest.mark.parametrize('flags, cached', [([], True), (['--no-cache'], False)])
+def test_no_cache(nlv, tmp_path, flags, cached):
+    assert main([nlv, '-f', 'json', '-j', '1', '--no-layout-cache', '-o', str(tmp_path / 'out')] + flags) == 0
+    assert os.path.exists(tmp_path / 'out' / 'transitions.json')
+    assert os.path.isdir(cache_path(nlv)) == cached
@@ -0,0 +1,59 @@
+import os
+import warnings
+import numpy as np
+import pytest
+from lsd.drawing import Canvas
+from lsd.read import Level, Transition
+
+example = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'example')
+
+
+def drawn(filename='transitions.nlv', **kw):
+    canvas = Canvas()
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        canvas.read_from_nlv(os.path.join(example, filename), cache=False, layout_cache=False, **kw)
+    return canvas
+
+
+@pytest.mark.parametrize('render', ['annotations', 'lod'])
+def test_add_transition_between_new_level_objects_at_drawn_energies(render):
+    canvas = drawn(render=render, batch=True)
+    scheme = canvas.scheme
+    transition = Transition(Level(1384.79), Level(0.0), 1384.79, 0.1)
+    scheme.add_transition(transition)
+    assert transition.parent is next(level for level in scheme.levels if level.energy == 1384.79)
+    assert transition.daughter is next(level for level in scheme.levels if level.energy == 0.0)
+    if render == 'lod':
+        assert len(scheme.detail.tier) == len(scheme.transitions)
+
+
+def segments(canvas):
+    '''the polylines of every level trace, split at the nan gaps of merged traces'''
+    lines = []
+    for trace in canvas.data:
+        points = []
+        for x, y in zip(list(trace.x) + [float('nan')], list(trace.y) + [float('nan')]):
+            if x != x:
+                lines.append(tuple(points))
+                points = []
+            else:
+                points.append((round(float(x), 9), round(float(y), 9)))
+    return sorted(line for line in lines if line)
+
+
+def annotations(canvas):
+    return canvas.layout.to_plotly_json().get('annotations', [])
+
+
+@pytest.mark.parametrize('filename, kw', [
+    ('transitions.nlv', {}),
+    ('transitions.nlv', dict(level_kw=dict(style='platform'))),
+    ('transitions.nlv', dict(auto_sort=False, proportional=True, x_points=np.linspace(0, 1, 30))),
+    ('transitions.nlv', dict(spacing=300, br_widths=True, level_kw=dict(style='platform', height=0))),
+])
+def test_batch_matches_one_at_a_time(filename, kw):
+    batch, single = drawn(filename, batch=True, **kw), drawn(filename, batch=False, **kw)
+    assert len(batch.data) == 1 < len(single.data)
+    assert segments(batch) == segments(single)
+    assert annotations(batch) == annotations(single)
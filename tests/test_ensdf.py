@@ -0,0 +1,114 @@
+import warnings
+import pytest
+from lsd.ensdf import ENSDFFile, nlv_line, parse_spin_parity, read_ensdf, write_nlv
+from lsd.read import read
+
+
+def card(nucid, kind=' ', energy='', field='', flags='  '):
+    '''an 80 column card, field is J for levels and the relative intensity for gammas'''
+    return f'{nucid:>5}{flags}{kind} {energy:<10}  {field:<18}'.ljust(80)
+
+
+ensdf = '\n'.join([
+    card('60NI', energy='ADOPTED LEVELS, GAMMAS'),
+    card('60NI', 'L', 'this is a comment', flags=' c'),
+    card('60NI', 'L', '0.0', '0+'),
+    card('60NI', 'L', '1332.514', '2+'),
+    card('60NI', 'L', 'XREF=AB', flags='2 '),
+    card('60NI', 'G', '1332.492', '100'),
+    card('60NI', 'L', '2158.632', '2+'),
+    card('60NI', 'G', '826.10', '100'),
+    card('60NI', 'G', '2158.57', '1.3'),
+    card('60NI', 'L', '3000', '(3/2,5/2)-'),
+    card('60NI', 'G', '841.4'),
+    card('60NI', 'G', '1667.5'),
+    # ends nowhere near a level
+    card('60NI', 'G', '500'),
+    # levels relative to an unknown one can't be placed
+    card('60NI', 'L', 'X', ''),
+    card('60NI', 'G', '100', '5'),
+    '',
+    card('60NI', energy='60CO B- DECAY (5.2714 Y)'),
+    card('60NI', 'L', '0.0', '0+'),
+    card('60NI', 'L', '1332.514', '2+'),
+    card('60NI', 'G', '1332.492', '100'),
+    '',
+    card('60CO', energy='ADOPTED LEVELS, GAMMAS'),
+    card('60CO', 'L', '0', '5+'),
+    card('60CO', 'L', '58.59', '2+'),
+    card('60CO', 'G', '58.603', '100'),
+    card('60CO', 'L', '277.2', '4+'),
+    card('60CO', 'G', '218.6', '30'),
+    card('60CO', 'G', '277.2', '70'),
+    '',
+]) + '\n'
+
+
+@pytest.fixture
+def ens(tmp_path):
+    path = tmp_path / 'test.ens'
+    path.write_text(ensdf)
+    return str(path)
+
+
+def scheme(levels, transitions):
+    return (sorted((level.energy, level.spin, level.parity) for level in levels),
+            sorted((t.parent.energy, t.gamma, t.branching_ratio, t.daughter.energy) for t in transitions))
+
+
+def test_index(ens):
+    f = ENSDFFile(ens)
+    assert f.nuclei() == ['60NI', '60CO']
+    assert f.datasets('60ni') == ['ADOPTED LEVELS, GAMMAS', '60CO B- DECAY (5.2714 Y)']
+    assert f.find('60NI', '60CO B-') == ('60NI', '60CO B- DECAY (5.2714 Y)')
+    with pytest.raises(KeyError):
+        f.find('152SM')
+
+
+def test_adopted_levels(ens):
+    with pytest.warns(UserWarning, match='^1 gamma'):
+        levels, transitions = read_ensdf(ens, '60NI')
+    assert [level.energy for level in levels] == [0.0, 1332.514, 2158.632, 3000.0]
+    assert (levels[3].spin, levels[3].parity) == (1.5, '-')
+    daughters = {t.gamma: t.daughter.energy for t in transitions}
+    assert daughters == {1332.492: 0.0, 826.10: 1332.514, 2158.57: 0.0, 841.4: 2158.632, 1667.5: 1332.514}
+    ratios = {t.gamma: t.branching_ratio for t in transitions}
+    assert ratios[826.10] == pytest.approx(100/101.3)
+    assert ratios[2158.57] == pytest.approx(1.3/101.3)
+    # no intensities, no branching ratios
+    assert ratios[841.4] is None and ratios[1667.5] is None
+
+
+def test_seeking_matches_streaming(ens):
+    f = ENSDFFile(ens)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        streamed = {nucid: scheme(levels, transitions) for nucid, _, levels, transitions in f.schemes()}
+        assert streamed == {nucid: scheme(*f.read(nucid)) for nucid in f.nuclei()}
+    assert set(streamed) == {'60NI', '60CO'}
+
+
+def test_other_datasets(ens):
+    levels, transitions = ENSDFFile(ens).read('60NI', '60CO B-')
+    assert scheme(levels, transitions)[1] == [(1332.514, 1332.492, 1.0, 0.0)]
+
+
+def test_nlv_round_trip(ens, tmp_path):
+    levels, transitions = read_ensdf(ens, '60CO')
+    output = str(tmp_path / '60CO.nlv')
+    write_nlv(output, transitions)
+    assert scheme(*read(output, cache=False)) == scheme(levels, transitions)
+    assert nlv_line(transitions[0]).count('>') == 2
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('0+', (0.0, '+')),
+    ('5/2-', (2.5, '-')),
+    ('(3/2,5/2)-', (1.5, '-')),
+    ('(1,2)+', (1.0, '+')),
+    ('2', (2.0, None)),
+    ('', (None, None)),
+    ('HIGH', (None, None)),
+])
+def test_spin_parity(text, expected):
+    assert parse_spin_parity(text) == expected
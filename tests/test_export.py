@@ -0,0 +1,63 @@
+import json
+import os
+import warnings
+import numpy as np
+import pytest
+from lsd.drawing import Canvas
+from lsd.export import annotation_defaults, arrow_keys, compact_figure, to_compact_json
+
+decimals = 4
+example = os.path.join(os.path.dirname(__file__), os.pardir, 'example', 'transitions.nlv')
+
+
+@pytest.fixture(scope='module', params=[{}, dict(level_kw=dict(style='platform'), br_widths=True)],
+                ids=['flat', 'platform'])
+def canvas(request):
+    canvas = Canvas()
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        canvas.read_from_nlv(example, cache=False, layout_cache=False, **request.param)
+    return canvas
+
+
+def effective(anno, defaults):
+    '''what plotly draws for an annotation, arrow settings of labels don't matter'''
+    anno = {**annotation_defaults, **defaults, **anno}
+    if not anno['showarrow']:
+        anno = {key: value for key, value in anno.items() if key not in arrow_keys}
+    for key in ('x', 'y', 'ax', 'ay'):
+        if key in anno:
+            anno[key] = round(anno[key], decimals)
+    return anno
+
+
+def test_annotations_round_trip(canvas):
+    original = canvas.layout.to_plotly_json()
+    compact = json.loads(to_compact_json(canvas, decimals))
+    template = original.get('template', {}).get('layout', {}).get('annotationdefaults', {})
+    expected = [effective(anno, template) for anno in original['annotations'] if anno.get('visible', True)]
+    defaults = compact['layout']['template']['layout']['annotationdefaults']
+    assert [effective(anno, defaults) for anno in compact['layout']['annotations']] == expected
+
+
+def test_traces_round_trip(canvas):
+    compact = json.loads(to_compact_json(canvas, decimals))
+    assert len(compact['data']) == len(canvas.data)
+    for trace, compact_trace in zip(canvas.data, compact['data']):
+        for key in ('x', 'y'):
+            original = np.round(np.asarray(trace[key], dtype=float), decimals)
+            assert np.array_equal(original, np.array(compact_trace[key], dtype=float), equal_nan=True)
+
+
+def test_deterministic(canvas):
+    assert to_compact_json(canvas) == to_compact_json(canvas)
+    assert json.loads(to_compact_json(canvas)) == compact_figure(canvas)
+
+
+def test_smaller_than_plotly(canvas):
+    assert len(to_compact_json(canvas)) < len(canvas.to_json())
+
+
+def test_plotly_accepts_it(canvas):
+    import plotly.graph_objects as go
+    go.Figure(json.loads(to_compact_json(canvas)))
@@ -0,0 +1,42 @@
+import os
+import subprocess
+import sys
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# the same budget as benchmarks/bench_import.py, numpy alone is most of it
+budget = 0.5
+
+probe = '''
+import sys, time
+start = time.perf_counter()
+import lsd
+from lsd import read, SpaceManager, levelstyles, Scheme
+import lsd.svg, lsd.cli, lsd.validate, lsd.ensdf, lsd.layout_cache
+print(time.perf_counter() - start, 'plotly' in sys.modules)
+'''
+
+
+def cold_import():
+    '''seconds and whether plotly got loaded of importing lsd in a fresh interpreter, best of a few runs'''
+    runs = []
+    for _ in range(3):
+        out = subprocess.run([sys.executable, '-c', probe], capture_output=True, text=True, check=True,
+                             cwd=root).stdout.split()
+        runs.append((float(out[0]), out[1] == 'True'))
+    return min(runs)
+
+
+def test_import_leaves_out_plotly():
+    _, plotly_loaded = cold_import()
+    assert not plotly_loaded
+
+
+def test_import_is_within_budget():
+    seconds, _ = cold_import()
+    assert seconds < budget
+
+
+def test_canvas_still_loads_on_first_use():
+    out = subprocess.run([sys.executable, '-c', "import sys, lsd; lsd.Canvas; print('plotly' in sys.modules)"],
+                         capture_output=True, text=True, check=True, cwd=root).stdout
+    assert out.strip() == 'True'
@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+from lsd.labels import label_boxes, resolve_labels, spread
+
+
+def labels(ys, x=0.5, xanchor='left'):
+    return [dict(x=x, y=float(y), text='1000 keV', xanchor=xanchor, yanchor='middle') for y in ys]
+
+
+def overlaps(annotations, x_scale, y_scale):
+    boxes = label_boxes(annotations, x_scale, y_scale)
+    y = np.sort(boxes[:,2])
+    return np.any(np.diff(y) < boxes[0,3] - 1e-9)
+
+
+def test_spread_without_room_to_spare_stays_put():
+    assert spread([0., 10., 20.], [1., 1., 1.], bounds=(-1, 21)).tolist() == [0., 10., 20.]
+
+
+def test_spread_stays_in_bounds():
+    positions = spread([0., 0., 0., 0.], [1., 1., 1., 1.], bounds=(0, 10))
+    assert positions.tolist() == [0.5, 1.5, 2.5, 3.5]
+    # too little room, squeezed evenly
+    positions = spread([5.]*4, [1.]*4, bounds=(0, 2))
+    assert positions[0] == pytest.approx(0.5) and positions[-1] == pytest.approx(1.5)
+    assert np.diff(positions) == pytest.approx([1/3]*3)
+
+
+def test_labels_that_fit_stay_in_range_and_apart():
+    annotations = labels([0, 1, 2, 3, 50, 100])
+    resolve_labels(annotations, 1/600, 100/300, y_range=(0, 100))
+    ys = [anno['y'] for anno in annotations]
+    assert min(ys) >= 0 and max(ys) <= 100
+    assert not overlaps(annotations, 1/600, 100/300)
+
+
+def test_labels_that_dont_fit_warn_and_stay_in_range():
+    annotations = labels(np.linspace(0, 100, 64))
+    with pytest.warns(UserWarning, match="64 labels don't fit"):
+        resolve_labels(annotations, 1/600, 100/300, y_range=(0, 100))
+    ys = [anno['y'] for anno in annotations]
+    assert min(ys) >= 0 and max(ys) <= 100
+
+
+def test_only_moved_labels_get_leader_lines():
+    annotations = labels([0, 50, 50, 100])
+    x, y = resolve_labels(annotations, 1/600, 100/300, y_range=(0, 100))
+    moved = [anno['x'] != 0.5 for anno in annotations]
+    assert moved == [False, True, True, False]
+    assert np.isnan(x).sum() == 1
+    assert sorted(y[~np.isnan(y)][::2]) == [50, 50]
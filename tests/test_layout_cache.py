@@ -0,0 +1,44 @@
+import os
+import warnings
+import numpy as np
+import pytest
+from lsd.drawing import Canvas
+from lsd.layout_cache import LayoutCache
+from lsd.stats import Stats
+
+example = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'example')
+
+
+def figure(layout_cache, filename, **kw):
+    '''the figure of filename as json and whether its layout came from layout_cache'''
+    canvas = Canvas()
+    stats = Stats()
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        canvas.read_from_nlv(os.path.join(example, filename), cache=False, layout_cache=layout_cache, stats=stats, **kw)
+    return canvas.to_json(), stats.counters.get('layout_cache_hit', 0)
+
+
+@pytest.mark.parametrize('filename, kw', [
+    ('transitions.nlv', {}),
+    ('transitions.nlv', dict(placement='optimal', fit_x_points=True)),
+    ('alltransitions.nlv', dict(spacing=60, proportional=True, x_points=np.linspace(0.1, 0.9, 220))),
+    ('alltransitions.nlv', dict(render='webgl', text_labels=True)),
+])
+def test_hit_draws_the_same_figure_as_a_miss(tmp_path, filename, kw):
+    cache = LayoutCache(str(tmp_path))
+    miss, hits = figure(cache, filename, **kw)
+    assert hits == 0
+    hit, hits = figure(cache, filename, **kw)
+    assert hits == 1
+    assert hit == miss
+    assert figure(False, filename, **kw)[0] == miss
+
+
+def test_restyling_still_hits(tmp_path):
+    cache = LayoutCache(str(tmp_path))
+    style = dict(level_kw=dict(trace_kw=dict(line=dict(color='red'))), transition_kw=dict(arrowcolor='blue'))
+    figure(cache, 'transitions.nlv')
+    restyled, hits = figure(cache, 'transitions.nlv', **style)
+    assert hits == 1
+    assert restyled == figure(False, 'transitions.nlv', **style)[0]
@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+from lsd.query import Scheme
+from lsd.read import LevelRegistry, Transition
+from lsd.tables import to_tables
+
+
+def random_scheme(n_levels=60, n_transitions=300, seed=0):
+    rng = np.random.default_rng(seed)
+    registry = LevelRegistry()
+    levels = [registry.add(float(energy)) for energy in np.unique(np.round(rng.uniform(0, 5000, n_levels), 1))]
+    transitions = []
+    for _ in range(n_transitions):
+        parent, daughter = sorted(rng.choice(len(levels), 2, replace=False))[::-1]
+        # some gammas are missing and taken from the level energies
+        gamma = None if rng.random() < 0.2 else levels[parent].energy - levels[daughter].energy + rng.normal(0, 0.2)
+        transitions.append(Transition(levels[parent], levels[daughter], gamma, float(rng.random())))
+    return levels, transitions
+
+
+@pytest.fixture(params=['objects', 'tables'])
+def scheme(request):
+    levels, transitions = random_scheme()
+    if request.param == 'tables':
+        levels, transitions = to_tables(levels, transitions)
+    return Scheme(levels, transitions)
+
+
+def gammas(scheme):
+    return [transition.gamma if transition.gamma is not None and transition.gamma == transition.gamma
+            else transition.parent.energy - transition.daughter.energy for transition in scheme.transitions]
+
+
+def test_within_matches_linear_scan(scheme):
+    all_gammas = gammas(scheme)
+    for energy in np.linspace(0, 5000, 200):
+        expected = sorted(k for k, gamma in enumerate(all_gammas) if abs(gamma - energy) <= 5)
+        assert sorted(scheme.within(energy, 5).tolist()) == expected
+
+
+def test_match_matches_within(scheme):
+    peaks = np.random.default_rng(1).uniform(0, 5000, 500)
+    offsets, found = scheme.match(peaks, 3)
+    for i, peak in enumerate(peaks):
+        assert sorted(found[offsets[i]:offsets[i+1]].tolist()) == sorted(scheme.within(peak, 3).tolist())
+
+
+def test_nearest_matches_linear_scan(scheme):
+    all_gammas = np.array(gammas(scheme))
+    peaks = np.random.default_rng(2).uniform(0, 5000, 300)
+    found, residual = scheme.nearest(peaks)
+    for peak, k, r in zip(peaks, found, residual):
+        assert abs(all_gammas[k] - peak) == pytest.approx(np.abs(all_gammas - peak).min())
+        assert r == pytest.approx(peak - all_gammas[k])
+
+
+def test_feeding_and_depopulating_match_linear_scan(scheme):
+    for level in list(scheme.levels)[::7]:
+        feeding = [k for k, t in enumerate(scheme.transitions) if t.daughter.energy == level.energy]
+        depopulating = [k for k, t in enumerate(scheme.transitions) if t.parent.energy == level.energy]
+        assert sorted(scheme.feeding(level.energy).tolist()) == feeding
+        assert sorted(scheme.depopulating(level.energy).tolist()) == depopulating
+    assert scheme.feeding_counts().sum() == len(scheme) == scheme.depopulating_counts().sum()
+
+
+def test_level_index(scheme):
+    energies = [level.energy for level in scheme.levels]
+    assert scheme.level_index(energies).tolist() == list(range(len(energies)))
+    assert scheme.level_index(-100.0) == -1
+    with pytest.raises(KeyError):
+        scheme.feeding(-100.0)
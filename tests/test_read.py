@@ -0,0 +1,32 @@
+import pytest
+from lsd.read import NLVSyntaxError, iter_read, read
+
+
+@pytest.mark.parametrize('line', [
+    '1000 > 500 >',
+    'abc > 500 > 0',
+    ',2,+ > 500 > 0',
+    'None > 500 > 0',
+    '1000 > 500 > 0,0,+ > 0',
+    '1000,2,+,1 > 500 > 0',
+])
+def test_syntax_errors_give_the_line_number(line):
+    lines = ['1000 > 1000 > 0\n', '\n', line + '\n', '2000 > 1000 > 1000\n']
+    with pytest.raises(NLVSyntaxError) as error:
+        list(iter_read(lines))
+    assert error.value.lineno == 3
+    assert error.value.line == line
+    assert str(error.value).startswith('line 3: ')
+
+
+def test_bad_energy_in_a_file(tmp_path):
+    path = tmp_path / 'bad.nlv'
+    path.write_text('1000,2,+ > 1000 > 0,0,+\n1500 > 500 > x\n')
+    with pytest.raises(NLVSyntaxError, match='line 2'):
+        read(str(path), cache=False)
+
+
+def test_good_lines():
+    transitions = list(iter_read(['1000,2,+ > 1000 > 0,0,+\n', '2000 > 1000,0.5 > 1000\n']))
+    assert [(t.parent.energy, t.gamma, t.branching_ratio, t.daughter.energy) for t in transitions] == \
+        [(1000.0, 1000.0, None, 0.0), (2000.0, 1000.0, 0.5, 1000.0)]
@@ -0,0 +1,189 @@
+import random
+import warnings
+import numpy as np
+import pytest
+from lsd.spacer import SpaceManager
+from lsd.stats import Stats
+
+
+def random_paths(n_levels, n_paths, seed):
+    rng = random.Random(seed)
+    energies = sorted(rng.sample(range(0, 100*n_levels, 10), n_levels))
+    paths = []
+    for _ in range(n_paths):
+        parent, daughter = rng.sample(energies, 2)
+        paths.append((max(parent, daughter), min(parent, daughter)))
+    paths.sort()
+    return energies, paths
+
+
+def columns_needed(manager, paths):
+    '''most paths passing between any two neighbouring levels, the fewest columns any placement can use'''
+    depth = np.zeros(len(manager.dict_level) + 1, dtype=int)
+    for parent, daughter in paths:
+        depth[manager.dict_level[daughter]] += 1
+        depth[manager.dict_level[parent]] -= 1
+    return np.cumsum(depth).max()
+
+
+def overlapping(manager, paths, xs):
+    '''pairs of paths drawn in the same column over the same levels'''
+    spans = [(manager.dict_level[daughter], manager.dict_level[parent], x) for (parent, daughter), x in zip(paths, xs)]
+    return [(a, b) for i, a in enumerate(spans) for b in spans[i+1:]
+            if a[2] == b[2] and a[0] < b[1] and b[0] < a[1]]
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_optimal_uses_the_fewest_columns(seed):
+    energies, paths = random_paths(40, 120, seed)
+    manager = SpaceManager(np.linspace(0.2, 0.8, 200), energies, spacing=100)
+    xs = manager.assign_paths(paths, placement='optimal')
+    assert manager.columns_used == columns_needed(manager, paths)
+    assert not overlapping(manager, paths, xs)
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_optimal_never_uses_more_columns_than_greedy(seed):
+    energies, paths = random_paths(30, 80, seed)
+    greedy = SpaceManager(np.linspace(0.2, 0.8, 200), energies, spacing=100)
+    greedy.assign_paths(paths, placement='greedy')
+    optimal = SpaceManager(np.linspace(0.2, 0.8, 200), energies, spacing=100)
+    optimal.assign_paths(paths, placement='optimal')
+    assert optimal.columns_used <= greedy.columns_used
+
+
+def test_resize_fits_the_columns_needed():
+    energies, paths = random_paths(30, 80, 0)
+    manager = SpaceManager(np.linspace(0.2, 0.8, 10), energies, spacing=100)
+    xs = manager.assign_paths(paths, placement='optimal', resize=True)
+    assert len(manager.xspace) == columns_needed(manager, paths)
+    assert manager.xspace[0] == 0.2 and manager.xspace[-1] == 0.8
+    assert not overlapping(manager, paths, xs)
+
+
+def test_resize_to_one_column_stays_right():
+    manager = SpaceManager(np.linspace(0.2, 0.8, 5), [0, 100, 200], spacing=100)
+    xs = manager.assign_paths([(100, 0), (200, 100)], placement='optimal', resize=True)
+    assert list(manager.xspace) == [0.8]
+    assert xs == [0.8, 0.8]
+
+
+def test_upward_and_self_paths_take_no_column():
+    manager = SpaceManager(np.linspace(0.2, 0.8, 1), [0, 100, 200], spacing=100)
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        xs = manager.assign_paths([(200, 0), (0, 200), (100, 100)], placement='optimal')
+    assert xs == [manager.xspace[-1]]*3
+    assert manager.columns_used == 1
+
+
+def test_out_of_space_warns():
+    manager = SpaceManager(np.linspace(0.2, 0.8, 1), [0, 100, 200], spacing=100)
+    with pytest.warns(UserWarning, match='needs 2 x points'):
+        manager.assign_paths([(200, 0), (100, 0)], placement='optimal')
+
+
+def test_greedy_resize_warns_and_keeps_x_points():
+    manager = SpaceManager(np.linspace(0.2, 0.8, 5), [0, 100], spacing=100)
+    with pytest.warns(UserWarning, match='resize'):
+        manager.assign_paths([(100, 0)], placement='greedy', resize=True)
+    assert len(manager.xspace) == 5
+
+
+def test_unknown_placement():
+    manager = SpaceManager(np.linspace(0.2, 0.8, 5), [0, 100], spacing=100)
+    with pytest.raises(ValueError):
+        manager.assign_paths([(100, 0)], placement='best')
+
+
+def reference_regions(levels, spacing, reverse=False):
+    '''get_normalized_regions as it was before it was vectorised'''
+    groups = []
+    group_flag = False
+    if reverse:
+        rng, dr = range(len(levels)-2, 0, -1), 1
+    else:
+        rng, dr = range(1, len(levels)-1), -1
+    for i in rng:
+        if abs(levels[i+dr]-levels[i]) < spacing:
+            if not group_flag:
+                groups.append([levels[i+dr], levels[i]])
+                group_flag = True
+            else:
+                groups[-1].append(levels[i])
+        elif group_flag:
+            if reverse and abs(max(groups[-1])-levels[i]) < len(groups[-1])*spacing:
+                groups[-1].append(levels[i])
+            elif not reverse and abs(min(groups[-1])-levels[i]) < len(groups[-1])*spacing:
+                groups[-1].append(levels[i])
+            else:
+                group_flag = False
+    if reverse:
+        return [(max(group)-len(group)*spacing, max(group)+1) for group in groups]
+    return [(min(group)-1, min(group)+len(group)*spacing) for group in groups]
+
+
+def reference_spaced_y(levels, regions, reverse=False):
+    '''_make_room as it was before it was vectorised'''
+    spaced_y = list(levels)
+    for region in regions:
+        inside = [region[0] <= level <= region[1] for level in levels]
+        even_spacing = (region[1] - region[0])/sum(inside)
+        if reverse:
+            rng, sign, j = range(len(levels)-1, 0, -1), -1, 1
+        else:
+            rng, sign, j = range(len(levels)), 1, 0
+        track = 0
+        for i in rng:
+            if inside[i]:
+                spaced_y[i] = sign*even_spacing*track + region[j]
+                track += 1
+    return spaced_y
+
+
+@pytest.mark.parametrize('reverse', [False, True])
+@pytest.mark.parametrize('seed', range(20))
+def test_spacing_matches_the_reference(seed, reverse):
+    rng = np.random.default_rng(seed)
+    # clusters of close levels between sparse ones
+    centres = rng.uniform(0, 10000, rng.integers(1, 15))
+    levels = np.unique(np.round(np.concatenate([centre + rng.exponential(20, rng.integers(1, 12)).cumsum()
+                                                for centre in centres] + [rng.uniform(0, 10000, 30)]), 2))
+    spacing = float(rng.uniform(20, 150))
+    regions = SpaceManager.get_normalized_regions(levels, spacing, reverse=reverse)
+    assert [tuple(region) for region in regions] == pytest.approx(reference_regions(levels.tolist(), spacing, reverse))
+    manager = SpaceManager(np.linspace(0.2, 0.8, 5), rng.permutation(levels), spacing, reverse=reverse)
+    assert manager.spaced_y.tolist() == pytest.approx(reference_spaced_y(levels.tolist(), regions, reverse))
+
+
+def banded_paths(n_bands, seed):
+    '''paths of bands of levels that only decay within their band, the bands come out interleaved'''
+    rng = random.Random(seed)
+    energies, paths = [], []
+    for band in range(n_bands):
+        levels = sorted(rng.sample(range(10000*band, 10000*band + 5000, 10), 40))
+        energies += levels
+        for _ in range(rng.randint(20, 150)):
+            parent, daughter = rng.sample(levels, 2)
+            paths.append((max(parent, daughter), min(parent, daughter)))
+    rng.shuffle(paths)
+    return energies, paths
+
+
+@pytest.mark.parametrize('placement', ['greedy', 'optimal'])
+@pytest.mark.parametrize('workers', [1, 2])
+def test_bands_match_serial_layout(workers, placement):
+    energies, paths = banded_paths(6, seed=workers)
+    # few enough columns that some bands run out of space
+    layouts = []
+    for w in (None, workers):
+        stats = Stats()
+        manager = SpaceManager(np.linspace(0.2, 0.8, 12), energies, spacing=100, stats=stats)
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            xs = manager.assign_paths(paths, placement=placement, workers=w)
+        layouts.append((xs, manager.space.tolist(), stats.counters))
+    assert layouts[1][0] == layouts[0][0]
+    assert layouts[1][1] == layouts[0][1]
+    assert layouts[1][2] == layouts[0][2]
+    assert layouts[0][2].get('out_of_space')
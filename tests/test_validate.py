@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+from lsd.read import LevelRegistry, Transition
+from lsd.tables import to_tables
+from lsd.validate import amu, validate
+
+
+def scheme():
+    registry = LevelRegistry()
+    ground = registry.add(0.0, 0.0, '+')
+    first = registry.add(1000.0, 2.0, '+')
+    second = registry.add(2500.0, 4.0, '+')
+    unknown = registry.add(1800.0)
+    transitions = [
+        Transition(first, ground, 1000.0, 1.0),
+        # 2 keV off
+        Transition(second, first, 1502.0, 0.5),
+        # branching ratios out of 2500 sum to 0.8
+        Transition(second, ground, 2500.0, 0.3),
+        # goes to a level nobody gives a spin or parity
+        Transition(second, unknown, 700.0),
+    ]
+    return registry.levels, transitions
+
+
+@pytest.fixture(params=['objects', 'tables'])
+def report(request):
+    levels, transitions = scheme()
+    if request.param == 'tables':
+        levels, transitions = to_tables(levels, transitions)
+    return validate(levels, transitions)
+
+
+def test_energy_errors(report):
+    assert report.energy_errors.tolist() == [1]
+    assert report.residual[1] == pytest.approx(2.0)
+    assert np.abs(np.delete(report.residual, 1)).max() < 0.5
+
+
+def test_branching(report):
+    # 2500 has one transition without a branching ratio, so its sum is only incomplete
+    assert report.branching_errors.tolist() == []
+    assert report.incomplete_branching.tolist() == [2]
+    assert report.branching_sum[2] == pytest.approx(0.8)
+    assert report.branching_sum[1] == pytest.approx(1.0)
+    assert np.isnan(report.branching_sum[0])
+
+
+def test_undefined_daughters(report):
+    assert report.undefined_daughters.tolist() == [3]
+    assert not report.ok
+    assert len(report.problems()) == 2
+
+
+def test_complete_branching_that_doesnt_sum_to_one():
+    levels, transitions = scheme()
+    transitions[3].branching_ratio = 0.1
+    report = validate(levels, transitions)
+    assert report.branching_errors.tolist() == [2]
+    assert report.incomplete_branching.tolist() == []
+
+
+def test_recoil():
+    registry = LevelRegistry()
+    parent, ground = registry.add(5000.0, 1.0, '+'), registry.add(0.0, 0.0, '+')
+    mass = 60
+    gamma = 5000 - 5000**2/(2*mass*amu)
+    transitions = [Transition(parent, ground, gamma, 1.0)]
+    assert validate(registry.levels, transitions, energy_tolerance=0.05).energy_errors.tolist() == [0]
+    assert validate(registry.levels, transitions, energy_tolerance=0.05, mass=mass).ok
+
+
+def test_warn():
+    levels, transitions = scheme()
+    with pytest.warns(UserWarning):
+        validate(levels, transitions).warn()
@@ -0,0 +1,132 @@
+import os
+import warnings
+import pytest
+from lsd.drawing import Canvas
+from lsd.read import read
+from lsd.watch import SchemeWatcher
+
+scheme = '''1000,2,+ > 1000 > 0,0,+
+2000,4,+ > 1000,0.6 > 1000
+2000 > 2000,0.4 > 0
+3000,3,- > 1000 > 2000
+'''
+
+
+def save(path, text):
+    # make sure the watcher sees a new modification time even on coarse clocks
+    stat = os.stat(path) if os.path.exists(path) else None
+    with open(path, 'w') as f:
+        f.write(text)
+    if stat is not None:
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+
+def level_labels(canvas):
+    return [(anno['x'], anno['y'], anno['text']) for anno in canvas.layout.to_plotly_json().get('annotations', [])
+            if anno.get('visible', True) and not anno.get('showarrow')]
+
+
+def arrows(canvas):
+    return sorted((anno['x'], anno['ay'], anno['y']) for anno in canvas.layout.to_plotly_json().get('annotations', [])
+                  if anno.get('visible', True) and anno.get('showarrow'))
+
+
+def fresh(path):
+    canvas = Canvas()
+    canvas.read_from_nlv(str(path), cache=False, layout_cache=False)
+    return canvas
+
+
+@pytest.fixture
+def watched(tmp_path):
+    path = tmp_path / 'scheme.nlv'
+    save(path, scheme)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        yield path, SchemeWatcher(str(path))
+
+
+def test_initial_drawing_matches_read(watched):
+    path, watcher = watched
+    assert level_labels(watcher.canvas) == level_labels(fresh(path))
+    assert arrows(watcher.canvas) == arrows(fresh(path))
+
+
+@pytest.mark.parametrize('edited', [
+    # a later line disagrees with the first spin of a level, the first one given wins
+    scheme.replace('3000,3,- > 1000 > 2000', '3000,3,- > 1000 > 2000,6,-'),
+    # the line giving the spin goes, the next line that gives one takes over
+    scheme.replace('1000,2,+ > 1000 > 0,0,+\n', '1000 > 1000 > 0,0,+\n1000,5,- > 999 > 0\n'),
+    # conflicting labels on an edited line
+    scheme.replace('2000 > 2000,0.4 > 0', '2000,1,- > 2000,0.4 > 0,2,-'),
+    scheme.replace('2000,4,+ > 1000,0.6 > 1000', '2000,8,- > 1000,0.6 > 1000,9,+'),
+], ids=['later line', 'first line removed', 'edited line', 'edited first line'])
+def test_conflicting_edits_label_levels_like_read(watched, edited):
+    path, watcher = watched
+    save(path, edited)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        watcher.refresh()
+    expected = fresh(path)
+    assert level_labels(watcher.canvas) == level_labels(expected)
+    assert arrows(watcher.canvas) == arrows(expected)
+
+
+def test_unchanged_file_is_not_redrawn(watched):
+    path, watcher = watched
+    assert watcher.refresh() == 0
+
+
+def spans(canvas):
+    '''parent and daughter y of every arrow, which doesn't depend on the columns edits put them in'''
+    return sorted(arrow[1:] for arrow in arrows(canvas))
+
+
+def refresh(watcher, path, text):
+    save(path, text)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        return watcher.refresh()
+
+
+def test_edited_gamma_updates_one_transition(watched):
+    path, watcher = watched
+    level_trace = watcher.scheme.level_trace
+    assert refresh(watcher, path, scheme.replace('1000,0.6', '999,0.6')) == 1
+    # no new layout
+    assert watcher.scheme.level_trace is level_trace
+    assert sorted(t.gamma for t in watcher.scheme.transitions) == sorted(t.gamma for t in read(str(path), cache=False)[1])
+    assert arrows(watcher.canvas) == arrows(fresh(path))
+
+
+def test_added_and_removed_lines(watched):
+    path, watcher = watched
+    assert refresh(watcher, path, scheme + '3000 > 3000 > 0\n') == 1
+    assert spans(watcher.canvas) == spans(fresh(path))
+    assert refresh(watcher, path, scheme.replace('2000 > 2000,0.4 > 0\n', '')) == 2
+    assert spans(watcher.canvas) == spans(fresh(path))
+    assert len(watcher.scheme.transitions) == 3
+
+
+def test_duplicate_lines(watched):
+    path, watcher = watched
+    assert refresh(watcher, path, scheme + scheme.splitlines(True)[1]) == 1
+    assert len(watcher.scheme.transitions) == 5
+    assert refresh(watcher, path, scheme) == 1
+    assert len(watcher.scheme.transitions) == 4
+
+
+def test_new_level_lays_out_again(watched):
+    path, watcher = watched
+    assert refresh(watcher, path, scheme + '4000,1,+ > 3000 > 1000\n') == 1
+    assert level_labels(watcher.canvas) == level_labels(fresh(path))
+    assert arrows(watcher.canvas) == arrows(fresh(path))
+
+
+def test_syntax_error_keeps_drawing(watched):
+    path, watcher = watched
+    before = arrows(watcher.canvas)
+    save(path, scheme + '1000 > 0\n')
+    with pytest.warns(UserWarning, match='line 5'):
+        assert watcher.refresh() == 0
+    assert arrows(watcher.canvas) == before